@@ -1,133 +1,128 @@
 import streamlit as st
 import sqlite3
-import cv2
-from pyzbar.pyzbar import decode
-import numpy as np
 from datetime import datetime
-from fpdf import FPDF
-import pandas as pd
-
-USER_CREDENTIALS = {"admin": "flb23"}
-
-def initialize_database():
-    with sqlite3.connect('students.db') as connection:
-        cursor = connection.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS students (
-                id TEXT PRIMARY KEY,
-                name TEXT NOT NULL
-            )
-        ''')
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS log (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                student_id TEXT,
-                name TEXT,
-                date TEXT,
-                time TEXT,
-                action TEXT
-            )
-        ''')
-        connection.commit()
+from event_store import create_student, delete_student, rename_student
+from offline_queue import record_codes
+from scanner_core import export_log_pdf, fetch_logs_for_report, fetch_students, initialize_database
+from settings import settings
+
+# cv2, pyzbar, pandas und fpdf werden erst in der Ansicht geladen, die sie braucht –
+# Login, Impressum usw. zahlen so nicht bei jedem Rerun/Worker-Start dafür.
 
 def add_student(barcode_id, student_name):
     try:
-        with sqlite3.connect('students.db') as connection:
-            cursor = connection.cursor()
-            cursor.execute("INSERT INTO students (id, name) VALUES (?, ?)", (barcode_id, student_name))
-            connection.commit()
-            return f"Schüler {student_name} mit Barcode-ID {barcode_id} erfolgreich hinzugefügt."
+        create_student(barcode_id, student_name)
+        return f"Schüler {student_name} mit Barcode-ID {barcode_id} erfolgreich hinzugefügt."
     except sqlite3.IntegrityError:
         return "Fehler: Diese Barcode-ID existiert bereits."
+    except ValueError as e:
+        return f"Fehler: {e}"
     except sqlite3.Error as e:
         return f"Datenbankfehler: {e}"
 
-def get_student_name(barcode_id):
-    with sqlite3.connect('students.db') as connection:
-        cursor = connection.cursor()
-        cursor.execute("SELECT name FROM students WHERE id = ?", (barcode_id,))
-        result = cursor.fetchone()
-        return result[0] if result else None
-
-def log_scan(student_id, name, action):
-    now = datetime.now()
-    date = now.strftime("%Y-%m-%d")
-    time = now.strftime("%H:%M:%S")
-    with sqlite3.connect('students.db') as connection:
-        cursor = connection.cursor()
-        cursor.execute("INSERT INTO log (student_id, name, date, time, action) VALUES (?, ?, ?, ?, ?)",
-                       (student_id, name, date, time, action))
-        connection.commit()
-
 def start_scanner(mode):
-    cap = cv2.VideoCapture(0)
+    import time
+    import cv2
+    from barcode_check import validator
+    from frames import ActivityGate, DisplayThrottle, FrameSlot, open_camera, thread_decoder
+
+    # Kamera und Decodier-Strategie je Start aus settings.py ([camera], [decode])
+    config = settings()
+    cap = open_camera(config.camera)
     if not cap.isOpened():
-        st.error("Kamera konnte nicht geöffnet werden.")
+        st.error(f"Kamera {config.camera.index} konnte nicht geöffnet werden.")
         return
 
     st.write(f"**Modus: {mode} – Drücke 'Scanner stoppen' zum Beenden.**")
     stop_button = st.button("Scanner stoppen")
     frame_placeholder = st.empty()
+    status_placeholder = st.empty()
+    # Ein Puffer-Satz für die ganze Sitzung; angezeigt wird gedrosselt
+    slot = FrameSlot()
+    # Nur erlaubte Symbologien suchen; Fehllesungen/fremde Codes vor jeder DB-Abfrage aussortieren
+    check = validator()
+    decoder = thread_decoder(check.zbar_symbols())
+    throttle = DisplayThrottle(config.camera.display_fps)
+    # Ohne Bewegung vor der Kamera: nur noch wenige Frames/s prüfen, nicht decodieren
+    gate = ActivityGate(config.decode.idle_fps, config.decode.idle_after)
+    adaptive = config.decode.strategy == "adaptive"
+    was_active = True
 
     while not stop_button:
-        ret, frame = cap.read()
+        ret, frame = slot.capture(cap)
         if not ret:
             st.error("Fehler beim Lesen des Kamerabildes.")
             break
 
-        barcodes = decode(frame)
+        gray = slot.to_gray(frame)
+        active = gate.update(gray) if adaptive else True
+        if active != was_active:
+            status_placeholder.caption("" if active else "💤 Ruhemodus – Scanner wacht bei Bewegung auf.")
+            was_active = active
+        if not active:
+            if throttle.due():
+                frame_placeholder.image(frame, channels="BGR", use_container_width=True)
+                slot.stats.displayed += 1
+            time.sleep(gate.pause())
+            continue
+
+        barcodes = decoder.decode(gray)
+        slot.stats.decoded += 1
+        if barcodes:
+            gate.found()
         for barcode in barcodes:
-            barcode_data = barcode.data.decode('utf-8')
-            student_name = get_student_name(barcode_data)
-            text = f"{student_name} ({barcode_data})" if student_name else f"Unbekannt ({barcode_data})"
+            barcode_data, reason = check.check(barcode.data, barcode.type)
+            # Nachschlagen + Protokoll in einem; ohne DB landet der Scan in der Offline-Warteschlange
+            _, student_name, status = record_codes([barcode_data], mode)[0] if reason is None else (None, None, None)
+            text = f"{student_name} ({barcode_data})" if student_name else f"Unbekannt ({barcode_data or barcode.type})"
             cv2.putText(frame, text, (barcode.rect.left, barcode.rect.top - 10),
                         cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 0, 0), 2)
-            if student_name:
-                log_scan(barcode_data, student_name, mode)
+            if status == "accepted":
                 stop_button = True
                 st.success(f"{mode} registriert: **{student_name}** um {datetime.now().strftime('%H:%M:%S')}")
                 break
+            if status == "queued":
+                stop_button = True
+                st.info(f"⏳ Datenbank nicht erreichbar – {mode} für `{barcode_data}` offline gespeichert.")
+                break
 
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        frame_placeholder.image(frame_rgb, channels="RGB", use_container_width=True)
+        if barcodes or throttle.due():
+            # st.image wandelt BGR selbst um – kein eigenes RGB-Array pro Frame
+            frame_placeholder.image(frame, channels="BGR", use_container_width=True)
+            slot.stats.displayed += 1
 
     cap.release()
     cv2.destroyAllWindows()
+    gate.finish()
     st.info("Scanner gestoppt.")
+    rejected = sum(check.rejected.values())
+    if rejected:
+        st.caption(f"Aussortierte Lesungen (ohne DB-Abfrage): {rejected} – "
+                   + ", ".join(f"{reason}: {n}" for reason, n in check.rejected.items()))
+    if gate.stats.idle_frames:
+        st.caption(f"Ruhemodus: {gate.stats.idle_seconds:.0f} s, {gate.stats.wakeups}× aufgewacht "
+                   f"(max. {gate.stats.wake_latency_max * 1000:.0f} ms Verzögerung)")
 
 def export_filtered_log_to_pdf(logs, selected_date):
     if not logs:
         st.warning("Keine Daten zum Exportieren.")
         return
 
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_font("Arial", size=12)
-    pdf.cell(200, 10, txt=f"Schüler-Logbuch für {selected_date}", ln=True, align='C')
-    pdf.ln(10)
-
-    for log in logs:
-        line = f"{log[2]} {log[3]} - {log[1]} ({log[0]}) - {log[4]}"
-        pdf.cell(200, 10, txt=line, ln=True)
-
-    filename = f"logbuch_{selected_date}.pdf"
-    pdf.output(filename)
-    with open(filename, "rb") as f:
-        st.download_button("📄 PDF herunterladen", data=f, file_name=filename, mime="application/pdf")
+    filename, pdf_bytes = export_log_pdf(logs, selected_date)
+    st.download_button("📄 PDF herunterladen", data=pdf_bytes, file_name=filename, mime="application/pdf")
 
 def logbuch_mit_filter():
     st.subheader("📅 Logbuch filtern & exportieren")
     selected_date = st.date_input("Datum auswählen")
     if selected_date:
         date_str = selected_date.strftime("%Y-%m-%d")
-        with sqlite3.connect("students.db") as connection:
-            cursor = connection.cursor()
-            cursor.execute("SELECT student_id, name, date, time, action FROM log WHERE date = ? ORDER BY time ASC", (date_str,))
-            logs = cursor.fetchall()
+        logs = fetch_logs_for_report(date_str)
 
         if logs:
+            import pandas as pd
+
             st.success(f"{len(logs)} Einträge gefunden für {date_str}")
-            df = pd.DataFrame(logs, columns=["Barcode-ID", "Name", "Datum", "Uhrzeit", "Aktion"])
+            df = pd.DataFrame(logs, columns=["Barcode-ID", "Name", "Datum", "Uhrzeit", "Aktion", "Klasse"])
             st.dataframe(df, use_container_width=True)
 
             export_filtered_log_to_pdf(logs, date_str)
@@ -144,10 +139,7 @@ def logbuch_mit_filter():
 
 def schueler_verwalten():
     st.subheader("👨‍🏫 Schüler bearbeiten oder löschen")
-    with sqlite3.connect("students.db") as connection:
-        cursor = connection.cursor()
-        cursor.execute("SELECT id, name FROM students ORDER BY name ASC")
-        schueler_liste = cursor.fetchall()
+    schueler_liste = fetch_students()
 
     if not schueler_liste:
         st.info("Noch keine Schüler in der Datenbank.")
@@ -159,20 +151,14 @@ def schueler_verwalten():
     new_name = st.text_input("Neuer Name (optional):")
     if st.button("Namen aktualisieren"):
         if new_name.strip():
-            with sqlite3.connect("students.db") as connection:
-                cursor = connection.cursor()
-                cursor.execute("UPDATE students SET name = ? WHERE id = ?", (new_name.strip(), ausgewählte_id))
-                connection.commit()
-                st.success(f"Name aktualisiert auf: {new_name}")
-                st.rerun()
+            rename_student(ausgewählte_id, new_name.strip())
+            st.success(f"Name aktualisiert auf: {new_name}")
+            st.rerun()
         else:
             st.error("Bitte neuen Namen eingeben.")
 
     if st.button("❌ Schüler löschen"):
-        with sqlite3.connect("students.db") as connection:
-            cursor = connection.cursor()
-            cursor.execute("DELETE FROM students WHERE id = ?", (ausgewählte_id,))
-            connection.commit()
+        delete_student(ausgewählte_id)
         st.success("Schüler gelöscht.")
         st.rerun()
 
@@ -206,7 +192,7 @@ def login_page():
     username = st.text_input("Benutzername:")
     password = st.text_input("Passwort:", type="password")
     if st.button("Login"):
-        if username in USER_CREDENTIALS and USER_CREDENTIALS[username] == password:
+        if settings().auth.users.get(username) == password:
             st.session_state["logged_in"] = True
             st.rerun()
         else:
@@ -223,6 +209,9 @@ def main():
     menu = [
         "Schüler hinzufügen", 
         "Barcode scannen", 
+        "⌨️ Handscanner",
+        "📦 Stapel-Scan", 
+        "📡 Live-Anwesenheit", 
         "📅 Logbuch filtern & exportieren", 
         "👨‍🏫 Schüler verwalten", 
         "📄 Impressum", 
@@ -237,7 +226,10 @@ def main():
         if st.button("Hinzufügen"):
             if barcode_id and student_name:
                 result = add_student(barcode_id, student_name)
-                st.success(result)
+                if result.startswith(("Fehler", "Datenbankfehler")):
+                    st.error(result)
+                else:
+                    st.success(result)
             else:
                 st.error("Bitte alle Felder ausfüllen.")
     elif choice == "Barcode scannen":
@@ -246,6 +238,18 @@ def main():
         st.info(f"Modus: **{mode}** – Jetzt Barcode scannen.")
         if st.button("Scanner starten"):
             start_scanner(mode)
+    elif choice == "⌨️ Handscanner":
+        from handscanner_view import handscanner_view
+
+        handscanner_view()
+    elif choice == "📦 Stapel-Scan":
+        from batch_scan_view import batch_scan_view
+
+        batch_scan_view()
+    elif choice == "📡 Live-Anwesenheit":
+        from live_dashboard import live_dashboard_view
+
+        live_dashboard_view()
     elif choice == "📅 Logbuch filtern & exportieren":
         logbuch_mit_filter()
     elif choice == "👨‍🏫 Schüler verwalten":
@@ -0,0 +1,243 @@
+"""Prüfung gelesener Codes, bevor sie nachgeschlagen oder protokolliert werden.
+
+Reihenfolge (billig zuerst): Symbologie -> Zeichensatz -> Format (Regex der Schule)
+-> Prüfziffer -> bekannte IDs (Menge im Speicher). Was hier scheitert, kostet keine
+DB-Abfrage – Fehllesungen und fremde Codes (EAN auf der Müslipackung) bleiben draußen.
+
+Einstellungen im Abschnitt [barcode] von settings.py (weiterhin auch per BARCODE_*):
+    symbologies  erlaubte Symbologien (pyzbar-Namen)
+    pattern      Regex für Ausweis-IDs (sonst SCHOOL_PATTERNS[untis.school] bzw. Standard)
+    check        Prüfziffer: luhn, gs1 oder mod11 (Standard: keine)
+    known_only   false = keine Vorprüfung gegen bekannte IDs
+Nach einer Änderung der Datei gilt beim nächsten validator()-Aufruf der neue Stand.
+Neue Schüler-IDs prüft check_new_id() gegen dasselbe Format (event_store.create_student/set_mapping).
+"""
+import re
+import threading
+import time
+from collections import Counter
+
+from scanner_core import DB_PATH
+from settings import on_change, settings
+from storage import storage
+
+# Schülerausweise; EAN/UPC (Lebensmittel, Bücher) sind bewusst nicht dabei
+SYMBOLOGIES = ("CODE128", "CODE39", "CODE93", "I25", "QRCODE")
+DEFAULT_PATTERN = r"[A-Za-z0-9][A-Za-z0-9_-]{2,31}"
+# Ausweisformate je Schule (Schlüssel wie UNTIS_SCHOOL), z. B. {"flb": r"\d{4,6}"}
+SCHOOL_PATTERNS = {}
+REASONS = ("symbology", "encoding", "format", "checksum", "unknown")
+# Anzeige in den Oberflächen ("unknown" meldet jede App selbst mit Hinweis zum Anlegen)
+REASON_TEXTS = {
+    "symbology": "Code-Typ nicht erlaubt",
+    "encoding": "unlesbare Zeichen",
+    "format": "falsches Format",
+    "checksum": "Prüfziffer falsch",
+}
+
+
+# ----------------------------
+# Prüfziffern
+# ----------------------------
+def luhn_ok(code):
+    if not code.isdigit() or len(code) < 2:
+        return False
+    total = 0
+    for i, ch in enumerate(reversed(code)):
+        digit = int(ch)
+        if i % 2:
+            digit *= 2
+            if digit > 9:
+                digit -= 9
+        total += digit
+    return total % 10 == 0
+
+
+def gs1_ok(code):
+    """Modulo 10 mit Gewichten 3/1 (EAN, ITF, GS1-Nummern)."""
+    if not code.isdigit() or len(code) < 2:
+        return False
+    total = sum(int(ch) * (3 if i % 2 else 1) for i, ch in enumerate(reversed(code[:-1]), start=1))
+    return (10 - total % 10) % 10 == int(code[-1])
+
+
+def mod11_ok(code):
+    """Modulo 11 mit Gewichten 2..7 von rechts, Prüfziffer 10 = X."""
+    body, check = code[:-1], code[-1:].upper()
+    if not body.isdigit() or not (check.isdigit() or check == "X"):
+        return False
+    total = sum(int(ch) * (2 + i % 6) for i, ch in enumerate(reversed(body)))
+    expected = (11 - total % 11) % 11
+    return check == ("X" if expected == 10 else str(expected))
+
+
+CHECKS = {"luhn": luhn_ok, "gs1": gs1_ok, "mod11": mod11_ok}
+
+
+# ----------------------------
+# Bekannte IDs
+# ----------------------------
+class KnownIds:
+    """Alle Schüler-IDs als Menge im Speicher.
+
+    Bei ein paar tausend Ausweisen ist eine exakte Menge klein genug (wenige 100 KB) –
+    ein Bloom-Filter lohnt sich erst bei Millionen IDs und hätte Fehlalarme.
+    """
+
+    def __init__(self, db_path=DB_PATH):
+        self.db_path = db_path
+        self.ids = None
+        self.loaded_at = 0.0
+        self.lock = threading.Lock()
+
+    def load(self):
+        ids = storage(self.db_path).student_ids()
+        with self.lock:
+            self.ids = ids
+            self.loaded_at = time.monotonic()
+
+    def __contains__(self, code):
+        if self.ids is None:
+            self.load()
+        if code in self.ids:
+            return True
+        # Vielleicht gerade angelegt (anderer Prozess) – gedrosselt neu laden, [cache] known_ids_recheck
+        if time.monotonic() - self.loaded_at >= settings().cache.known_ids_recheck:
+            self.load()
+            return code in self.ids
+        return False
+
+    def add(self, code):
+        if self.ids is not None:
+            with self.lock:
+                self.ids = self.ids | {code}
+
+    def invalidate(self):
+        self.loaded_at = 0.0
+
+
+# ----------------------------
+# Prüfung
+# ----------------------------
+class BarcodeValidator:
+    def __init__(self, symbologies=SYMBOLOGIES, pattern=DEFAULT_PATTERN, check=None,
+                 known_only=True, db_path=DB_PATH):
+        self.symbologies = frozenset(s.upper() for s in symbologies) if symbologies else None
+        self.pattern = re.compile(pattern)
+        self.check_digit = CHECKS[check] if check else None
+        self.known = KnownIds(db_path) if known_only else None
+        self.passed = 0
+        self.rejected = Counter()
+
+    def check(self, data, symbology=None):
+        """Rückgabe (code, None) wenn gültig, sonst (code oder None, Grund aus REASONS).
+
+        data: Bytes vom Decoder oder Text vom Handscanner; symbology nur bei Kamera-Scans.
+        """
+        code, reason = None, None
+        if symbology is not None and self.symbologies is not None and symbology.upper() not in self.symbologies:
+            reason = "symbology"
+        else:
+            code = self.text(data)
+            reason = self.id_problem(code)
+            if reason is None and self.known is not None and code not in self.known:
+                reason = "unknown"
+        if reason:
+            self.rejected[reason] += 1
+        else:
+            self.passed += 1
+        return code, reason
+
+    def id_problem(self, code):
+        """Grund, warum `code` kein gültiges Ausweisformat hat (encoding/format/checksum), sonst None."""
+        if code is None:
+            return "encoding"
+        if not self.pattern.fullmatch(code):
+            return "format"
+        if self.check_digit is not None and not self.check_digit(code):
+            return "checksum"
+        return None
+
+    @staticmethod
+    def text(data):
+        """Streng als UTF-8 dekodieren; Steuerzeichen oder kein Text (z. B. JSON-Zahl) -> ungültig."""
+        if isinstance(data, (bytes, bytearray)):
+            try:
+                data = data.decode("utf-8")
+            except UnicodeDecodeError:
+                return None
+        if not isinstance(data, str):
+            return None
+        data = data.strip()
+        if not data or not data.isprintable():
+            return None
+        return data
+
+    def zbar_symbols(self):
+        """Allow-List als pyzbar-ZBarSymbol-Liste – zbar sucht andere Symbologien gar nicht erst."""
+        if self.symbologies is None:
+            return None
+        from pyzbar.pyzbar import ZBarSymbol
+
+        return [ZBarSymbol[name] for name in sorted(self.symbologies) if name in ZBarSymbol.__members__]
+
+    def stats(self):
+        return {"passed": self.passed, **{reason: self.rejected[reason] for reason in REASONS}}
+
+
+def validator_from_settings(db_path=DB_PATH, school=None):
+    config = settings()
+    school = school if school is not None else config.untis.school
+    return BarcodeValidator(
+        symbologies=config.barcode.symbologies or SYMBOLOGIES,
+        pattern=config.barcode.pattern or SCHOOL_PATTERNS.get(school.lower(), DEFAULT_PATTERN),
+        check=config.barcode.check or None,
+        known_only=config.barcode.known_only,
+        db_path=db_path,
+    )
+
+
+_validators = {}
+_validators_lock = threading.Lock()
+
+
+def validator(db_path=DB_PATH):
+    """Der Validator des Prozesses für `db_path` (Regex einmal kompiliert, Zähler gemeinsam)."""
+    settings()  # geänderte Datei -> _barcode_changed verwirft die alten Validatoren
+    existing = _validators.get(db_path)
+    if existing is None:
+        with _validators_lock:
+            existing = _validators.setdefault(db_path, validator_from_settings(db_path))
+    return existing
+
+
+def _barcode_changed(old, new):
+    if old.barcode != new.barcode or old.untis.school != new.untis.school:
+        with _validators_lock:
+            _validators.clear()
+
+
+on_change(_barcode_changed)
+
+
+def check_new_id(student_id, db_path=DB_PATH):
+    """Vor dem Anlegen: eine ID, die jeder Scan als Fehllesung verwerfen würde, gar nicht erst annehmen.
+
+    ValueError mit Grund und Hinweis auf [barcode] pattern/check.
+    """
+    checker = validator(db_path)
+    reason = checker.id_problem(checker.text(student_id))
+    if reason:
+        raise ValueError(f"Barcode-ID {student_id!r} passt nicht zum Ausweisformat ({REASON_TEXTS[reason]}) – "
+                         "jeder Scan würde abgelehnt. Format in settings.toml unter [barcode] pattern/check.")
+
+
+def known_ids_changed(db_path=DB_PATH, added=None):
+    """Nach Anlegen/Ändern von Schülern aufrufen, damit neue IDs sofort gelten."""
+    existing = _validators.get(db_path)
+    if existing is None or existing.known is None:
+        return
+    if added is not None:
+        existing.known.add(added)
+    else:
+        existing.known.invalidate()
@@ -1,106 +1,38 @@
 import streamlit as st
 import sqlite3
-from pyzbar.pyzbar import decode
-import numpy as np
-from datetime import datetime
-from fpdf import FPDF
-import pandas as pd
-from PIL import Image
-import io
-import base64
+import event_store
+from scanner_core import (
+    DB_PATH, export_log_pdf, fetch_logs_for_report, fetch_students, initialize_database,
+)
+from settings import settings
+
+# pyzbar, PIL, pandas und fpdf werden erst in der Ansicht geladen, die sie braucht.
 
 # ----------------------------
-# Konfiguration & Login
+# Konfiguration & Login (Zugänge, DB-Pfad usw. in settings.py)
 # ----------------------------
 st.set_page_config(page_title="Barcode-Scanner FLB", page_icon="📷", layout="wide")
-USER_CREDENTIALS = {"admin": "flb23"}
 
 # ----------------------------
 # Datenbank-Helfer
 # ----------------------------
-DB_PATH = "students.db"
-
-def initialize_database():
-    with sqlite3.connect(DB_PATH) as connection:
-        cursor = connection.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS students (
-                id TEXT PRIMARY KEY,
-                name TEXT NOT NULL
-            )
-        ''')
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS log (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                student_id TEXT,
-                name TEXT,
-                date TEXT,
-                time TEXT,
-                action TEXT
-            )
-        ''')
-        connection.commit()
 
 def add_student(barcode_id, student_name):
     try:
-        with sqlite3.connect(DB_PATH) as connection:
-            cursor = connection.cursor()
-            cursor.execute(
-                "INSERT INTO students (id, name) VALUES (?, ?)",
-                (barcode_id.strip(), student_name.strip())
-            )
-            connection.commit()
-            return f"Schüler {student_name} mit Barcode-ID {barcode_id} erfolgreich hinzugefügt."
+        event_store.create_student(barcode_id.strip(), student_name.strip(), db_path=DB_PATH)
+        return f"Schüler {student_name} mit Barcode-ID {barcode_id} erfolgreich hinzugefügt."
     except sqlite3.IntegrityError:
         return "Fehler: Diese Barcode-ID existiert bereits."
+    except ValueError as e:
+        return f"Fehler: {e}"
     except sqlite3.Error as e:
         return f"Datenbankfehler: {e}"
 
-def get_student_name(barcode_id):
-    with sqlite3.connect(DB_PATH) as connection:
-        cursor = connection.cursor()
-        cursor.execute("SELECT name FROM students WHERE id = ?", (barcode_id,))
-        result = cursor.fetchone()
-        return result[0] if result else None
-
-def log_scan(student_id, name, action):
-    now = datetime.now()
-    date = now.strftime("%Y-%m-%d")
-    time = now.strftime("%H:%M:%S")
-    with sqlite3.connect(DB_PATH) as connection:
-        cursor = connection.cursor()
-        cursor.execute(
-            "INSERT INTO log (student_id, name, date, time, action) VALUES (?, ?, ?, ?, ?)",
-            (student_id, name, date, time, action)
-        )
-        connection.commit()
-
-def fetch_logs_by_date(date_str):
-    with sqlite3.connect(DB_PATH) as connection:
-        cursor = connection.cursor()
-        cursor.execute(
-            "SELECT student_id, name, date, time, action FROM log WHERE date = ? ORDER BY time ASC",
-            (date_str,)
-        )
-        return cursor.fetchall()
-
-def fetch_all_students():
-    with sqlite3.connect(DB_PATH) as connection:
-        cursor = connection.cursor()
-        cursor.execute("SELECT id, name FROM students ORDER BY name ASC")
-        return cursor.fetchall()
-
 def update_student_name(student_id, new_name):
-    with sqlite3.connect(DB_PATH) as connection:
-        cursor = connection.cursor()
-        cursor.execute("UPDATE students SET name = ? WHERE id = ?", (new_name, student_id))
-        connection.commit()
+    event_store.rename_student(student_id, new_name, db_path=DB_PATH)
 
 def delete_student(student_id):
-    with sqlite3.connect(DB_PATH) as connection:
-        cursor = connection.cursor()
-        cursor.execute("DELETE FROM students WHERE id = ?", (student_id,))
-        connection.commit()
+    event_store.delete_student(student_id, db_path=DB_PATH)
 
 # ----------------------------
 # UI-Komponenten
@@ -119,7 +51,7 @@ def login_page():
     username = st.text_input("Benutzername:", value="admin")
     password = st.text_input("Passwort:", type="password")
     if st.button("Login"):
-        if USER_CREDENTIALS.get(username) == password:
+        if settings().auth.users.get(username) == password:
             st.session_state["logged_in"] = True
             st.success("Erfolgreich angemeldet.")
             st.rerun()
@@ -131,20 +63,7 @@ def export_filtered_log_to_pdf(logs, selected_date):
         st.warning("Keine Daten zum Exportieren.")
         return
 
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_font("Arial", size=12)
-    pdf.cell(200, 10, txt=f"Schüler-Logbuch für {selected_date}", ln=True, align='C')
-    pdf.ln(10)
-
-    for log in logs:
-        # log = (student_id, name, date, time, action)
-        line = f"{log[2]} {log[3]} - {log[1]} ({log[0]}) - {log[4]}"
-        pdf.cell(200, 10, txt=line, ln=True)
-
-    filename = f"logbuch_{selected_date}.pdf"
-    pdf_bytes = pdf.output(dest="S").encode("latin-1", "ignore")
-
+    filename, pdf_bytes = export_log_pdf(logs, selected_date)
     st.download_button(
         "📄 PDF herunterladen",
         data=pdf_bytes,
@@ -153,53 +72,6 @@ def export_filtered_log_to_pdf(logs, selected_date):
         use_container_width=True
     )
 
-# ----------------------------
-# Scanner (Browser-Kamera)
-# ----------------------------
-def decode_barcodes_from_image(pil_image):
-    """pyzbar kann direkt auf PIL-Images arbeiten."""
-    results = decode(pil_image)
-    out = []
-    for r in results:
-        try:
-            data = r.data.decode("utf-8", errors="ignore")
-        except Exception:
-            data = str(r.data)
-        out.append({"type": r.type, "data": data})
-    return out
-
-def scanner_view():
-    st.subheader("🎦 Barcode scannen (Browser-Kamera)")
-    mode = st.radio("Modus:", ["Anmeldung", "Abmeldung"], horizontal=True)
-    st.caption("Hinweis: Die Kamera läuft im **Browser**. Jede Person nutzt ihre **eigene Webcam**.")
-
-    # st.camera_input nimmt ein Foto auf (Snapshot). Für „Live-Scan“ bräuchte man JS/streamlit-webrtc.
-    img_file = st.camera_input("Kamera freigeben und Foto aufnehmen")
-
-    if img_file is not None:
-        pil_img = Image.open(img_file)
-        results = decode_barcodes_from_image(pil_img)
-
-        if not results:
-            st.warning("Kein Barcode/QR erkannt. Bitte näher ran oder besseres Licht.")
-            return
-
-        st.success(f"{len(results)} Code(s) erkannt:")
-        for res in results:
-            st.write(f"- **{res['type']}**: `{res['data']}`")
-            code = res["data"]
-            student_name = get_student_name(code)
-            if student_name:
-                log_scan(code, student_name, mode)
-                st.info(f"✅ {mode} registriert: **{student_name}** ({code}) um {datetime.now().strftime('%H:%M:%S')}")
-            else:
-                st.warning("Kein Schüler mit diesem Barcode gefunden. Lege ihn im Menü 'Schüler hinzufügen' an.")
-
-        st.button("Neues Foto machen", type="primary")
-
-# ----------------------------
-# Schüler-Verwaltung
-# ----------------------------
 def schueler_hinzufuegen_view():
     st.subheader("🧑 Neuer Schüler")
     barcode_id = st.text_input("Barcode-ID:")
@@ -218,13 +90,13 @@ def schueler_hinzufuegen_view():
 
 def schueler_verwalten_view():
     st.subheader("👨‍🏫 Schüler bearbeiten oder löschen")
-    schueler_liste = fetch_all_students()
+    schueler_liste = fetch_students()
 
     if not schueler_liste:
         st.info("Noch keine Schüler in der Datenbank.")
         return
 
-    auswahl = st.selectbox("Schüler auswählen", [f"{name} ({sid})" for sid, name in schueler_liste])
+    auswahl = st.selectbox("Schüler auswählen", [f"{name} ({sid})" for sid, name, *_ in schueler_liste])
     ausgewählte_id = auswahl.split("(")[-1].strip(")")
 
     new_name = st.text_input("Neuer Name (optional):")
@@ -253,12 +125,14 @@ def logbuch_mit_filter_view():
         return
     date_str = selected_date.strftime("%Y-%m-%d")
 
-    logs = fetch_logs_by_date(date_str)
+    logs = fetch_logs_for_report(date_str)
     if logs:
+        import pandas as pd
+
         st.success(f"{len(logs)} Einträge gefunden für {date_str}")
         df = pd.DataFrame(
             logs,
-            columns=["Barcode-ID", "Name", "Datum", "Uhrzeit", "Aktion"]
+            columns=["Barcode-ID", "Name", "Datum", "Uhrzeit", "Aktion", "Klasse"]
         )
         st.dataframe(df, use_container_width=True)
         # PDF & CSV
@@ -309,6 +183,9 @@ def main():
     menu = [
         "Schüler hinzufügen",
         "Barcode scannen",
+        "⌨️ Handscanner",
+        "📦 Stapel-Scan",
+        "📡 Live-Anwesenheit",
         "📅 Logbuch filtern & exportieren",
         "👨‍🏫 Schüler verwalten",
         "📄 Impressum",
@@ -319,7 +196,21 @@ def main():
     if choice == "Schüler hinzufügen":
         schueler_hinzufuegen_view()
     elif choice == "Barcode scannen":
-        scanner_view()
+        from photo_scan_view import photo_scan_view
+
+        photo_scan_view("Kein Schüler mit diesem Barcode gefunden. Lege ihn im Menü 'Schüler hinzufügen' an.")
+    elif choice == "⌨️ Handscanner":
+        from handscanner_view import handscanner_view
+
+        handscanner_view()
+    elif choice == "📦 Stapel-Scan":
+        from batch_scan_view import batch_scan_view
+
+        batch_scan_view()
+    elif choice == "📡 Live-Anwesenheit":
+        from live_dashboard import live_dashboard_view
+
+        live_dashboard_view()
     elif choice == "📅 Logbuch filtern & exportieren":
         logbuch_mit_filter_view()
     elif choice == "👨‍🏫 Schüler verwalten":
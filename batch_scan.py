@@ -0,0 +1,205 @@
+"""Stapel-Scan: viele Fotos (einzeln oder als ZIP) parallel decodieren und auf einmal eintragen.
+
+Decodiert wird in einem Prozess-Pool: JPEG-Laden, Graustufen und zbar laufen so auf allen
+Kernen, ohne sich die GIL des Streamlit-Prozesses zu teilen. Die Codes aller Bilder werden danach geprüft (barcode_check), mit einer
+IN-Abfrage aufgelöst und in einer einzigen Transaktion protokolliert – wie alle Scan-Wege über
+offline_queue.record_codes: Ist die DB nicht erreichbar, wird der Stapel vorgemerkt und nachgesendet.
+
+    python batch_scan.py klasse_5a.zip --action Anmeldung --workers 4
+"""
+import argparse
+import io
+import multiprocessing
+import os
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from offline_queue import record_codes
+from scanner_core import DB_PATH
+from settings import settings
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp")
+
+
+# ----------------------------
+# Eingabe
+# ----------------------------
+def expand_uploads(files):
+    """(name, bytes)-Paare aus Bildern und ZIP-Archiven (Ordner im ZIP werden durchlaufen).
+
+    Anzahl und entpackte Größe ([batch] max_images, max_upload_mib) werden anhand des
+    ZIP-Verzeichnisses geprüft, bevor ein Eintrag gelesen wird – eine ZIP-Bombe landet so
+    gar nicht erst im Speicher. ValueError, wenn der Stapel zu groß ist.
+    """
+    config = settings().batch
+    items, total = [], 0
+
+    def admit(count, size):
+        nonlocal total
+        total += size
+        if len(items) + count > config.max_images:
+            raise ValueError(f"Höchstens {config.max_images} Bilder pro Stapel")
+        if total > config.max_upload_mib * 1024 * 1024:
+            raise ValueError(f"Höchstens {config.max_upload_mib} MiB Bilder pro Stapel (entpackt)")
+
+    for name, data in files:
+        if name.lower().endswith(".zip"):
+            with zipfile.ZipFile(io.BytesIO(data)) as archive:
+                members = [
+                    info for info in archive.infolist()
+                    if not (info.is_dir() or os.path.basename(info.filename).startswith(".")
+                            or "__MACOSX" in info.filename)
+                    and info.filename.lower().endswith(IMAGE_EXTENSIONS)
+                ]
+                admit(len(members), sum(info.file_size for info in members))
+                items.extend((info.filename, archive.read(info)) for info in members)
+        elif name.lower().endswith(IMAGE_EXTENSIONS):
+            admit(1, len(data))
+            items.append((name, data))
+    return items
+
+
+# ----------------------------
+# Decodieren (läuft in den Worker-Prozessen)
+# ----------------------------
+def decode_image(item, symbols=None, decode=True):
+    """(name, bytes) -> (name, [(symbologie, rohdaten)], fehler). Muss picklebar bleiben."""
+    from frames import open_gray, thread_decoder
+
+    name, data = item
+    try:
+        gray = open_gray(io.BytesIO(data))
+        if not decode:
+            return name, [], None
+        return name, [(r.type, r.data) for r in thread_decoder(symbols).decode(gray)], None
+    except Exception as e:
+        return name, [], f"{type(e).__name__}: {e}"
+
+
+def default_workers():
+    """[pools] batch_workers, bei 0: Kerne - 1 (höchstens 8)."""
+    return settings().pools.batch_workers or max(1, min(8, (os.cpu_count() or 2) - 1))
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def pool(workers):
+    """Prozess-Pool wiederverwenden (Streamlit-Reruns, mehrere Stapel hintereinander).
+
+    "spawn" statt fork: der Streamlit-Prozess hat viele Threads, ein fork dort ist unsicher.
+    Die Startkosten fallen nur beim ersten Stapel an.
+    """
+    with _pools_lock:
+        existing = _pools.get(workers)
+        if existing is None:
+            existing = _pools[workers] = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+            )
+        return existing
+
+
+def decode_images(items, workers=None, symbols=None, progress=None, decode=True):
+    """Alle Bilder decodieren; progress(fertig, gesamt) nach jedem Bild. Rückgabe in Eingabereihenfolge."""
+    work = partial(decode_image, symbols=symbols, decode=decode)
+    workers = workers or default_workers()
+    if workers <= 1 or len(items) <= 1:
+        results = []
+        for item in items:
+            results.append(work(item))
+            if progress:
+                progress(len(results), len(items))
+        return results
+    results = []
+    # chunksize: Bilder pro Auftrag an einen Worker (weniger Pickle-Rundläufe)
+    for result in pool(workers).map(work, items, chunksize=settings().batch.chunksize):
+        results.append(result)
+        if progress:
+            progress(len(results), len(items))
+    return results
+
+
+# ----------------------------
+# Auswerten & Eintragen
+# ----------------------------
+def scan_batch(files, action, entrance=None, workers=None, db_path=DB_PATH, progress=None):
+    """Kompletter Stapel: entpacken, parallel decodieren, prüfen, eine Transaktion.
+
+    Rückgabe-dict: images, per_image [(name, [codes], fehler)], registered [(code, name, status)]
+    (status "queued": offline vorgemerkt), rejected {grund: n}, no_code [namen], errors [(name, fehler)].
+    """
+    from barcode_check import validator
+
+    check = validator(db_path)
+    items = expand_uploads(files)
+    decoded = decode_images(items, workers, check.zbar_symbols(), progress)
+
+    codes, per_image, no_code, errors = [], [], [], []
+    rejected = {}
+    for name, reads, error in decoded:
+        if error:
+            errors.append((name, error))
+        found = []
+        for symbology, raw in reads:
+            code, reason = check.check(raw, symbology)
+            if reason in (None, "unknown"):
+                found.append(code)       # unbekannte IDs erscheinen in der Übersicht als "unbekannt"
+            else:
+                rejected[reason] = rejected.get(reason, 0) + 1
+        if not found and not error:
+            no_code.append(name)
+        per_image.append((name, found, error))
+        codes.extend(found)
+
+    # Derselbe Ausweis auf mehreren Fotos zählt einmal
+    unique = list(dict.fromkeys(codes))
+    registered = record_codes(unique, action, entrance, db_path) if unique else []
+    return {
+        "images": len(items),
+        "per_image": per_image,
+        "registered": registered,
+        "rejected": rejected,
+        "no_code": no_code,
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stapel-Scan aus Bildern/ZIP")
+    parser.add_argument("files", nargs="+")
+    parser.add_argument("--action", default="Anmeldung", choices=["Anmeldung", "Abmeldung"])
+    parser.add_argument("--entrance")
+    parser.add_argument("--workers", type=int, help="Standard: [pools] batch_workers")
+    parser.add_argument("--db", default=DB_PATH)
+    args = parser.parse_args()
+
+    files = []
+    for path in args.files:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                for name in sorted(names):
+                    with open(os.path.join(root, name), "rb") as f:
+                        files.append((os.path.join(root, name), f.read()))
+        else:
+            with open(path, "rb") as f:
+                files.append((path, f.read()))
+
+    def show(done, total):
+        print(f"\r{done}/{total} Bilder", end="", flush=True)
+
+    summary = scan_batch(files, args.action, args.entrance, args.workers, args.db, show)
+    print()
+    icons = {"accepted": "✅", "queued": "⏳"}
+    for code, name, status in summary["registered"]:
+        print(f"{icons.get(status, '❌')} {name or ('offline vorgemerkt' if status == 'queued' else 'Unbekannt')} ({code})")
+    queued = sum(1 for *_, s in summary["registered"] if s == "queued")
+    print(f"{summary['images']} Bilder, {sum(1 for *_, s in summary['registered'] if s == 'accepted')} eingetragen, "
+          f"{queued} vorgemerkt, {len(summary['no_code'])} ohne Code, {sum(summary['rejected'].values())} fremde Codes, "
+          f"{len(summary['errors'])} Fehler")
+
+
+if __name__ == "__main__":
+    main()
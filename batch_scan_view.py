@@ -0,0 +1,67 @@
+"""Streamlit-Ansicht "Stapel-Scan" (gemeinsam für alle drei Apps)."""
+from datetime import datetime
+
+import streamlit as st
+
+from batch_scan import scan_batch
+from settings import settings
+
+
+def batch_scan_view():
+    st.subheader("📦 Stapel-Scan (mehrere Fotos / ZIP)")
+    mode = st.radio("Modus:", ["Anmeldung", "Abmeldung"], horizontal=True, key="batch_mode")
+    st.caption(f"Fotos von Ausweisen oder einen ZIP-Ordner mit Klassenfotos hochladen (bis {settings().batch.max_images} Bilder). "
+               "Alle Codes werden parallel gelesen und in einem Schritt eingetragen.")
+    # Formular: das Hochladen allein startet noch nichts
+    with st.form("batch_form", clear_on_submit=True):
+        uploads = st.file_uploader("Bilder oder ZIP", accept_multiple_files=True,
+                                   type=["jpg", "jpeg", "png", "bmp", "tif", "tiff", "webp", "zip"])
+        submitted = st.form_submit_button("Alle einlesen", type="primary")
+    if not submitted:
+        return
+    if not uploads:
+        st.warning("Keine Dateien ausgewählt.")
+        return
+
+    bar = st.progress(0.0, text="Bilder werden gelesen …")
+
+    def progress(done, total):
+        bar.progress(done / total, text=f"{done}/{total} Bilder gelesen")
+
+    started = datetime.now()
+    try:
+        summary = scan_batch([(f.name, f.getvalue()) for f in uploads], mode, progress=progress)
+    except (ValueError, OSError) as e:
+        bar.empty()
+        st.error(f"Stapel konnte nicht gelesen werden: {e}")
+        return
+    seconds = (datetime.now() - started).total_seconds()
+    bar.progress(1.0, text=f"{summary['images']} Bilder in {seconds:.1f} s")
+
+    registered = summary["registered"]
+    ok = [(code, name) for code, name, status in registered if status == "accepted"]
+    queued = [code for code, _, status in registered if status == "queued"]
+    unknown = [code for code, _, status in registered if status not in ("accepted", "queued")]
+    col1, col2, col3, col4, col5 = st.columns(5)
+    col1.metric("Bilder", summary["images"])
+    col2.metric(f"{mode} eingetragen", len(ok))
+    col3.metric("Offline vorgemerkt", len(queued))
+    col4.metric("Unbekannte Codes", len(unknown))
+    col5.metric("Ohne Code", len(summary["no_code"]))
+
+    if ok:
+        st.success(f"{len(ok)} × {mode} registriert um {datetime.now().strftime('%H:%M:%S')}: "
+                   + ", ".join(f"**{name}**" for _, name in ok))
+    if queued:
+        st.info(f"⏳ Datenbank nicht erreichbar – {len(queued)} Scan(s) offline gespeichert, "
+                "werden automatisch nachgetragen.")
+    if unknown:
+        st.warning("Unbekannte Codes: " + ", ".join(f"`{code}`" for code in unknown))
+    if summary["rejected"]:
+        st.info("Fremde Codes ignoriert: " + ", ".join(f"{reason}: {n}" for reason, n in summary["rejected"].items()))
+    if summary["no_code"] or summary["errors"]:
+        with st.expander(f"Bilder ohne Ausweis-Code ({len(summary['no_code']) + len(summary['errors'])})"):
+            for name in summary["no_code"]:
+                st.write(f"- {name}")
+            for name, error in summary["errors"]:
+                st.write(f"- {name}: {error}")
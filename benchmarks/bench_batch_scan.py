@@ -0,0 +1,76 @@
+"""Benchmark: Stapel-Scan – Bilder pro Sekunde je Anzahl Worker-Prozesse.
+
+Erzeugt synthetische Ausweisfotos (JPEG, Strichmuster auf Hintergrund) und decodiert sie
+mit batch_scan.decode_images. Der Pool wird vor der Messung einmal aufgewärmt, damit der
+Prozessstart nicht mitgezählt wird. Ohne zbar-Bibliothek wird nur Laden + Graustufen gemessen.
+
+    python benchmarks/bench_batch_scan.py --images 200 --workers 1 2 4 8
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch_scan import decode_images, pool  # noqa: E402
+
+
+def make_images(count, width, height):
+    from PIL import Image
+
+    rng = np.random.default_rng(3)
+    images = []
+    for i in range(count):
+        pixels = rng.integers(90, 160, (height, width), dtype=np.uint8)
+        x, y = width // 4 + (i % 7) * 10, height // 3
+        pixels[y: y + height // 4, x: x + width // 2] = 250
+        for stripe in range(0, width // 2 - 20, 9):
+            pixels[y + 10: y + height // 4 - 10, x + 10 + stripe: x + 13 + stripe + (i + stripe) % 4] = 10
+        buffer = io.BytesIO()
+        Image.fromarray(pixels).convert("RGB").save(buffer, "JPEG", quality=85)
+        images.append((f"foto_{i:04d}.jpg", buffer.getvalue()))
+    return images
+
+
+def zbar_available():
+    try:
+        from pyzbar import pyzbar  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--images", type=int, default=200)
+    parser.add_argument("--width", type=int, default=1600)
+    parser.add_argument("--height", type=int, default=1200)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    decode = zbar_available()
+    images = make_images(args.images, args.width, args.height)
+    size = sum(len(data) for _, data in images) / len(images) / 1024
+    print(f"{args.images} JPEGs {args.width}x{args.height} (Ø {size:.0f} KiB), {os.cpu_count()} CPU-Kerne, "
+          f"Decodieren: {'zbar' if decode else 'nein (kein zbar) – nur Laden + Graustufen'}")
+    baseline = None
+    for workers in args.workers:
+        if workers > 1:
+            decode_images(images[:workers * 2], workers, decode=decode)   # Pool aufwärmen
+        start = time.perf_counter()
+        decode_images(images, workers, decode=decode)
+        elapsed = time.perf_counter() - start
+        rate = args.images / elapsed
+        baseline = baseline or rate
+        print(f"{workers:2d} Worker: {rate:7.1f} Bilder/s  ({elapsed:5.2f} s, x{rate / baseline:4.2f})")
+    for workers in args.workers:
+        if workers > 1:
+            pool(workers).shutdown()
+
+
+if __name__ == "__main__":
+    main()
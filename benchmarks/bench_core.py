@@ -0,0 +1,82 @@
+"""Benchmark: gemeinsame Kern-API (scanner_core), über die alle drei Oberflächen laufen.
+
+Misst je Baustein mit einer temporären DB (2000 Schüler):
+
+    Nachschlagen  get_student_name einzeln, lookup_names für einen Stapel
+    Protokoll     log_scan einzeln, register_codes im Stapel (Handscanner, Stapel-Scan)
+    Decodieren    decode_barcodes auf einem Kamerabild (nur mit zbar-Bibliothek)
+    Export        fetch_logs_for_report + export_log_pdf für einen Schultag
+
+Verbesserungen am Kern zeigen sich hier für app.py, barcode_scanner_client.py und
+scanner_webuntis.py gleichermaßen.
+
+    python benchmarks/bench_core.py --scans 2000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_batch_scan import zbar_available  # noqa: E402
+from bench_scan_api import STUDENTS, make_db  # noqa: E402
+
+import scanner_core  # noqa: E402
+
+
+def timed(label, count, unit, func):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:34s} {count:6d} {unit:8s} {elapsed:6.2f} s  {count / elapsed:9.0f} {unit}/s"
+          f"  ({elapsed / count * 1000:.3f} ms)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scans", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=50, help="Codes pro register_codes-Aufruf")
+    args = parser.parse_args()
+
+    rng = random.Random(5)
+    codes = [str(100000 + rng.randrange(STUDENTS)) for _ in range(args.scans)]
+    with tempfile.TemporaryDirectory() as tmp:
+        db = os.path.join(tmp, "students.db")
+        make_db(db)
+        scanner_core.initialize_database(db)
+
+        timed("Nachschlagen einzeln", len(codes), "Codes",
+              lambda: [scanner_core.get_student_name(code, db) for code in codes])
+        connection = scanner_core.pooled(db)
+        timed(f"Nachschlagen je {args.batch}", len(codes), "Codes",
+              lambda: [scanner_core.lookup_names(codes[i:i + args.batch], connection)
+                       for i in range(0, len(codes), args.batch)])
+
+        timed("log_scan einzeln", len(codes), "Scans",
+              lambda: [scanner_core.log_scan(code, f"Schüler {code}", "Anmeldung", db) for code in codes])
+        timed(f"register_codes je {args.batch}", len(codes), "Scans",
+              lambda: [scanner_core.register_codes(codes[i:i + args.batch], "Abmeldung", None, db)
+                       for i in range(0, len(codes), args.batch)])
+
+        if zbar_available():
+            import numpy as np
+
+            gray = np.random.default_rng(1).integers(0, 255, (720, 1280), dtype=np.uint8)
+            timed("decode_barcodes 1280x720", 50, "Bilder",
+                  lambda: [scanner_core.decode_barcodes(gray, db) for _ in range(50)])
+        else:
+            print(f"{'decode_barcodes':34s} übersprungen (keine zbar-Bibliothek)")
+
+        today = datetime.now().strftime("%Y-%m-%d")
+        logs = scanner_core.fetch_logs_for_report(today, db)
+        timed("Logbuch lesen", len(logs), "Zeilen", lambda: scanner_core.fetch_logs_for_report(today, db))
+        timed("PDF-Export", len(logs), "Zeilen", lambda: scanner_core.export_log_pdf(logs, today))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Benchmark: Kosten der Live-Anwesenheit (GET /events) bei 1, 10 und 50 offenen Dashboards.
+
+Startet scan_api.py mit einer temporären DB (wie bench_scan_api.py), öffnet N SSE-Verbindungen
+und schickt Scans in festem Takt. Gemessen werden CPU-Zeit des Servers während der
+Scan-Phase und die Zeit vom Absenden eines Scans bis er bei allen Dashboards angekommen ist.
+
+    python benchmarks/bench_dashboard.py --scans 300 --rate 50 --viewers 1 10 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_scan_api import STUDENTS, TOKEN, make_db, request, start_server, wait_for_port  # noqa: E402
+
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+def cpu_seconds(pid):
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+
+
+class Viewer:
+    def __init__(self):
+        self.received = []   # Empfangszeit je Scan
+        self.ready = asyncio.Event()
+
+    async def run(self, port):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(f"GET /events HTTP/1.1\r\nHost: x\r\nAuthorization: Bearer {TOKEN}\r\n"
+                     "Accept: text/event-stream\r\n\r\n".encode())
+        await reader.readuntil(b"\r\n\r\n")
+        try:
+            while True:
+                block = await reader.readuntil(b"\n\n")
+                if block.startswith(b"event: snapshot"):
+                    self.ready.set()
+                elif block.startswith(b"event: scan"):
+                    now = time.perf_counter()
+                    data = block.split(b"data: ", 1)[1]
+                    self.received.extend([now] * len(json.loads(data)))
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+
+async def measure(port, pid, viewers, scans, rate):
+    await wait_for_port(port)
+    clients = [Viewer() for _ in range(viewers)]
+    tasks = [asyncio.create_task(v.run(port)) for v in clients]
+    await asyncio.gather(*(v.ready.wait() for v in clients))
+
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    rng = random.Random(1)
+    sent = []
+    cpu0 = cpu_seconds(pid)
+    start = time.perf_counter()
+    for i in range(scans):
+        await asyncio.sleep(max(0.0, start + i / rate - time.perf_counter()))
+        sent.append(time.perf_counter())
+        await request(reader, writer, "POST", "/scans",
+                      {"code": str(100000 + rng.randrange(STUDENTS)), "action": rng.choice(["Anmeldung", "Abmeldung"]),
+                       "entrance": rng.choice(["Nord", "Süd"])})
+    deadline = time.perf_counter() + 5
+    while any(len(v.received) < scans for v in clients) and time.perf_counter() < deadline:
+        await asyncio.sleep(0.01)
+    cpu = cpu_seconds(pid) - cpu0
+    writer.close()
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    latencies = sorted(
+        max(v.received[i] for v in clients) - sent[i]
+        for i in range(scans) if all(len(v.received) > i for v in clients)
+    )
+    return cpu, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scans", type=int, default=300)
+    parser.add_argument("--rate", type=float, default=50, help="Scans pro Sekunde")
+    parser.add_argument("--viewers", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--port", type=int, default=8797)
+    parser.add_argument("--cpu", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{args.scans} Scans mit {args.rate:g}/s; Server-CPU während der Scan-Phase")
+    for viewers in args.viewers:
+        with tempfile.TemporaryDirectory() as tmp:
+            db = os.path.join(tmp, "students.db")
+            make_db(db)
+            proc = start_server(db, args.port, args.cpu)
+            try:
+                cpu, lat = asyncio.run(measure(args.port, proc.pid, viewers, args.scans, args.rate))
+            finally:
+                proc.terminate()
+                proc.wait()
+        if lat:
+            print(f"{viewers:3d} Dashboards: CPU {cpu:5.2f} s ({cpu / args.scans * 1000:5.2f} ms/Scan)  "
+                  f"bei allen angekommen: median {lat[len(lat) // 2] * 1000:5.1f} ms, "
+                  f"p99 {lat[int(len(lat) * 0.99)] * 1000:5.1f} ms  ({len(lat)}/{args.scans})")
+        else:
+            print(f"{viewers:3d} Dashboards: keine Scans angekommen")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Benchmark: Projektionen aus einem Schuljahr Ereignisse neu aufbauen.
+
+Erzeugt in einer temporären DB ein Jahr Ereignisse (Standard: 1200 Schüler, 190 Schultage,
+An- und Abmeldung je Tag ≈ 456 000 Scans, dazu Umbenennungen, WebUntis-Abgleiche,
+Abgänge und neu vergebene Ausweise) und vergleicht:
+
+    naiv        jedes Ereignis einzeln projizieren (wie live, nur in einer Transaktion)
+    rebuild     event_store.rebuild ohne Snapshot (Schüler in Python, log mengenbasiert)
+    +snapshot   rebuild mit Snapshot der Vornacht (nur die Ereignisse des letzten Tages nachspielen)
+
+Alle drei Varianten müssen dieselben Tabellen ergeben.
+
+    python benchmarks/bench_event_store.py --students 1200 --days 190
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import event_store  # noqa: E402
+from scanner_core import connect, initialize_database, project_scan  # noqa: E402
+
+
+def school_days(count):
+    day = date(2025, 8, 18)
+    while count:
+        if day.weekday() < 5:
+            yield day
+            count -= 1
+        day += timedelta(days=1)
+
+
+def make_events(students, days, seed=7):
+    """[(kind, student_id, at, scan_id, data)] in zeitlicher Reihenfolge."""
+    rng = random.Random(seed)
+    names = {f"{100000 + i}": f"Schüler {i}" for i in range(students)}
+    events = [("student_created", sid, "2025-08-01T08:00:00.000", None,
+               {"name": name, "klass": f"{5 + i % 8}{'abc'[i % 3]}", "untis_student_id": str(i)})
+              for i, (sid, name) in enumerate(names.items())]
+    alive = list(names)
+    for number, day in enumerate(school_days(days)):
+        stamp = day.isoformat()
+        for sid in rng.sample(alive, rng.randint(len(alive) * 4 // 5, len(alive))):
+            for action, hour in (("Anmeldung", 7), ("Abmeldung", 13)):
+                at = f"{stamp}T{hour + rng.randint(0, 2):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}.000"
+                events.append(("scan", sid, at, f"{sid}-{stamp}-{action}", {"name": names[sid], "action": action,
+                                                                            "entrance": rng.choice(["Nord", "Süd"])}))
+        at = f"{stamp}T16:00:00.000"
+        for sid in rng.sample(alive, 2):
+            names[sid] = names[sid] + "-" + rng.choice(["Meyer", "Yilmaz", "Nowak"])
+            events.append(("student_renamed", sid, at, None, {"name": names[sid]}))
+        if number % 5 == 0:
+            for sid in rng.sample(alive, 5):
+                events.append(("mapping_changed", sid, at, None,
+                               {"name": names[sid], "klass": f"{rng.randint(5, 12)}x", "untis_student_id": sid}))
+        if number % 20 == 19:
+            # Abgang; der Ausweis wird später an jemand anderen vergeben
+            sid = rng.choice(alive)
+            events.append(("student_deleted", sid, at, None, {}))
+            names[sid] = f"Nachfolger {number}"
+            events.append(("student_created", sid, f"{stamp}T16:30:00.000", None,
+                           {"name": names[sid], "klass": "5n", "untis_student_id": None}))
+    return events
+
+
+def fill(db, events):
+    initialize_database(db)
+    with connect(db) as con:
+        con.executemany(
+            "INSERT INTO events (kind, student_id, at, scan_id, data) VALUES (?, ?, ?, ?, ?)",
+            [(k, sid, at, scan_id, json.dumps(data, ensure_ascii=False)) for k, sid, at, scan_id, data in events],
+        )
+        con.commit()
+
+
+def naive(con):
+    """Ereignis für Ereignis mit den Live-Projektionen."""
+    for table in ("students", "student_history", "log"):
+        con.execute(f"DELETE FROM {table}")
+    rows = con.execute("SELECT seq, kind, student_id, at, scan_id, data FROM events ORDER BY seq").fetchall()
+    for seq, kind, student_id, at, scan_id, data in rows:
+        data = json.loads(data)
+        if kind == "scan":
+            name = con.execute("SELECT name FROM students WHERE id = ?", (student_id,)).fetchone()
+            project_scan(con, seq, student_id, name[0] if name else data["name"], at[:10], at[11:19],
+                         data["action"], scan_id, at, data.get("entrance"))
+        else:
+            event_store.project_student_event(con, seq, kind, student_id, data, at)
+
+
+def tables(con):
+    return [con.execute(f"SELECT * FROM {t} ORDER BY id").fetchall() for t in ("log", "student_history", "students")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--students", type=int, default=1200)
+    parser.add_argument("--days", type=int, default=190)
+    args = parser.parse_args()
+
+    events = make_events(args.students, args.days)
+    last_day = max(at[:10] for kind, _, at, _, _ in events)
+    with tempfile.TemporaryDirectory() as tmp:
+        db = os.path.join(tmp, "students.db")
+        fill(db, events)
+        con = sqlite3.connect(db)
+        counts = dict(con.execute("SELECT kind, COUNT(*) FROM events GROUP BY kind").fetchall())
+        print(f"{len(events)} Ereignisse: " + ", ".join(f"{k} {v}" for k, v in sorted(counts.items())))
+
+        start = time.perf_counter()
+        naive(con)
+        print(f"naiv        {time.perf_counter() - start:6.2f} s")
+        expected = tables(con)
+        con.rollback()
+
+        start = time.perf_counter()
+        timings = event_store.rebuild(con, use_snapshot=False)
+        print(f"rebuild     {time.perf_counter() - start:6.2f} s  "
+              + ", ".join(f"{k} {v:.2f}s" for k, v in timings.items()))
+        assert tables(con) == expected, "rebuild weicht von der naiven Projektion ab"
+        con.commit()
+
+        # Snapshot der Vornacht: alles bis vor dem letzten Schultag
+        cut = con.execute("SELECT MAX(seq) FROM events WHERE at < ?", (last_day,)).fetchone()[0]
+        event_store.take_snapshot(con, until=cut)
+        con.commit()
+
+        start = time.perf_counter()
+        timings = event_store.rebuild(con)
+        print(f"+snapshot   {time.perf_counter() - start:6.2f} s  "
+              + ", ".join(f"{k} {v:.2f}s" for k, v in timings.items()))
+        assert tables(con) == expected, "rebuild mit Snapshot weicht ab"
+        con.rollback()
+        con.close()
+
+
+if __name__ == "__main__":
+    main()
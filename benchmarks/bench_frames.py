@@ -0,0 +1,112 @@
+"""Benchmark: Speicher und Zeit pro Kamera-Frame, alter Weg gegen frames.FrameSlot.
+
+Alter Weg (app.py bis user-031): cap.read() legt jedes Mal ein neues Array an,
+pyzbar.decode(frame) kopiert den Blaukanal per tobytes(), cvtColor(BGR2RGB) erzeugt
+ein weiteres Array für die Anzeige – bei jedem Frame.
+Neuer Weg: feste Puffer pro Slot, Graustufen per Zeiger an zbar, Anzeige gedrosselt.
+
+Ohne zbar-Bibliothek wird nur die Bildübergabe gemessen (ohne Decodieren).
+
+    python benchmarks/bench_frames.py --width 1280 --height 720 --frames 300
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2  # noqa: E402
+from frames import DisplayThrottle, FrameSlot  # noqa: E402
+
+CAMERA_FPS = 30
+
+
+class FakeCapture:
+    """Verhält sich bei read() wie cv2.VideoCapture (optional mit Zielpuffer)."""
+
+    def __init__(self, width, height):
+        rng = np.random.default_rng(1)
+        self.source = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+
+    def read(self, image=None):
+        if image is None or image.shape != self.source.shape:
+            return True, self.source.copy()
+        np.copyto(image, self.source)
+        return True, image
+
+
+def load_decoder():
+    try:
+        from pyzbar import pyzbar
+        from frames import ZbarDecoder
+        return pyzbar.decode, ZbarDecoder()
+    except ImportError:
+        return None, None
+
+
+def frame_start():
+    """Spitzenwert zurücksetzen; gemessen wird nur, was innerhalb des Frames dazukommt."""
+    tracemalloc.reset_peak()
+    return tracemalloc.get_traced_memory()[0]
+
+
+def old_path(cap, n, decode):
+    for i in range(n):
+        start = frame_start()
+        ok, frame = cap.read()
+        if decode:
+            decode(frame)
+        else:
+            frame[:, :, 0].tobytes()  # das kopiert pyzbar intern
+        cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        yield start
+
+
+def new_path(cap, n, decoder, slot):
+    throttle = DisplayThrottle()
+    for i in range(n):
+        start = frame_start()
+        ok, frame = slot.capture(cap)
+        gray = slot.to_gray(frame)
+        if decoder:
+            decoder.decode(gray)
+        if throttle.due(i / CAMERA_FPS):
+            slot.stats.displayed += 1  # Anzeige nimmt den BGR-Puffer direkt (channels="BGR")
+        yield start
+
+
+def run(label, frames_iter, n):
+    peaks = []
+    started = time.perf_counter()
+    for frame_base in frames_iter:
+        peaks.append(tracemalloc.get_traced_memory()[1] - frame_base)
+    elapsed = time.perf_counter() - started
+    peaks.sort()
+    print(f"{label:8s} {elapsed / n * 1000:7.2f} ms/Frame  {n / elapsed:7.0f} Frames/s  "
+          f"Spitze/Frame median {peaks[len(peaks) // 2] / 1024:8.0f} KiB  max {peaks[-1] / 1024:8.0f} KiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--frames", type=int, default=300)
+    args = parser.parse_args()
+
+    cap = FakeCapture(args.width, args.height)
+    decode, decoder = load_decoder()
+    print(f"{args.width}x{args.height}, {args.frames} Frames, Decodieren: {'ja' if decode else 'nein (kein zbar)'}")
+    tracemalloc.start()
+    run("vorher", old_path(cap, args.frames, decode), args.frames)
+    slot = FrameSlot()
+    run("nachher", new_path(cap, args.frames, decoder, slot), args.frames)
+    tracemalloc.stop()
+    print(f"FrameSlot: {slot.stats.as_dict()}")
+
+
+if __name__ == "__main__":
+    main()
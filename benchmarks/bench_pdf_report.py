@@ -0,0 +1,67 @@
+"""Benchmark: PDF-Logbuch (pdf_report) – Seiten pro Sekunde.
+
+    python benchmarks/bench_pdf_report.py --rows 5000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pdf_report import find_font_path, render_log_report  # noqa: E402
+
+NAMES = [
+    "Müller, Jürgen", "Łukasz Wiśniewski", "Ayşe Yılmaz", "Øyvind Ødegård",
+    "Dragoš Petrović", "Zoë Brontë", "Σωκράτης Παππάς", "Иван Петров",
+    "Nguyễn Văn An", "Anna-Lena Schmidt-Großmann von Hohenzollern-Sigmaringen",
+]
+CLASSES = ["5a", "5b", "6a", "7c", "8b", "9a", "10c", "EF", "Q1", "Q2"]
+
+
+def make_rows(n):
+    rng = random.Random(42)
+    rows = []
+    for i in range(n):
+        rows.append((
+            f"{100000 + i}",
+            rng.choice(NAMES),
+            "2025-01-15",
+            f"{7 + i * 10 // n:02d}:{rng.randrange(60):02d}:{rng.randrange(60):02d}",
+            rng.choice(["Anmeldung", "Abmeldung"]),
+            rng.choice(CLASSES),
+        ))
+    rows.sort(key=lambda r: r[3])
+    return rows
+
+
+def run(rows, by_class, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        pdf = render_log_report(rows, "Schüler-Logbuch für 2025-01-15", by_class=by_class)
+        data = bytes(pdf.output())
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best[0]:
+            best = (elapsed, pdf.pages_count, len(data))
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    print(f"Schrift: {find_font_path()}")
+    for by_class in (False, True):
+        elapsed, pages, size = run(rows, by_class, args.repeat)
+        label = "nach Klasse" if by_class else "fortlaufend"
+        print(f"{label:12s} {args.rows} Zeilen  {pages:4d} Seiten  {size / 1024:7.0f} KiB  "
+              f"{elapsed:6.2f} s  {pages / elapsed:7.1f} Seiten/s  {args.rows / elapsed:8.0f} Zeilen/s")
+
+
+if __name__ == "__main__":
+    main()
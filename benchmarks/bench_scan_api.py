@@ -0,0 +1,130 @@
+"""Benchmark: Durchsatz der Scan-API (scan_api.py) auf einem CPU-Kern.
+
+Startet den Server als eigenen Prozess (unter Linux auf Kern 0 festgelegt) mit einer
+temporären Datenbank und schickt Scans über mehrere Keep-Alive-Verbindungen.
+
+    python benchmarks/bench_scan_api.py --scans 20000 --connections 32
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STUDENTS = 2000
+TOKEN = "bench"  # [auth] api_tokens des Benchmark-Servers
+
+
+def make_db(path):
+    with sqlite3.connect(path) as con:
+        con.execute("CREATE TABLE students (id TEXT PRIMARY KEY, name TEXT NOT NULL)")
+        con.execute("""CREATE TABLE log (id INTEGER PRIMARY KEY AUTOINCREMENT, student_id TEXT,
+                       name TEXT, date TEXT, time TEXT, action TEXT)""")
+        con.executemany("INSERT INTO students VALUES (?, ?)",
+                        [(str(100000 + i), f"Schüler {i}") for i in range(STUDENTS)])
+
+
+def start_server(db_path, port, cpu):
+    def pin():
+        if cpu is not None and hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(0, {cpu})
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "scan_api.py"), "--db", db_path, "--port", str(port),
+         "--host", "127.0.0.1"],
+        env={**os.environ, "SCANNER_AUTH_API_TOKENS": TOKEN},
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, preexec_fn=pin,
+    )
+    return proc
+
+
+async def wait_for_port(port, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.05)
+    raise RuntimeError("Server startet nicht")
+
+
+async def request(reader, writer, method, path, payload=None):
+    body = json.dumps(payload).encode() if payload is not None else b""
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: x\r\nAuthorization: Bearer {TOKEN}\r\n"
+        f"Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n".encode() + body
+    )
+    head = await reader.readuntil(b"\r\n\r\n")
+    length = 0
+    for line in head.split(b"\r\n"):
+        if line.lower().startswith(b"content-length:"):
+            length = int(line.split(b":")[1])
+    data = await reader.readexactly(length)
+    status = int(head.split(b" ", 2)[1])
+    if status != 200:
+        raise RuntimeError(f"HTTP {status}: {data[:200]!r}")
+    return data
+
+
+async def client(port, n_requests, batch):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    rng = random.Random()
+    for _ in range(n_requests):
+        scans = [{"code": str(100000 + rng.randrange(STUDENTS)), "action": "Anmeldung"} for _ in range(batch)]
+        await request(reader, writer, "POST", "/scans", scans[0] if batch == 1 else scans)
+    writer.close()
+
+
+async def run(port, total, connections, batch):
+    per_conn = max(1, total // (connections * batch))
+    start = time.perf_counter()
+    await asyncio.gather(*(client(port, per_conn, batch) for _ in range(connections)))
+    elapsed = time.perf_counter() - start
+    return per_conn * connections * batch, elapsed
+
+
+async def lookups(port, n):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    start = time.perf_counter()
+    for i in range(n):
+        await request(reader, writer, "GET", f"/students/{100000 + i % STUDENTS}")
+    writer.close()
+    return n / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scans", type=int, default=20000)
+    parser.add_argument("--connections", type=int, default=32)
+    parser.add_argument("--port", type=int, default=8799)
+    parser.add_argument("--cpu", type=int, default=0, help="Kern für den Server (-1 = nicht festlegen)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        make_db(db_path)
+        proc = start_server(db_path, args.port, None if args.cpu < 0 else args.cpu)
+        try:
+            asyncio.run(wait_for_port(args.port))
+            for batch in (1, 10, 100):
+                count, elapsed = asyncio.run(run(args.port, args.scans, args.connections, batch))
+                print(f"POST /scans  Batch {batch:3d}  {count:6d} Scans  {elapsed:6.2f} s  {count / elapsed:8.0f} Scans/s")
+            rate = asyncio.run(lookups(args.port, 2000))
+            print(f"GET /students  1 Verbindung  {rate:8.0f} Anfragen/s")
+            with sqlite3.connect(db_path) as con:
+                print(f"Logzeilen in der DB: {con.execute('SELECT COUNT(*) FROM log').fetchone()[0]}")
+        finally:
+            proc.terminate()
+            proc.wait()
+
+
+if __name__ == "__main__":
+    main()
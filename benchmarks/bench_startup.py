@@ -0,0 +1,115 @@
+"""Benchmark: Kaltstart und erstes Rendern der Streamlit-Apps.
+
+Jede Messung läuft in einem frischen Python-Prozess (wie ein neuer Streamlit-Worker):
+Zeit bis zur gerenderten Login-Seite, ein Rerun, Startseite + Impressum nach dem Login
+und welche schweren Module nach der Login-Seite geladen sind. Mit --baseline wird derselbe Ablauf
+für einen älteren Git-Stand gemessen (z. B. vor dem Lazy-Loading).
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --baseline HEAD~1
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APPS = {
+    "app.py": "📄 Impressum",
+    "barcode_scanner_client.py": "📄 Impressum",
+    "scanner_webuntis.py": "📄 Impressum",
+}
+HEAVY = ("cv2", "pyzbar", "pandas", "numpy", "fpdf", "PIL", "webuntis")
+
+PROBE = r"""
+import json, sys, time
+t0 = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+t1 = time.perf_counter()
+at = AppTest.from_file(sys.argv[1], default_timeout=60)
+at.run()
+t2 = time.perf_counter()
+login_modules = [m for m in HEAVY if m in sys.modules]
+at.run()
+t3 = time.perf_counter()
+at.session_state["logged_in"] = True
+at.session_state["cookies_accepted"] = True
+at.run()
+at.sidebar.selectbox[0].select(sys.argv[2]).run()
+t4 = time.perf_counter()
+print(json.dumps({
+    "streamlit_import": t1 - t0,
+    "first_render": t2 - t1,
+    "rerun": t3 - t2,
+    "impressum": t4 - t3,
+    "login_modules": login_modules,
+    "errors": [str(e.value) for e in at.exception],
+}))
+"""
+
+
+def probe(workdir, script, page):
+    code = f"HEAVY = {HEAVY!r}\n" + PROBE
+    out = subprocess.run(
+        [sys.executable, "-c", code, script, page],
+        cwd=workdir, capture_output=True, text=True, timeout=300,
+    )
+    lines = [line for line in out.stdout.splitlines() if line.startswith("{")]
+    if not lines:
+        raise RuntimeError(out.stderr[-2000:])
+    return json.loads(lines[-1])
+
+
+def measure(workdir, repeat):
+    results = {}
+    for script, page in APPS.items():
+        if not os.path.exists(os.path.join(workdir, script)):
+            continue
+        runs = [probe(workdir, script, page) for _ in range(repeat)]
+        best = {key: min(r[key] for r in runs) for key in ("first_render", "rerun", "impressum")}
+        best["login_modules"] = runs[0]["login_modules"]
+        best["errors"] = runs[0]["errors"]
+        results[script] = best
+    return results
+
+
+def export_revision(rev, target):
+    archive = subprocess.run(["git", "archive", rev], cwd=ROOT, capture_output=True, check=True).stdout
+    subprocess.run(["tar", "-x", "-C", target], input=archive, check=True)
+
+
+def report(label, results):
+    print(f"\n== {label}")
+    print(f"{'App':28s} {'1. Render':>10s} {'Rerun':>8s} {'Nach Login':>10s}  schwere Module nach Login")
+    for script, r in results.items():
+        print(f"{script:28s} {r['first_render'] * 1000:8.0f}ms {r['rerun'] * 1000:6.0f}ms "
+              f"{r['impressum'] * 1000:8.0f}ms  {', '.join(r['login_modules']) or '–'}")
+        for error in r["errors"]:
+            print(f"{'':28s} Fehler: {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--baseline", metavar="REV", help="Git-Stand zum Vergleich")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Eigene Kopie der DB, damit die Messung students.db nicht verändert
+        current = os.path.join(tmp, "current")
+        shutil.copytree(ROOT, current,
+                        ignore=shutil.ignore_patterns(".git", "__pycache__", "reports", "benchmarks"))
+        if args.baseline:
+            baseline = os.path.join(tmp, "baseline")
+            os.makedirs(baseline)
+            export_revision(args.baseline, baseline)
+            shutil.copy(os.path.join(ROOT, "students.db"), baseline)
+            report(f"Stand {args.baseline}", measure(baseline, args.repeat))
+        report("Arbeitsstand", measure(current, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
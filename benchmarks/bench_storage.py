@@ -0,0 +1,105 @@
+"""Benchmark: Schreibdurchsatz der Speicher-Backends (storage.py) bei gleichzeitigen Schreibern.
+
+Jeder Schreiber ist ein eigener Prozess (wie Streamlit-Sitzungen, Scan-API und Handscanner an
+mehreren Eingängen) und protokolliert Scans über write_scans:
+
+    einzeln   nachschlagen + ein Scan pro Transaktion (wie log_scan)
+    stapel    --batch Scans pro Transaktion (Handscanner, Offline-Sync; PostgreSQL per COPY)
+
+SQLite läuft immer (temporäre DB), PostgreSQL nur mit --url und installiertem psycopg –
+am besten gegen eine Wegwerf-DB, z. B.
+
+    docker run --rm -e POSTGRES_HOST_AUTH_METHOD=trust -p 5432:5432 postgres:16
+    python benchmarks/bench_storage.py --writers 1 4 16 --url postgresql://postgres@localhost/postgres
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_scan_api import STUDENTS, make_db  # noqa: E402
+
+from scanner_core import initialize_database  # noqa: E402
+from storage import PostgresStorage, SqliteStorage  # noqa: E402
+
+
+def open_store(backend, target):
+    return SqliteStorage(target) if backend == "sqlite" else PostgresStorage(target, 1, 1)
+
+
+def writer(job):
+    """Ein Schreiberprozess; Rückgabe (start, ende, [Sekunden je Transaktion])."""
+    backend, target, number, count, batch = job
+    store = open_store(backend, target)
+    rng = random.Random(number)
+    latencies = []
+    start = time.time()
+    for done in range(0, count, batch):
+        began = time.perf_counter()
+        codes = [str(100000 + rng.randrange(STUDENTS)) for _ in range(min(batch, count - done))]
+        if batch == 1:
+            name = store.student_name(codes[0])
+        else:
+            names = store.lookup_names(codes)
+        rows = [(code, name if batch == 1 else names.get(code), "Anmeldung", uuid.uuid4().hex,
+                 datetime.now().isoformat(timespec="milliseconds"), f"Eingang {number}") for code in codes]
+        store.write_scans(rows)
+        latencies.append(time.perf_counter() - began)
+    return start, time.time(), latencies
+
+
+def run(backend, target, writers, count, batch):
+    jobs = [(backend, target, number, count, batch) for number in range(writers)]
+    with multiprocessing.Pool(writers) as pool:
+        results = pool.map(writer, jobs)
+    wall = max(end for _, end, _ in results) - min(start for start, _, _ in results)
+    latencies = sorted(x for _, _, lat in results for x in lat)
+    p95 = latencies[int(len(latencies) * 0.95)] * 1000
+    print(f"{backend:9s} {'einzeln' if batch == 1 else f'stapel {batch}':11s} {writers:3d} Schreiber  "
+          f"{writers * count:7d} Scans  {wall:6.2f} s  {writers * count / wall:8.0f} Scans/s  p95 {p95:7.1f} ms")
+
+
+def seed_postgres(url):
+    store = PostgresStorage(url, 1, 1)
+    if store.student_name(str(100000)) is None:
+        store.record_student_events([("student_created", str(100000 + i), {"name": f"Schüler {i}"})
+                                     for i in range(STUDENTS)])
+    store.pool.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--writers", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--scans", type=int, default=500, help="Scans pro Schreiber")
+    parser.add_argument("--batch", type=int, default=100)
+    parser.add_argument("--url", help="PostgreSQL-Wegwerf-DB, z. B. postgresql://postgres@localhost/postgres")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        targets = [("sqlite", os.path.join(tmp, "students.db"))]
+        make_db(targets[0][1])
+        initialize_database(targets[0][1])
+        if args.url:
+            try:
+                seed_postgres(args.url)
+                targets.append(("postgres", args.url))
+            except ImportError:
+                print("postgres  übersprungen (pip install 'psycopg[binary,pool]')")
+        else:
+            print("postgres  übersprungen (keine --url)")
+        for backend, target in targets:
+            for batch in (1, args.batch):
+                for writers in args.writers:
+                    run(backend, target, writers, args.scans, batch)
+
+
+if __name__ == "__main__":
+    main()
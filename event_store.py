@@ -0,0 +1,390 @@
+"""Ereignisprotokoll: Quelle der Wahrheit für Scans und Schülerstammdaten.
+
+Jede Änderung wird als Ereignis an `events` angehängt (Trigger verbieten UPDATE/DELETE).
+Die gewohnten Tabellen sind daraus abgeleitete Projektionen:
+
+    students         aktuelle Schüler (Nachschlagen beim Scan)
+    student_history  alle Schüler inkl. gelöschter, ein Eintrag je Inhaber einer Ausweisnummer
+                     (id, created_seq); Berichte ordnen Scans über log.id dem Inhaber zu
+    log              ein Eintrag pro Scan, log.id = events.seq; Name = aktueller Name
+
+Live werden Ereignis und Projektion in derselben Transaktion geschrieben. rebuild() baut die
+Projektionen komplett neu (z. B. nach einer Schemaänderung, PROJECTION_VERSION erhöhen):
+Schülerzustand aus dem letzten Snapshot plus den Ereignissen danach, die Log-Projektion
+mengenbasiert mit einem INSERT ... SELECT statt Ereignis für Ereignis.
+
+    python event_store.py rebuild          # Projektionen neu aufbauen
+    python event_store.py snapshot         # Snapshot des Schülerzustands
+    python event_store.py history 4164     # alle Ereignisse eines Ausweises
+
+Mit [database] backend = "postgres" liegt das Protokoll auf dem Server: history und stats lesen
+dort, rebuild und snapshot arbeiten nur auf SQLite-Dateien und brechen ab.
+"""
+import argparse
+import json
+import sqlite3
+import time
+import zlib
+from datetime import datetime
+
+from scanner_core import DB_PATH, LOG_INDEXES, connect, initialize_database
+from storage import served_by_postgres, storage
+
+# Erhöhen, wenn sich Aufbau oder Inhalt einer Projektion ändert -> Rebuild beim nächsten Start
+PROJECTION_VERSION = 1
+SNAPSHOT_FORMAT = 1
+SNAPSHOT_KEEP = 3
+
+
+# ----------------------------
+# Schülerzustand (Projektion im Speicher, snapshotfähig)
+# ----------------------------
+class StudentState:
+    """students: id -> [name, klass, untis_student_id, created_at, deleted_at, created_seq].
+
+    closed: [id, created_seq, deleted_seq, name, klass, untis_student_id, created_at, deleted_at]
+    je gelöschtem Inhaber – Scans in diesem Bereich behalten dessen letzten Namen und seine
+    Klasse, auch wenn die Ausweisnummer neu vergeben wird.
+    """
+
+    def __init__(self, students=None, closed=None):
+        self.students = students or {}
+        self.closed = closed or []
+
+    def apply(self, seq, kind, student_id, data, at):
+        record = self.students.get(student_id)
+        if kind == "student_created":
+            # Aus dem alten log übernommene Schüler besitzen ihre Scans von Anfang an
+            self.students[student_id] = [data.get("name"), data.get("klass"), data.get("untis_student_id"),
+                                         at, None, 0 if data.get("legacy") else seq]
+        elif record is None or record[4] is not None:
+            return
+        elif kind == "student_renamed":
+            record[0] = data["name"]
+        elif kind == "mapping_changed":
+            record[0], record[1], record[2] = data.get("name"), data.get("klass"), data.get("untis_student_id")
+        elif kind == "student_deleted":
+            record[4] = at
+            self.closed.append([student_id, record[5], seq, record[0], record[1], record[2], record[3], at])
+
+    def rows(self):
+        """student_history-Zeilen: (id, name, klass, untis_student_id, created_at, deleted_at, created_seq, deleted_seq)."""
+        closed = [(sid, name, klass, untis, created_at, deleted_at, since, until)
+                  for sid, since, until, name, klass, untis, created_at, deleted_at in self.closed]
+        return closed + [(sid, *r, None) for sid, r in self.students.items() if r[4] is None]
+
+    def owners(self):
+        """(id, von_seq, bis_seq, name): wessen Name für Scans dazwischen gilt."""
+        current = [(sid, r[5], None, r[0]) for sid, r in self.students.items() if r[4] is None]
+        return [tuple(c[:4]) for c in self.closed] + current
+
+    def dump(self):
+        return {"students": self.students, "closed": self.closed}
+
+
+def replay_students(connection, state, since=0, until=None):
+    rows = connection.execute(
+        """SELECT seq, kind, student_id, data, at FROM events
+           WHERE kind != 'scan' AND seq > ? AND seq <= ? ORDER BY seq""",
+        (since, until if until is not None else 2 ** 63 - 1),
+    )
+    last = since
+    for seq, kind, student_id, data, at in rows:
+        state.apply(seq, kind, student_id, json.loads(data), at)
+        last = seq
+    return last
+
+
+# ----------------------------
+# Live-Projektion (gleiche Transaktion wie das Ereignis)
+# ----------------------------
+def project_student_event(connection, seq, kind, student_id, data, at):
+    if kind == "student_created":
+        connection.execute(
+            "INSERT INTO students (id, name, klass, untis_student_id) VALUES (?, ?, ?, ?)",
+            (student_id, data.get("name"), data.get("klass"), data.get("untis_student_id")),
+        )
+        # Neuer Eintrag auch bei wiedervergebener Ausweisnummer – der alte Inhaber bleibt erhalten
+        connection.execute(
+            """INSERT INTO student_history
+               (id, name, klass, untis_student_id, created_at, deleted_at, created_seq)
+               VALUES (?, ?, ?, ?, ?, NULL, ?)""",
+            (student_id, data.get("name"), data.get("klass"), data.get("untis_student_id"), at, seq),
+        )
+    elif kind in ("student_renamed", "mapping_changed"):
+        if kind == "student_renamed":
+            connection.execute("UPDATE students SET name = ? WHERE id = ?", (data["name"], student_id))
+            connection.execute(
+                "UPDATE student_history SET name = ? WHERE id = ? AND deleted_at IS NULL", (data["name"], student_id)
+            )
+        else:
+            values = (data.get("name"), data.get("klass"), data.get("untis_student_id"), student_id)
+            connection.execute("UPDATE students SET name = ?, klass = ?, untis_student_id = ? WHERE id = ?", values)
+            connection.execute(
+                "UPDATE student_history SET name = ?, klass = ?, untis_student_id = ? WHERE id = ? AND deleted_at IS NULL",
+                values,
+            )
+        # Nur Scans dieses Schülers, nicht die eines früheren Inhabers derselben Ausweisnummer
+        connection.execute(
+            """UPDATE log SET name = ? WHERE student_id = ?
+               AND id > (SELECT created_seq FROM student_history WHERE id = ? AND deleted_at IS NULL)""",
+            (data.get("name"), student_id, student_id),
+        )
+    elif kind == "student_deleted":
+        connection.execute("DELETE FROM students WHERE id = ?", (student_id,))
+        connection.execute(
+            "UPDATE student_history SET deleted_at = ?, deleted_seq = ? WHERE id = ? AND deleted_at IS NULL",
+            (at, seq, student_id),
+        )
+
+
+def record(kind, student_id, data=None, db_path=DB_PATH):
+    """Ereignis anhängen und Projektionen nachführen (im Backend aus storage.py); Rückgabe: seq."""
+    seq, = storage(db_path).record_student_events([(kind, student_id, data or {})])
+    from barcode_check import known_ids_changed
+
+    known_ids_changed(db_path, added=student_id if kind == "student_created" else None)
+    return seq
+
+
+def student_exists(student_id, db_path=DB_PATH):
+    return storage(db_path).student_name(student_id) is not None
+
+
+def create_student(student_id, name, klass=None, untis_student_id=None, db_path=DB_PATH):
+    """Neuer Schüler; sqlite3.IntegrityError, wenn die Barcode-ID schon vergeben ist.
+
+    ValueError, wenn sie nicht zum Ausweisformat passt (barcode_check.check_new_id).
+    """
+    from barcode_check import check_new_id
+
+    check_new_id(student_id, db_path)
+    if student_exists(student_id, db_path):
+        raise sqlite3.IntegrityError("UNIQUE constraint failed: students.id")
+    return record("student_created", student_id,
+                  {"name": name, "klass": klass, "untis_student_id": untis_student_id}, db_path)
+
+
+def rename_student(student_id, name, db_path=DB_PATH):
+    return record("student_renamed", student_id, {"name": name}, db_path)
+
+
+def delete_student(student_id, db_path=DB_PATH):
+    return record("student_deleted", student_id, None, db_path)
+
+
+def set_mapping(student_id, name, klass=None, untis_student_id=None, db_path=DB_PATH):
+    """Barcode -> Schüler (WebUntis) zuordnen; legt an oder ändert. Rückgabe: "created"/"changed".
+
+    Neue IDs müssen zum Ausweisformat passen (ValueError wie bei create_student).
+    """
+    from barcode_check import check_new_id
+
+    data = {"name": name, "klass": klass, "untis_student_id": untis_student_id}
+    if student_exists(student_id, db_path):
+        record("mapping_changed", student_id, data, db_path)
+        return "changed"
+    check_new_id(student_id, db_path)
+    record("student_created", student_id, data, db_path)
+    return "created"
+
+
+def record_mapping_changes(changes, db_path=DB_PATH):
+    """Mehrere Zuordnungsänderungen (z. B. WebUntis-Abgleich) in einer Transaktion.
+
+    changes: [(student_id, name, klass, untis_student_id)].
+    """
+    if changes:
+        storage(db_path).record_student_events(
+            [("mapping_changed", student_id, {"name": name, "klass": klass, "untis_student_id": untis_student_id})
+             for student_id, name, klass, untis_student_id in changes]
+        )
+
+
+# ----------------------------
+# Übernahme, Snapshots, Rebuild
+# ----------------------------
+def initialize_event_tables(connection):
+    connection.execute("CREATE TABLE IF NOT EXISTS projection_meta (key TEXT PRIMARY KEY, value TEXT)")
+    connection.execute("""
+        CREATE TABLE IF NOT EXISTS snapshots (
+            seq INTEGER PRIMARY KEY,
+            format INTEGER NOT NULL,
+            created_at TEXT NOT NULL,
+            state BLOB NOT NULL
+        )
+    """)
+
+
+def get_meta(connection, key):
+    row = connection.execute("SELECT value FROM projection_meta WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+
+def set_meta(connection, key, value):
+    connection.execute("INSERT OR REPLACE INTO projection_meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+
+def import_legacy(connection):
+    """Bestehende log-/students-Zeilen einmalig als Ereignisse übernehmen, dann Projektionen neu aufbauen.
+
+    Scans behalten ihre ID als seq (log.id = events.seq), danach je Schüler ein student_created.
+    """
+    connection.execute("""
+        INSERT INTO events (seq, kind, student_id, at, scan_id, data)
+        SELECT id, 'scan', student_id,
+               COALESCE(scanned_at, date || 'T' || COALESCE(time, '00:00:00') || '.000'),
+               scan_id, json_object('name', name, 'action', action, 'entrance', entrance)
+        FROM log ORDER BY id
+    """)
+    connection.execute("""
+        INSERT INTO events (kind, student_id, at, data)
+        SELECT 'student_created', id, ?,
+               json_object('name', name, 'klass', klass, 'untis_student_id', untis_student_id, 'legacy', 1)
+        FROM students ORDER BY id
+    """, (datetime.now().isoformat(timespec="milliseconds"),))
+    return rebuild(connection, use_snapshot=False)
+
+
+def ensure_event_log(connection):
+    """Von initialize_database aufgerufen: Tabellen, einmalige Übernahme, Rebuild bei neuer Version."""
+    initialize_event_tables(connection)
+    version = get_meta(connection, "projection_version")
+    if version is None:
+        if connection.execute("SELECT 1 FROM events LIMIT 1").fetchone() is None:
+            import_legacy(connection)
+        else:
+            set_meta(connection, "projection_version", PROJECTION_VERSION)
+    elif int(version) != PROJECTION_VERSION:
+        rebuild(connection)
+
+
+def load_snapshot(connection):
+    """(StudentState, seq) aus dem neuesten passenden Snapshot, sonst leer ab 0."""
+    row = connection.execute(
+        "SELECT seq, state FROM snapshots WHERE format = ? ORDER BY seq DESC LIMIT 1", (SNAPSHOT_FORMAT,)
+    ).fetchone()
+    if row is None:
+        return StudentState(), 0
+    return StudentState(**json.loads(zlib.decompress(row[1]))), row[0]
+
+
+def take_snapshot(connection, until=None):
+    """Schülerzustand bis `until` (Standard: letztes Ereignis) sichern; nur SNAPSHOT_KEEP behalten."""
+    state, since = load_snapshot(connection)
+    seq = until
+    if seq is None:
+        seq = connection.execute("SELECT COALESCE(MAX(seq), 0) FROM events").fetchone()[0]
+    if seq <= since:
+        return since
+    replay_students(connection, state, since, seq)
+    blob = zlib.compress(json.dumps(state.dump(), ensure_ascii=False).encode("utf-8"))
+    connection.execute(
+        "INSERT OR REPLACE INTO snapshots (seq, format, created_at, state) VALUES (?, ?, ?, ?)",
+        (seq, SNAPSHOT_FORMAT, datetime.now().isoformat(timespec="seconds"), blob),
+    )
+    connection.execute(
+        "DELETE FROM snapshots WHERE seq NOT IN (SELECT seq FROM snapshots ORDER BY seq DESC LIMIT ?)",
+        (SNAPSHOT_KEEP,),
+    )
+    return seq
+
+
+def rebuild(connection, use_snapshot=True):
+    """Alle Projektionen aus den Ereignissen neu aufbauen (ohne Commit). Rückgabe: Zeiten in s."""
+    timings = {}
+    started = time.perf_counter()
+    state, since = load_snapshot(connection) if use_snapshot else (StudentState(), 0)
+    replay_students(connection, state, since)
+    timings["students_replay"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    connection.execute("DELETE FROM students")
+    connection.execute("DELETE FROM student_history")
+    rows = state.rows()
+    connection.executemany(
+        """INSERT INTO student_history
+           (id, name, klass, untis_student_id, created_at, deleted_at, created_seq, deleted_seq)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+        rows,
+    )
+    connection.executemany(
+        "INSERT INTO students (id, name, klass, untis_student_id) VALUES (?, ?, ?, ?)",
+        [row[:4] for row in rows if row[5] is None],
+    )
+    timings["students_write"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    # Indizes am Ende in einem Durchgang aufbauen statt bei jeder Zeile nachführen
+    for index in LOG_INDEXES:
+        connection.execute(f"DROP INDEX IF EXISTS {index}")
+    connection.execute("DELETE FROM log")
+    connection.execute("DROP TABLE IF EXISTS temp.owners")
+    connection.execute("CREATE TEMP TABLE owners (id TEXT, since INTEGER, until INTEGER, name TEXT)")
+    connection.executemany("INSERT INTO temp.owners VALUES (?, ?, ?, ?)", state.owners())
+    connection.execute("CREATE INDEX temp.idx_owners ON owners (id, since)")
+    # Name: letzter Name des Inhabers, dem der Ausweis zum Scan-Zeitpunkt gehörte
+    connection.execute("""
+        INSERT INTO log (id, student_id, name, date, time, action, scan_id, scanned_at, entrance)
+        SELECT e.seq, e.student_id, COALESCE(o.name, json_extract(e.data, '$.name')),
+               substr(e.at, 1, 10), substr(e.at, 12, 8), json_extract(e.data, '$.action'),
+               e.scan_id, e.at, json_extract(e.data, '$.entrance')
+        FROM events e LEFT JOIN temp.owners o
+          ON o.id = e.student_id AND e.seq > o.since AND (o.until IS NULL OR e.seq < o.until)
+        WHERE e.kind = 'scan' ORDER BY e.seq
+    """)
+    connection.execute("DROP TABLE temp.owners")
+    for statement in LOG_INDEXES.values():
+        connection.execute(statement)
+    timings["log"] = time.perf_counter() - started
+    set_meta(connection, "projection_version", PROJECTION_VERSION)
+    return timings
+
+
+def fetch_student_events(student_id, db_path=DB_PATH):
+    return [(seq, kind, at, json.loads(data)) for seq, kind, at, data in storage(db_path).student_events(student_id)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ereignisprotokoll & Projektionen")
+    parser.add_argument("command", choices=["rebuild", "snapshot", "stats", "history"])
+    parser.add_argument("student_id", nargs="?")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--no-snapshot", action="store_true", help="Rebuild ab dem ersten Ereignis")
+    args = parser.parse_args()
+
+    if args.command == "history" and not args.student_id:
+        parser.error("history braucht eine Barcode-ID")
+    if served_by_postgres(args.db):
+        # Die Datei ist nach der Migration veraltet; ein Rebuild/Snapshot dort liefe ins Leere
+        if args.command in ("rebuild", "snapshot"):
+            parser.error(f"{args.command} nur für SQLite – {args.db} liegt auf dem PostgreSQL-Server "
+                         "([database] backend); für eine andere SQLite-Datei --db angeben")
+        if args.command == "stats":
+            for kind, count in storage(args.db).event_kinds():
+                print(f"{kind:18s} {count}")
+            return
+    if args.command == "history":
+        for seq, kind, at, data in fetch_student_events(args.student_id, args.db):
+            print(f"{seq:8d} {at} {kind:16s} {json.dumps(data, ensure_ascii=False)}")
+        return
+
+    initialize_database(args.db)
+    with connect(args.db) as connection:
+        if args.command == "rebuild":
+            timings = rebuild(connection, use_snapshot=not args.no_snapshot)
+            connection.commit()
+            print(", ".join(f"{key} {value:.2f}s" for key, value in timings.items()))
+        elif args.command == "snapshot":
+            connection.commit()
+            print(f"Snapshot bis seq {take_snapshot(connection)}")
+            connection.commit()
+        else:
+            for kind, count in connection.execute("SELECT kind, COUNT(*) FROM events GROUP BY kind ORDER BY kind"):
+                print(f"{kind:18s} {count}")
+            for seq, created in connection.execute("SELECT seq, created_at FROM snapshots ORDER BY seq"):
+                print(f"Snapshot seq {seq} vom {created}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Prozessinterner Ereignisbus.
+
+scanner_core veröffentlicht hier jeden gespeicherten Scan (nach dem Commit). Abonnenten
+werden synchron im Thread des Schreibers aufgerufen und sollten deshalb nur kurz arbeiten
+(z. B. in eine Queue legen). Die letzten Ereignisse bleiben in einem Ringpuffer, damit
+Leser mit since()/wait() nachholen können, ohne selbst abonniert zu sein.
+"""
+import logging
+import threading
+import time
+from collections import deque
+
+log = logging.getLogger("events")
+
+HISTORY = 2000
+
+
+class EventBus:
+    def __init__(self, history=HISTORY):
+        self.seq = 0
+        self.recent = deque(maxlen=history)
+        self.subscribers = []
+        self.changed = threading.Condition()
+
+    def publish(self, kind, **data):
+        return self.publish_many(kind, [data])[-1]
+
+    def publish_many(self, kind, items):
+        """Mehrere Ereignisse gleicher Art auf einmal (ein Lock, ein Wecken)."""
+        if not items:
+            return []
+        with self.changed:
+            events = []
+            for data in items:
+                self.seq += 1
+                event = {"seq": self.seq, "kind": kind, "at": time.time(), **data}
+                self.recent.append(event)
+                events.append(event)
+            subscribers = list(self.subscribers)
+            self.changed.notify_all()
+        for callback in subscribers:
+            try:
+                callback(events)
+            except Exception:
+                log.exception("Abonnent %r fehlgeschlagen", callback)
+        return events
+
+    def subscribe(self, callback):
+        """callback(events) nach jedem Veröffentlichen; Rückgabe: Funktion zum Abmelden."""
+        with self.changed:
+            self.subscribers.append(callback)
+
+        def unsubscribe():
+            with self.changed:
+                if callback in self.subscribers:
+                    self.subscribers.remove(callback)
+        return unsubscribe
+
+    def since(self, seq):
+        """Ereignisse nach `seq` aus dem Ringpuffer (älteste zuerst)."""
+        with self.changed:
+            if seq >= self.seq:
+                return []
+            return [event for event in self.recent if event["seq"] > seq]
+
+    def wait(self, seq, timeout=None):
+        """Blockiert, bis es Ereignisse nach `seq` gibt (oder das Timeout abläuft)."""
+        with self.changed:
+            self.changed.wait_for(lambda: self.seq > seq, timeout)
+        return self.since(seq)
+
+
+bus = EventBus()
@@ -0,0 +1,320 @@
+"""Bildübergabe zwischen Kamera/Upload und Barcode-Decoder ohne unnötige Kopien.
+
+Pro Kamera-Slot gibt es genau einen BGR-Puffer (cap.read schreibt hinein) und einen
+Graustufenpuffer (cvtColor schreibt hinein). Der Decoder bekommt den Graustufenpuffer
+per Zeiger – pyzbar.decode() würde ihn sonst bei jedem Frame mit tobytes() kopieren
+und bei BGR-Frames nur den Blaukanal nehmen. Anzeigebilder entstehen gedrosselt.
+"""
+import threading
+import time
+from ctypes import c_void_p
+
+FOURCC_Y800 = 808466521  # zbar: 8-Bit-Graustufen
+DISPLAY_FPS = 8
+
+
+class FrameStats:
+    __slots__ = ("frames", "decoded", "displayed", "allocations", "allocated_bytes")
+
+    def __init__(self):
+        self.frames = 0
+        self.decoded = 0
+        self.displayed = 0
+        self.allocations = 0
+        self.allocated_bytes = 0
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class FrameSlot:
+    """Vorab angelegte Puffer für einen Kamerastrom; neu angelegt wird nur bei Größenwechsel."""
+
+    def __init__(self):
+        self.bgr = None
+        self.gray = None
+        self.stats = FrameStats()
+
+    def _ensure(self, height, width):
+        import numpy as np
+
+        if self.gray is None or self.gray.shape != (height, width):
+            self.gray = np.empty((height, width), dtype=np.uint8)
+            self.stats.allocations += 1
+            self.stats.allocated_bytes += self.gray.nbytes
+
+    def capture(self, cap):
+        """cap.read() in den Slot-Puffer; gibt (ok, bgr) zurück."""
+        ok, frame = cap.read(self.bgr) if self.bgr is not None else cap.read()
+        if not ok:
+            return False, None
+        if frame is not self.bgr:
+            # erster Frame oder neue Auflösung -> Puffer übernehmen
+            self.bgr = frame
+            self.stats.allocations += 1
+            self.stats.allocated_bytes += frame.nbytes
+        self.stats.frames += 1
+        return True, frame
+
+    def to_gray(self, bgr):
+        """BGR-Frame in den Graustufenpuffer umrechnen (ohne neues Array)."""
+        import cv2
+
+        self._ensure(*bgr.shape[:2])
+        cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY, dst=self.gray)
+        return self.gray
+
+    def memoryview(self):
+        return memoryview(self.gray)
+
+
+class ZbarDecoder:
+    """Hält zbar-Scanner und -Bild offen und übergibt Graustufenpuffer per Zeiger.
+
+    Fällt auf pyzbar.decode() zurück, falls die pyzbar-Interna nicht passen.
+    Nicht threadsicher – pro Thread eine Instanz (siehe thread_decoder()).
+    """
+
+    def __init__(self, symbols=None):
+        from pyzbar import pyzbar
+
+        self.pyzbar = pyzbar
+        self.symbols = symbols
+        self.scanner = None
+        self.image = None
+        try:
+            from pyzbar import wrapper
+
+            self.wrapper = wrapper
+            self.scanner = wrapper.zbar_image_scanner_create()
+            if symbols:
+                for symbol in set(wrapper.ZBarSymbol).difference(symbols):
+                    wrapper.zbar_image_scanner_set_config(self.scanner, symbol, wrapper.ZBarConfig.CFG_ENABLE, 0)
+                for symbol in symbols:
+                    wrapper.zbar_image_scanner_set_config(self.scanner, symbol, wrapper.ZBarConfig.CFG_ENABLE, 1)
+            self.image = wrapper.zbar_image_create()
+            wrapper.zbar_image_set_format(self.image, FOURCC_Y800)
+            self.symbols_for_image = pyzbar._symbols_for_image
+            self.decode_symbols = pyzbar._decode_symbols
+        except (ImportError, AttributeError):
+            self.close()
+
+    def decode(self, gray):
+        """gray: C-zusammenhängendes uint8-Array (H, W). Gibt pyzbar-Decoded-Objekte zurück."""
+        if self.image is None or not gray.flags["C_CONTIGUOUS"]:
+            return self.pyzbar.decode(gray, symbols=self.symbols)
+        height, width = gray.shape
+        w = self.wrapper
+        w.zbar_image_set_size(self.image, width, height)
+        w.zbar_image_set_data(self.image, c_void_p(gray.ctypes.data), gray.nbytes, None)
+        if w.zbar_scan_image(self.scanner, self.image) < 0:
+            raise self.pyzbar.PyZbarError("Unsupported image format")
+        return list(self.decode_symbols(self.symbols_for_image(self.image)))
+
+    def close(self):
+        if self.image is not None:
+            self.wrapper.zbar_image_destroy(self.image)
+            self.image = None
+        if self.scanner is not None:
+            self.wrapper.zbar_image_scanner_destroy(self.scanner)
+            self.scanner = None
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+_local = threading.local()
+
+
+def thread_decoder(symbols=None):
+    """ZbarDecoder des aktuellen Threads (Streamlit: eine Sitzung = ein Thread pro Lauf).
+
+    symbols: nur diese Symbologien suchen (z. B. barcode_check.validator().zbar_symbols()).
+    """
+    decoders = getattr(_local, "decoders", None)
+    if decoders is None:
+        decoders = _local.decoders = {}
+    key = tuple(symbols) if symbols else None
+    decoder = decoders.get(key)
+    if decoder is None:
+        decoder = decoders[key] = ZbarDecoder(symbols)
+    return decoder
+
+
+def open_gray(file):
+    """Hochgeladenes Bild direkt als Graustufen-Array laden.
+
+    Bei JPEG dekodiert PIL im Draft-Modus nur die Helligkeit – kein RGB-Zwischenbild.
+    """
+    import numpy as np
+    from PIL import Image
+
+    image = Image.open(file)
+    if image.format == "JPEG":
+        image.draft("L", image.size)
+    if image.mode != "L":
+        image = image.convert("L")
+    return np.asarray(image)
+
+
+def open_camera(config):
+    """Kamera nach [camera] öffnen; Auflösung/FPS nur setzen, wenn angegeben (0 = Treiberstandard)."""
+    import cv2
+
+    cap = cv2.VideoCapture(config.index)
+    if not cap.isOpened():
+        return cap
+    for prop, value in ((cv2.CAP_PROP_FRAME_WIDTH, config.width), (cv2.CAP_PROP_FRAME_HEIGHT, config.height),
+                        (cv2.CAP_PROP_FPS, config.fps)):
+        if value:
+            cap.set(prop, value)
+    # Im Ruhemodus sollen keine alten Frames im Treiberpuffer warten
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, config.buffer_size)
+    return cap
+
+
+class DisplayThrottle:
+    """Anzeige höchstens `fps`-mal pro Sekunde; Decodieren läuft mit voller Rate weiter."""
+
+    def __init__(self, fps=DISPLAY_FPS):
+        self.interval = 1.0 / fps
+        self.next_at = 0.0
+
+    def due(self, now=None):
+        now = time.monotonic() if now is None else now
+        if now >= self.next_at:
+            self.next_at = now + self.interval
+            return True
+        return False
+
+
+# ----------------------------
+# Ruhemodus für die Kameraschleife
+# ----------------------------
+IDLE_FPS = 2             # Frames/s im Ruhemodus (nur Bewegungsprüfung, kein Decodieren)
+IDLE_AFTER = 3.0         # Sekunden ohne Bewegung/Barcode bis zum Ruhemodus
+THUMB_WIDTH = 160        # Vorschaubild für die Bewegungsprüfung
+MOTION_DELTA = 18        # Grauwertänderung, ab der ein Pixel als bewegt gilt
+MOTION_SHARE = 0.004     # Anteil bewegter Pixel, ab dem "Bewegung" gilt
+BARCODE_CONTRAST = 60    # Mindestwert der Strichmuster-Kennzahl
+
+
+class GateStats:
+    __slots__ = ("active_frames", "idle_frames", "wakeups", "idle_seconds", "wake_latency_max")
+
+    def __init__(self):
+        self.active_frames = 0
+        self.idle_frames = 0
+        self.wakeups = 0
+        self.idle_seconds = 0.0
+        self.wake_latency_max = 0.0
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class ActivityGate:
+    """Entscheidet pro Frame, ob decodiert wird.
+
+    Verglichen wird ein kleines Vorschaubild mit dem vorherigen (absdiff). Ohne Bewegung
+    und ohne Treffer schaltet die Schleife nach `idle_after` Sekunden in den Ruhemodus
+    und prüft nur noch `idle_fps`-mal pro Sekunde. Aufgeweckt wird durch Bewegung oder
+    ein neu auftauchendes Strichmuster (stärkerer Gradient quer als längs). Die
+    Aufwachverzögerung ist höchstens ein Ruhe-Intervall.
+    """
+
+    def __init__(self, idle_fps=IDLE_FPS, idle_after=IDLE_AFTER):
+        self.idle_interval = 1.0 / idle_fps
+        self.idle_after = idle_after
+        self.small = None
+        self.previous = None
+        self.diff = None
+        self.active = True
+        self.last_activity = None
+        self.last_check = None
+        self.idle_since = None
+        self.baseline = 0.0
+        self.stats = GateStats()
+
+    def _thumbnail(self, gray):
+        import cv2
+        import numpy as np
+
+        height, width = gray.shape
+        size = (THUMB_WIDTH, max(1, height * THUMB_WIDTH // width))
+        if self.small is None or self.small.shape != (size[1], size[0]):
+            self.small = np.empty((size[1], size[0]), dtype=np.uint8)
+            self.previous = None
+            self.diff = np.empty_like(self.small)
+        cv2.resize(gray, size, dst=self.small, interpolation=cv2.INTER_AREA)
+        return self.small
+
+    def _moved(self, small):
+        import cv2
+
+        if self.previous is None:
+            self.previous = small.copy()
+            return True
+        cv2.absdiff(small, self.previous, dst=self.diff)
+        cv2.threshold(self.diff, MOTION_DELTA, 255, cv2.THRESH_BINARY, dst=self.diff)
+        moved = cv2.countNonZero(self.diff) > MOTION_SHARE * small.size
+        # Puffer tauschen statt kopieren
+        self.small, self.previous = self.previous, small
+        return moved
+
+    @staticmethod
+    def barcode_score(small):
+        """Grobe Kennzahl für Strichcodes: Differenz |dx| - |dy|, geglättet, Maximum."""
+        import cv2
+
+        gx = cv2.convertScaleAbs(cv2.Sobel(small, cv2.CV_16S, 1, 0, ksize=3))
+        gy = cv2.convertScaleAbs(cv2.Sobel(small, cv2.CV_16S, 0, 1, ksize=3))
+        stripes = cv2.blur(cv2.subtract(gx, gy), (9, 9))
+        return cv2.minMaxLoc(stripes)[1]
+
+    def update(self, gray, now=None):
+        """Graustufenbild prüfen; True = dieses Frame decodieren."""
+        now = time.monotonic() if now is None else now
+        if self.last_activity is None:
+            self.last_activity = now
+        small = self._thumbnail(gray)
+        woke = self._moved(small)
+        if not woke and not self.active:
+            # Strichmuster, die schon beim Einschlafen im Bild waren (Türrahmen, Plakat), zählen nicht
+            woke = self.barcode_score(self.previous) > max(BARCODE_CONTRAST, self.baseline * 1.5)
+
+        if woke:
+            if not self.active:
+                self.active = True
+                self.stats.wakeups += 1
+                self.stats.idle_seconds += now - self.idle_since
+                self.stats.wake_latency_max = max(self.stats.wake_latency_max, now - self.last_check)
+            self.last_activity = now
+        elif self.active and now - self.last_activity >= self.idle_after:
+            self.active = False
+            self.idle_since = now
+            self.baseline = self.barcode_score(self.previous)
+
+        self.last_check = now
+        if self.active:
+            self.stats.active_frames += 1
+        else:
+            self.stats.idle_frames += 1
+        return self.active
+
+    def found(self, now=None):
+        """Treffer beim Decodieren hält den Vollbetrieb aufrecht."""
+        self.last_activity = time.monotonic() if now is None else now
+
+    def finish(self, now=None):
+        if not self.active and self.idle_since is not None:
+            now = time.monotonic() if now is None else now
+            self.stats.idle_seconds += now - self.idle_since
+            self.idle_since = now
+
+    def pause(self):
+        """Wartezeit bis zum nächsten Frame (0 im Vollbetrieb)."""
+        return 0.0 if self.active else self.idle_interval
@@ -0,0 +1,35 @@
+"""Streamlit-Ansicht "Handscanner" (gemeinsam für alle drei Apps)."""
+from datetime import datetime
+
+import streamlit as st
+
+from offline_queue import record_codes
+
+
+def handscanner_view():
+    st.subheader("⌨️ Handscanner (Tastatur-Modus)")
+    mode = st.radio("Modus:", ["Anmeldung", "Abmeldung"], horizontal=True, key="hid_mode")
+    st.caption("Ins Feld klicken und beliebig viele Codes scannen – jeder Scan endet mit Enter. "
+               "Erst **Übernehmen** (oder Strg+Enter) speichert alle auf einmal.")
+    # Formular: Tastendrücke des Scanners lösen keinen Rerun aus, nur das Absenden
+    with st.form("hid_form", clear_on_submit=True):
+        raw = st.text_area("Gescannte Codes", height=200)
+        submitted = st.form_submit_button("Übernehmen", type="primary")
+    if not submitted:
+        return
+    codes = list(dict.fromkeys(line.strip() for line in raw.splitlines() if line.strip()))
+    if not codes:
+        st.warning("Keine Codes gescannt.")
+        return
+    results = record_codes(codes, mode)
+    ok = [(code, name) for code, name, status in results if status == "accepted"]
+    queued = [code for code, _, status in results if status == "queued"]
+    unknown = [code for code, _, status in results if status not in ("accepted", "queued")]
+    if ok:
+        st.success(f"{len(ok)} × {mode} registriert um {datetime.now().strftime('%H:%M:%S')}: "
+                   + ", ".join(f"**{name}**" for _, name in ok))
+    if queued:
+        st.info(f"⏳ Datenbank nicht erreichbar – {len(queued)} Scan(s) offline gespeichert, "
+                "werden automatisch nachgetragen.")
+    if unknown:
+        st.warning("Unbekannte Codes: " + ", ".join(f"`{code}`" for code in unknown))
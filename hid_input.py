@@ -0,0 +1,285 @@
+"""Handscanner im Tastatur-Modus (USB-HID "keyboard wedge").
+
+Die Scanner tippen den Code sehr schnell (wenige ms pro Zeichen) und schicken meist
+Enter hinterher. WedgeBuffer trennt solche Tastenfolgen in einzelne Codes – per
+Abschlusszeichen oder, bei Scannern ohne Enter, per Pause zwischen den Tasten.
+ScanSink sammelt die Codes und protokolliert sie gebündelt, damit auch 10+ Scans
+pro Sekunde ohne eine DB-Transaktion pro Code durchgehen. Ist die DB bzw. die Scan-API
+nicht erreichbar, landen die Scans in der Offline-Warteschlange (offline_queue.py) und
+werden im Hintergrund nachgesendet.
+
+    python hid_input.py --action Anmeldung --entrance Nord            # Codes von stdin
+    python hid_input.py --evdev /dev/input/by-id/usb-...-event-kbd    # direkt vom Gerät (Linux)
+    python hid_input.py --url http://server:8765/scans                # über die Scan-API
+"""
+import argparse
+import json
+import logging
+import queue
+import sys
+import threading
+import time
+from urllib import request
+
+from offline_queue import QUEUE_PATH, api_headers, local_queue, record_scans
+from scanner_core import DB_PATH, new_scan
+from settings import settings
+
+log = logging.getLogger("hid_input")
+
+TERMINATORS = "\r\n\t"
+MAX_KEY_GAP = 0.05      # s zwischen zwei Tasten; Scanner liegen deutlich darunter
+MIN_LENGTH = 3
+DEBOUNCE = 2.0          # gleicher Code innerhalb dieser Zeit = Doppel-Lesung
+
+
+class WedgeBuffer:
+    """Zerlegt einen Tastenstrom in Codes (nach Abschlusszeichen oder Tastenpause)."""
+
+    def __init__(self, terminators=TERMINATORS, max_gap=MAX_KEY_GAP, min_length=MIN_LENGTH,
+                 accept_slow=False):
+        self.terminators = set(terminators)
+        self.max_gap = max_gap
+        self.min_length = min_length
+        self.accept_slow = accept_slow
+        self.chars = []
+        self.last_key = None
+        self.slow = False
+        # feed() läuft im Lese-Thread, flush_if_idle() im Timer-Thread
+        self.lock = threading.Lock()
+
+    def _take(self):
+        code = "".join(self.chars).strip()
+        slow = self.slow
+        self.chars = []
+        self.slow = False
+        if len(code) < self.min_length or (slow and not self.accept_slow):
+            return None
+        return code
+
+    def feed(self, text, timestamp=None):
+        """Zeichen mit Zeitstempel (time.monotonic) einspeisen; gibt fertige Codes zurück."""
+        now = time.monotonic() if timestamp is None else timestamp
+        codes = []
+        with self.lock:
+            self._feed(text, now, codes)
+        return codes
+
+    def _feed(self, text, now, codes):
+        for ch in text:
+            if self.chars and self.last_key is not None and now - self.last_key > self.max_gap:
+                if ch in self.terminators:
+                    # Langsam getippt, aber mit Enter abgeschlossen -> manuelle Eingabe
+                    self.slow = True
+                else:
+                    # Pause mitten im Strom: vorheriger Code war ohne Abschlusszeichen fertig
+                    code = self._take()
+                    if code:
+                        codes.append(code)
+            self.last_key = now
+            if ch in self.terminators:
+                code = self._take()
+                if code:
+                    codes.append(code)
+            else:
+                self.chars.append(ch)
+
+    def flush_if_idle(self, timestamp=None):
+        """Code ohne Abschlusszeichen ausgeben, wenn seit der letzten Taste Ruhe ist."""
+        now = time.monotonic() if timestamp is None else timestamp
+        with self.lock:
+            if self.chars and self.last_key is not None and now - self.last_key > self.max_gap:
+                return self._take()
+        return None
+
+
+class ScanSink:
+    """Sammelt Codes aus dem Lese-Thread und protokolliert sie gebündelt im Hintergrund."""
+
+    def __init__(self, action, entrance=None, db_path=DB_PATH, url=None, debounce=DEBOUNCE,
+                 on_result=None, queue_path=QUEUE_PATH, sync_url=None):
+        self.action = action
+        self.entrance = entrance
+        self.db_path = db_path
+        self.url = url
+        self.debounce = debounce
+        self.on_result = on_result or print_result
+        # Offline-Warteschlange mit Nachsende-Thread: per /sync der Scan-API bzw. direkt in die DB
+        self.offline = local_queue(queue_path, sync_url or sync_url_for(url), db_path)
+        self.queue = queue.Queue()
+        self.last_seen = {}
+        self.stats = {"codes": 0, "debounced": 0, "batches": 0, "logged": 0, "rejected": 0, "queued": 0}
+        self.thread = threading.Thread(target=self.run, name="scan-sink", daemon=True)
+        self.thread.start()
+
+    def put(self, code):
+        now = time.monotonic()
+        last = self.last_seen.get(code)
+        self.last_seen[code] = now
+        if last is not None and now - last < self.debounce:
+            self.stats["debounced"] += 1
+            return
+        self.stats["codes"] += 1
+        # scan_id und Zeitpunkt beim Lesen – bleiben gleich, falls der Scan nachgesendet wird
+        self.queue.put(new_scan(code, self.action, self.entrance))
+
+    def post(self, scans):
+        req = request.Request(self.url, data=json.dumps(scans).encode("utf-8"),
+                              headers=api_headers(), method="POST")
+        with request.urlopen(req, timeout=10) as resp:
+            return [(r["code"], r["name"], r["status"]) for r in json.loads(resp.read())]
+
+    def write(self, scans):
+        return record_scans(scans, self.db_path, self.post if self.url else None, self.offline)
+
+    def run(self):
+        while True:
+            scans = [self.queue.get()]
+            # [batch] hid_flush_interval/-size: wie lange bzw. wie viele Scans höchstens gesammelt werden
+            batch = settings().batch
+            deadline = time.monotonic() + batch.hid_flush_interval
+            while len(scans) < batch.hid_flush_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    scans.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                results = self.write(scans)
+            except Exception as e:
+                # nicht einmal die Warteschlange ging (Platte voll o. Ä.) oder die Scan-API lehnt ab (z. B. 401)
+                log.error("Scans konnten nicht gespeichert werden (%s): %s", e,
+                          ", ".join(scan["code"] for scan in scans))
+                continue
+            self.stats["batches"] += 1
+            for code, name, status in results:
+                self.stats[{"accepted": "logged", "queued": "queued"}.get(status, "rejected")] += 1
+                self.on_result(code, name, status)
+
+    def drain(self, timeout=5):
+        deadline = time.monotonic() + timeout
+        while not self.queue.empty() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        time.sleep(settings().batch.hid_flush_interval * 2)
+
+
+def print_result(code, name, status):
+    stamp = time.strftime("%H:%M:%S")
+    if status == "accepted":
+        print(f"{stamp} ✅ {name} ({code})", flush=True)
+    elif status == "queued":
+        print(f"{stamp} ⏳ Offline gespeichert, wird nachgesendet ({code})", flush=True)
+    elif status == "rejected":
+        print(f"{stamp} ❌ Kein Ausweis-Code ({code})", flush=True)
+    else:
+        print(f"{stamp} ❌ Unbekannt ({code})", flush=True)
+
+
+def sync_url_for(url):
+    """/sync zur Scan-API-Adresse (…/scans); ohne url wird direkt in die DB nachgesendet."""
+    if not url:
+        return None
+    base = url.rstrip("/")
+    return (base[: -len("/scans")] if base.endswith("/scans") else base) + "/sync"
+
+
+# ----------------------------
+# Eingabequellen
+# ----------------------------
+def read_stdin(sink, buffer):
+    """Zeilenweise von stdin (Terminal mit Scanner im Fokus, Pipe, Datei)."""
+    for line in sys.stdin:
+        for code in buffer.feed(line if line.endswith("\n") else line + "\n"):
+            sink.put(code)
+
+
+# evdev-Tastencodes -> Zeichen (US-Layout, wie es die meisten Scanner senden)
+_EVDEV_KEYS = {
+    **{f"KEY_{d}": d for d in "0123456789"},
+    **{f"KEY_{c}": c.lower() for c in "ABCDEFGHIJKLMNOPQRSTUVWXYZ"},
+    "KEY_MINUS": "-", "KEY_DOT": ".", "KEY_SLASH": "/", "KEY_SPACE": " ",
+    "KEY_ENTER": "\n", "KEY_KPENTER": "\n", "KEY_TAB": "\t",
+    **{f"KEY_KP{d}": d for d in "0123456789"},
+}
+_EVDEV_SHIFTED = {"-": "_", "/": "?", ".": ">"}
+
+
+def monotonic_stamp(realtime):
+    """Zeitstempel eines evdev-Ereignisses (Wanduhr, CLOCK_REALTIME) auf time.monotonic() umrechnen.
+
+    Der Abstand zwischen den Tasten bleibt genau wie vom Kernel gemessen; flush_if_idle() im
+    Timer-Thread vergleicht dann mit derselben Uhr.
+    """
+    return realtime - time.time() + time.monotonic()
+
+
+def read_evdev(sink, buffer, device_path):
+    """Direkt vom Eingabegerät lesen (Linux, Paket `evdev`); das Gerät wird exklusiv belegt."""
+    import evdev
+
+    device = evdev.InputDevice(device_path)
+    device.grab()
+    shift = False
+    try:
+        for event in device.read_loop():
+            if event.type != evdev.ecodes.EV_KEY:
+                continue
+            key = evdev.categorize(event)
+            name = key.keycode if isinstance(key.keycode, str) else key.keycode[0]
+            if name in ("KEY_LEFTSHIFT", "KEY_RIGHTSHIFT"):
+                shift = key.keystate != key.key_up
+                continue
+            if key.keystate != key.key_down or name not in _EVDEV_KEYS:
+                continue
+            ch = _EVDEV_KEYS[name]
+            if shift:
+                ch = _EVDEV_SHIFTED.get(ch, ch.upper())
+            for code in buffer.feed(ch, monotonic_stamp(event.timestamp())):
+                sink.put(code)
+    finally:
+        device.ungrab()
+
+
+def idle_flusher(sink, buffer):
+    """Für Scanner ohne Enter: angefangene Codes nach der Tastenpause abschließen."""
+    while True:
+        time.sleep(buffer.max_gap)
+        code = buffer.flush_if_idle()
+        if code:
+            sink.put(code)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Handscanner (Tastatur-Modus) einlesen")
+    parser.add_argument("--action", default="Anmeldung", choices=["Anmeldung", "Abmeldung"])
+    parser.add_argument("--entrance")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--url", help="Scan-API statt direkter DB, z. B. http://server:8765/scans")
+    parser.add_argument("--queue", default=QUEUE_PATH, help="Offline-Warteschlange")
+    parser.add_argument("--sync-url", help="Nachsenden an (Standard: /sync neben --url)")
+    parser.add_argument("--evdev", metavar="DEVICE", help="Eingabegerät statt stdin")
+    parser.add_argument("--max-gap", type=float, default=MAX_KEY_GAP)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+
+    sink = ScanSink(args.action, args.entrance, args.db, args.url,
+                    queue_path=args.queue, sync_url=args.sync_url)
+    try:
+        if args.evdev:
+            buffer = WedgeBuffer(max_gap=args.max_gap)
+            threading.Thread(target=idle_flusher, args=(sink, buffer), daemon=True).start()
+            read_evdev(sink, buffer, args.evdev)
+        else:
+            # stdin ist zeilengepuffert -> keine Tastenzeiten, jede Zeile ist ein Code
+            read_stdin(sink, WedgeBuffer(max_gap=float("inf"), accept_slow=True))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sink.drain()
+        log.info("Statistik: %s", sink.stats)
+
+
+if __name__ == "__main__":
+    main()
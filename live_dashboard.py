@@ -0,0 +1,62 @@
+"""Streamlit-Ansicht "Live-Anwesenheit" (gemeinsam für alle drei Apps).
+
+Die Ansicht läuft als Fragment: nur dieser Teil der Seite wird alle REFRESH_SECONDS neu
+gezeichnet, nicht das ganze Skript. Die Daten kommen aus presence.board() – einem Snapshot,
+den alle offenen Dashboards des Prozesses teilen.
+"""
+import streamlit as st
+
+from presence import RATE_MINUTES, board
+from settings import settings
+
+# [cache] dashboard_refresh; run_every wird beim Import festgelegt -> Änderung nach Neustart
+REFRESH_SECONDS = settings().cache.dashboard_refresh
+
+
+@st.fragment(run_every=REFRESH_SECONDS)
+def _live_panel():
+    import pandas as pd
+
+    snapshot = board().snapshot()
+    present, recent = snapshot["present"], snapshot["recent"]
+    last_minute = sum(counts[-1] for counts in snapshot["rate"].values())
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Anwesend", len(present))
+    col2.metric("Scans letzte Minute", last_minute)
+    col3.metric("Letzter Scan", recent[0]["time"] if recent else "–")
+
+    left, right = st.columns(2)
+    with left:
+        st.markdown("**Anwesend**")
+        if present:
+            st.dataframe(
+                pd.DataFrame(present, columns=["name", "student_id", "since", "entrance"])
+                .rename(columns={"name": "Name", "student_id": "Barcode-ID", "since": "Seit", "entrance": "Eingang"}),
+                hide_index=True, use_container_width=True,
+            )
+        else:
+            st.caption("Niemand angemeldet.")
+    with right:
+        st.markdown("**Letzte Scans**")
+        if recent:
+            st.dataframe(
+                pd.DataFrame(recent, columns=["time", "name", "action", "entrance"])
+                .rename(columns={"time": "Uhrzeit", "name": "Name", "action": "Aktion", "entrance": "Eingang"}),
+                hide_index=True, use_container_width=True,
+            )
+        else:
+            st.caption("Heute noch keine Scans.")
+
+    st.markdown(f"**Scans pro Minute je Eingang** (letzte {RATE_MINUTES} Minuten)")
+    if snapshot["rate"]:
+        st.bar_chart(pd.DataFrame(snapshot["rate"], index=snapshot["minutes"]))
+    else:
+        st.caption("Noch keine Daten.")
+
+
+def live_dashboard_view():
+    st.subheader("📡 Live-Anwesenheit")
+    st.caption(f"Aktualisiert sich alle {REFRESH_SECONDS:g} s von selbst. "
+               "Für Bildschirme am Eingang: `python scan_api.py` → http://server:8765/dashboard")
+    _live_panel()
@@ -0,0 +1,307 @@
+"""Lokale Warteschlange für Scans, wenn das Schul-WLAN weg ist.
+
+Scans bekommen beim Erfassen eine eindeutige scan_id und ihren Zeitstempel und werden
+in einer lokalen SQLite-Datei gepuffert. Sobald der Server erreichbar ist, gehen sie
+in Batches an POST /sync (scan_api.py) bzw. direkt in die DB; doppelt gesendete Batches
+sind unschädlich.
+
+Die Oberflächen und hid_input.py nutzen record_scans(): Ist die DB bzw. die Scan-API nicht
+erreichbar, landen die Scans hier, und ein Hintergrund-Thread sendet sie nach – ebenso offene
+Scans eines früheren Laufs, sobald der Prozess das erste Mal protokolliert. Scheitert
+ein Batch am Server (nicht am Netz), wird er halbiert, bis der schuldige Scan gefunden ist;
+nach MAX_ATTEMPTS Fehlversuchen wird dieser 'parked' und blockiert die übrigen nicht mehr.
+
+    python offline_queue.py add 4711 --action Anmeldung --entrance Haupteingang
+    python offline_queue.py sync --url http://server:8765/sync
+    python offline_queue.py agent --url http://server:8765/sync   # dauerhaft nachsenden
+    python offline_queue.py status
+    python offline_queue.py retry                                 # geparkte Scans erneut versuchen
+"""
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from urllib import error, request
+
+from scanner_core import DB_PATH, ingest_scan_batch, new_scan, register_scans
+from settings import settings
+
+log = logging.getLogger("offline_queue")
+
+QUEUE_PATH = "scan_queue.db"
+SYNC_URL = "http://localhost:8765/sync"
+MAX_ATTEMPTS = 5        # Fehlversuche am Server, danach 'parked'
+AGENT_INTERVAL = 15
+
+
+def unreachable(exc):
+    """Netz bzw. DB gerade weg (später erneut versuchen) – im Gegensatz zu einer Ablehnung des Batches."""
+    if isinstance(exc, error.HTTPError):
+        return exc.code in (502, 503, 504)  # Proxy erreichbar, Scan-API nicht
+    from storage import unavailable_errors
+
+    return isinstance(exc, (error.URLError, OSError, *unavailable_errors()))
+
+
+class ScanQueue:
+    def __init__(self, path=QUEUE_PATH):
+        self.path = path
+        # Erfassen (Oberfläche, Handscanner) und Nachsenden laufen in verschiedenen Threads
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS queue (
+                scan_id TEXT PRIMARY KEY,
+                code TEXT NOT NULL,
+                action TEXT NOT NULL,
+                scanned_at TEXT NOT NULL,
+                entrance TEXT,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        self.connection.execute("CREATE INDEX IF NOT EXISTS idx_queue_status ON queue (status, scanned_at)")
+        self.connection.commit()
+
+    def enqueue(self, code, action, entrance=None, scanned_at=None):
+        """Scan lokal vormerken; gibt die scan_id zurück."""
+        scan_id = uuid.uuid4().hex
+        scanned_at = (scanned_at or datetime.now()).isoformat(timespec="milliseconds")
+        self.enqueue_scans([{"scan_id": scan_id, "code": code, "action": action,
+                             "scanned_at": scanned_at, "entrance": entrance}])
+        return scan_id
+
+    def enqueue_scans(self, scans):
+        """Fertige Scans (scanner_core.new_scan) vormerken; scan_id und Zeitpunkt bleiben erhalten."""
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO queue (scan_id, code, action, scanned_at, entrance) VALUES (?, ?, ?, ?, ?)",
+                [(s["scan_id"], s["code"], s["action"], s["scanned_at"], s.get("entrance")) for s in scans],
+            )
+
+    def pending(self, limit=None):
+        limit = limit or settings().batch.offline_batch_size
+        rows = self.connection.execute(
+            """SELECT scan_id, code, action, scanned_at, entrance FROM queue
+               WHERE status = 'pending' ORDER BY scanned_at LIMIT ?""",
+            (limit,),
+        ).fetchall()
+        keys = ("scan_id", "code", "action", "scanned_at", "entrance")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def mark(self, scan_ids, status):
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "UPDATE queue SET status = ? WHERE scan_id = ?", [(status, sid) for sid in scan_ids]
+            )
+
+    def failed(self, scan_id, exc):
+        """Ein einzelner Scan scheitert am Server; nach MAX_ATTEMPTS wird er geparkt."""
+        with self.lock, self.connection:
+            self.connection.execute(
+                """UPDATE queue SET attempts = attempts + 1,
+                   status = CASE WHEN attempts + 1 >= ? THEN 'parked' ELSE status END
+                   WHERE scan_id = ?""",
+                (MAX_ATTEMPTS, scan_id),
+            )
+        log.warning("Scan %s nicht übernommen (%s)", scan_id, exc)
+
+    def retry_parked(self):
+        with self.lock, self.connection:
+            return self.connection.execute(
+                "UPDATE queue SET status = 'pending', attempts = 0 WHERE status = 'parked'"
+            ).rowcount
+
+    def counts(self):
+        return dict(self.connection.execute("SELECT status, COUNT(*) FROM queue GROUP BY status").fetchall())
+
+    def deliver(self, batch, send):
+        """Batch senden; Rückgabe: (übernommen, fehlgeschlagen).
+
+        Netzfehler gehen nach oben (alles bleibt 'pending'). Lehnt der Server den Batch ab,
+        wird er halbiert – so bleibt nur der fehlerhafte Scan hängen, nicht die ganze Warteschlange.
+        """
+        try:
+            result = send(batch)
+        except Exception as e:
+            if unreachable(e):
+                raise
+            if len(batch) == 1:
+                self.failed(batch[0]["scan_id"], e)
+                return 0, 1
+            half = len(batch) // 2
+            first, second = self.deliver(batch[:half], send), self.deliver(batch[half:], send)
+            return first[0] + second[0], first[1] + second[1]
+        # Duplikate hat der Server schon -> genauso erledigt wie übernommene Scans
+        self.mark(result.get("accepted", []) + result.get("duplicates", []), "synced")
+        self.mark(result.get("unknown", []), "unknown")
+        self.mark([sid for sid in result.get("invalid", []) if sid], "invalid")
+        self.mark(result.get("rejected", []), "rejected")
+        return len(result.get("accepted", [])), 0
+
+    def sync(self, url=SYNC_URL, batch_size=None, timeout=10, db_path=None):
+        """Alle offenen Scans hochladen (url) bzw. direkt in die DB übernehmen (url=None).
+
+        Rückgabe: Anzahl übernommener Scans. Bricht beim ersten Netzwerkfehler ab; die restlichen
+        Scans bleiben 'pending'. Nach einem Durchgang mit Fehlversuchen ist bis zum nächsten
+        Aufruf Schluss, damit ein kurzer Serverfehler nicht sofort alles parkt.
+        """
+        batch_size = batch_size or settings().batch.offline_batch_size
+        if url:
+            def send(batch):
+                return post_batch(url, batch, timeout)
+        else:
+            def send(batch):
+                return ingest_scan_batch(batch, db_path or DB_PATH)
+        total = 0
+        while True:
+            batch = self.pending(batch_size)
+            if not batch:
+                return total
+            accepted, failures = self.deliver(batch, send)
+            total += accepted
+            if failures or len(batch) < batch_size:
+                return total
+
+
+def api_headers():
+    """JSON-Header für die Scan-API, mit Token aus [auth] api_token."""
+    headers = {"Content-Type": "application/json"}
+    token = settings().auth.api_token
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    return headers
+
+
+def post_batch(url, scans, timeout=10):
+    data = json.dumps({"scans": scans}).encode("utf-8")
+    req = request.Request(url, data=data, headers=api_headers(), method="POST")
+    with request.urlopen(req, timeout=timeout) as resp:
+        return json.loads(resp.read().decode("utf-8"))
+
+
+def run_agent(queue, url=SYNC_URL, interval=AGENT_INTERVAL, db_path=None):
+    """Dauerhaft nachsenden (url=None: direkt in die DB); ohne Netz mit wachsendem Abstand."""
+    delay = interval
+    while True:
+        try:
+            sent = queue.sync(url, db_path=db_path)
+            if sent:
+                log.info("%d Scans übertragen", sent)
+            delay = interval
+        except Exception as e:
+            if not unreachable(e):
+                log.exception("Nachsenden fehlgeschlagen")
+            else:
+                log.warning("Server nicht erreichbar (%s), %s offen", e, queue.counts().get("pending", 0))
+            delay = min(delay * 2, 300)
+        time.sleep(delay)
+
+
+# ----------------------------
+# Erfassen mit Rückfallebene (Oberflächen, Handscanner)
+# ----------------------------
+_queues = {}
+_checked = set()
+_queues_lock = threading.Lock()
+
+
+def local_queue(path=QUEUE_PATH, url=None, db_path=None):
+    """Warteschlange des Prozesses; beim ersten Aufruf startet der Nachsende-Thread.
+
+    url: /sync der Scan-API, sonst wird direkt in `db_path` übernommen.
+    """
+    with _queues_lock:
+        queue = _queues.get(path)
+        if queue is None:
+            queue = _queues[path] = ScanQueue(path)
+            threading.Thread(target=run_agent, args=(queue, url, AGENT_INTERVAL, db_path),
+                             name="offline-agent", daemon=True).start()
+    return queue
+
+
+def resume_pending(path=QUEUE_PATH, db_path=None):
+    """Offene Scans eines früheren Laufs nachsenden, auch wenn die DB jetzt erreichbar ist.
+
+    Einmal pro Prozess und Datei geprüft; ohne offene Scans bleibt es bei der Prüfung.
+    """
+    with _queues_lock:
+        if path in _queues or path in _checked or not os.path.exists(path):
+            return
+        _checked.add(path)
+    connection = sqlite3.connect(path, timeout=30)
+    try:
+        pending = connection.execute("SELECT 1 FROM queue WHERE status = 'pending' LIMIT 1").fetchone()
+    except sqlite3.OperationalError:  # gesperrt oder Datei ohne Tabelle -> beim nächsten Scan erneut
+        with _queues_lock:
+            _checked.discard(path)
+        return
+    finally:
+        connection.close()
+    if pending:
+        log.info("Offene Scans in %s – werden nachgesendet", path)
+        local_queue(path, db_path=db_path)
+
+
+def record_scans(scans, db_path=DB_PATH, send=None, queue=None):
+    """Scans protokollieren; ist DB bzw. Scan-API nicht erreichbar, werden sie lokal vorgemerkt.
+
+    send(scans) -> [(code, name, status)] ersetzt das direkte Schreiben (z. B. POST /scans).
+    Rückgabe wie scanner_core.register_scans, vorgemerkte Scans mit status "queued".
+    Andere Fehler (Programmfehler, abgelehnte Anfrage) gehen an den Aufrufer.
+    """
+    if queue is None:
+        resume_pending(db_path=db_path)
+    try:
+        return send(scans) if send else register_scans(scans, db_path)
+    except Exception as e:
+        if not unreachable(e):
+            raise
+        (queue or local_queue(db_path=db_path)).enqueue_scans(scans)
+        log.warning("%d Scans lokal vorgemerkt (%s)", len(scans), e)
+        return [(scan["code"], None, "queued") for scan in scans]
+
+
+def record_codes(codes, action, entrance=None, db_path=DB_PATH):
+    """record_scans für frisch gelesene Codes (Kamera, Handscanner-Feld)."""
+    return record_scans([new_scan(code, action, entrance) for code in codes], db_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline-Warteschlange für Scans")
+    parser.add_argument("--queue", default=QUEUE_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+    add = sub.add_parser("add", help="Scan vormerken")
+    add.add_argument("code")
+    add.add_argument("--action", default="Anmeldung", choices=["Anmeldung", "Abmeldung"])
+    add.add_argument("--entrance")
+    for name in ("sync", "agent"):
+        p = sub.add_parser(name)
+        p.add_argument("--url", default=SYNC_URL)
+        p.add_argument("--interval", type=int, default=15)
+    sub.add_parser("status")
+    sub.add_parser("retry", help="geparkte Scans wieder auf 'pending' setzen")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+
+    queue = ScanQueue(args.queue)
+    if args.command == "add":
+        print(queue.enqueue(args.code, args.action, args.entrance))
+    elif args.command == "sync":
+        print(f"{queue.sync(args.url)} Scans übertragen, Stand: {queue.counts()}")
+    elif args.command == "agent":
+        run_agent(queue, args.url, args.interval)
+    elif args.command == "retry":
+        print(f"{queue.retry_parked()} Scans wieder offen")
+    else:
+        print(queue.counts())
+
+
+if __name__ == "__main__":
+    main()
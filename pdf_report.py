@@ -0,0 +1,268 @@
+import copy
+import os
+from collections import Counter
+from datetime import datetime
+from functools import lru_cache
+
+from fpdf import FPDF
+from fpdf.enums import XPos, YPos
+
+from settings import settings
+
+# ----------------------------
+# Schrift (Unicode-TTF, einmal pro Prozess gesucht und geparst)
+# ----------------------------
+FONT_FAMILY = "LogbuchSans"
+# fonts/DejaVuSans.ttf liegt im Repository (Lizenz: fonts/LICENSE) -> ö, ş, ł, ğ überall lesbar
+FONT_CANDIDATES = [
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "fonts", "DejaVuSans.ttf"),
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/TTF/DejaVuSans.ttf",
+    "/usr/share/fonts/dejavu/DejaVuSans.ttf",
+    "/Library/Fonts/Arial Unicode.ttf",
+    "C:/Windows/Fonts/arial.ttf",
+]
+
+# Tabellenlayout: (Überschrift, Breite in mm, Index in der Log-Zeile)
+COLUMNS = [
+    ("Datum", 24, 2),
+    ("Uhrzeit", 20, 3),
+    ("Name", 70, 1),
+    ("Barcode-ID", 40, 0),
+    ("Aktion", 26, 4),
+]
+ROW_HEIGHT = 6
+FONT_SIZE = 9
+
+
+@lru_cache(maxsize=None)
+def find_font_path():
+    """Erste vorhandene Unicode-TTF ([reports] font_path hat Vorrang).
+
+    Ohne TTF gibt es kein Logbuch: Helvetica kann nur Latin-1, Namen wie "Çağrı" oder
+    "Łukasz" würden zu "?" – lieber ein klarer Fehler als ein stillschweigend falsches PDF.
+    """
+    candidates = [settings().reports.font_path] + FONT_CANDIDATES
+    for path in candidates:
+        if path and os.path.isfile(path):
+            return path
+    raise FileNotFoundError(
+        "Keine Unicode-Schrift für das PDF-Logbuch gefunden (fonts/DejaVuSans.ttf fehlt) – "
+        "Datei wiederherstellen oder [reports] font_path setzen"
+    )
+
+
+@lru_cache(maxsize=None)
+def _font_template(path):
+    """TTF einmal parsen (Breiten, cmap, Deskriptor) – add_font() täte das für jeden Bericht."""
+    from pathlib import Path
+
+    from fpdf.fonts import TTFFont
+
+    return TTFFont(FPDF(), Path(path), FONT_FAMILY.lower(), "")
+
+
+def add_report_font(pdf, path):
+    """Schrift aus der Vorlage ins Dokument (TTFFont.__deepcopy__, wie fpdf2s FPDFRecorder).
+
+    Die Kopie teilt ttfont mit der Vorlage, das Subsetting beim Ausgeben verändert ttfont aber –
+    deshalb je Dokument ein frisches (lazy, kaum Kosten) und eine Subset-Tabelle, die auf diese
+    Kopie zeigt. Getestet mit fpdf2 2.8.x (tests/test_pdf_report.py: zwei Berichte hintereinander).
+    """
+    from fontTools import ttLib
+    from fpdf.fonts import SubsetMap
+
+    font = copy.deepcopy(_font_template(path))
+    font.i = len(pdf.fonts) + 1
+    font.ttfont = ttLib.TTFont(path, recalcTimestamp=False, lazy=True)
+    font.subset = SubsetMap(font)
+    pdf.fonts[font.fontkey] = font
+
+
+# ----------------------------
+# Seitenvorlage
+# ----------------------------
+class LogReport(FPDF):
+    def __init__(self, title):
+        super().__init__(orientation="P", unit="mm", format="A4")
+        self.report_title = title
+        self.group_title = None
+        self.table_active = False
+        self.created = datetime.now().strftime("%d.%m.%Y %H:%M")
+
+        add_report_font(self, find_font_path())
+        self.font_name = FONT_FAMILY
+
+        self.set_auto_page_break(True, margin=15)
+        self.set_margins(15, 15, 15)
+        # Überschriftenzeile wird einmal aufgebaut und auf jeder Seite wiederverwendet
+        self.header_cells = [(label, width) for label, width, _ in COLUMNS]
+        self.columns = [(width, index) for _, width, index in COLUMNS]
+        self.table_width = sum(width for width, _ in self.columns)
+        self.fit_cache = {}
+        self.max_chars = {
+            index: int(width / (self._avg_char_width() or 1)) for width, index in self.columns
+        }
+
+    def _avg_char_width(self):
+        self.set_font(self.font_name, size=FONT_SIZE)
+        return self.get_string_width("abcdefghijklmnopqrstuvwxyz") / 26
+
+    def header(self):
+        self.set_font(self.font_name, size=13)
+        self.cell(0, 8, self.report_title, new_x=XPos.LMARGIN, new_y=YPos.NEXT, align="C")
+        if self.group_title:
+            self.set_font(self.font_name, size=11)
+            self.cell(0, 7, self.group_title, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+        self.ln(2)
+        if self.table_active:
+            self.table_header()
+
+    def footer(self):
+        self.set_y(-12)
+        self.set_font(self.font_name, size=8)
+        self.cell(0, 6, f"Erstellt am {self.created}", align="L")
+        self.set_x(self.l_margin)
+        self.cell(0, 6, f"Seite {self.page_no()}/{{nb}}", align="R")
+
+    def table_header(self):
+        self.set_font(self.font_name, size=FONT_SIZE)
+        self.set_fill_color(225, 225, 225)
+        for label, width in self.header_cells:
+            self.cell(width, ROW_HEIGHT + 1, label, border=1, fill=True)
+        self.ln(ROW_HEIGHT + 1)
+
+    def fit(self, text, width, index):
+        # Breitenmessung nur für Texte, die überhaupt zu lang sein könnten; Ergebnis wird
+        # gemerkt, weil sich Namen im Logbuch ständig wiederholen.
+        if len(text) < self.max_chars[index] - 2:
+            return text
+        key = (text, index)
+        fitted = self.fit_cache.get(key)
+        if fitted is None:
+            fitted = text
+            if self.get_string_width(text) > width - 2:
+                while fitted and self.get_string_width(fitted + "…") > width - 2:
+                    fitted = fitted[:-1]
+                fitted += "…"
+            self.fit_cache[key] = fitted
+        return fitted
+
+    def grid(self, top):
+        # Senkrechte Tabellenlinien einmal pro Seite statt Rahmen um jede Zelle
+        x = self.l_margin
+        self.line(x, top, x, self.y)
+        for width, _ in self.columns:
+            x += width
+            self.line(x, top, x, self.y)
+
+    def table_rows(self, rows):
+        # Zeilen werden mit text()/line() gezeichnet; cell() ist pro Zelle etwa 6x teurer.
+        self.set_font(self.font_name, size=FONT_SIZE)
+        fit = self.fit
+        right = self.l_margin + self.table_width
+        positions = []
+        x = self.l_margin
+        for width, index in self.columns:
+            positions.append((x + 1, width, index))
+            x += width
+
+        top = self.y
+        for row in rows:
+            if self.y + ROW_HEIGHT > self.page_break_trigger:
+                self.grid(top)
+                self.add_page()
+                self.set_font(self.font_name, size=FONT_SIZE)
+                top = self.y
+            baseline = self.y + ROW_HEIGHT - 1.8
+            for x, width, index in positions:
+                value = row[index]
+                if value is None or value == "":
+                    continue
+                self.text(x, baseline, fit(str(value), width, index))
+            self.set_y(self.y + ROW_HEIGHT)
+            self.line(self.l_margin, self.y, right, self.y)
+        self.grid(top)
+
+    def start_table(self, group_title=None):
+        self.table_active = False
+        self.group_title = group_title
+        self.add_page()
+        self.table_active = True
+        self.table_header()
+
+    def summary(self, logs, grouped):
+        self.table_active = False
+        self.group_title = "Zusammenfassung"
+        self.add_page()
+        self.set_font(self.font_name, size=FONT_SIZE + 1)
+
+        actions = Counter(row[4] for row in logs)
+        students = {row[0] for row in logs}
+        times = sorted(row[3] for row in logs if row[3])
+        lines = [
+            f"Einträge gesamt: {len(logs)}",
+            f"Verschiedene Schüler: {len(students)}",
+        ]
+        if times:
+            lines.append(f"Erster / letzter Scan: {times[0]} / {times[-1]}")
+        for action, count in sorted(actions.items()):
+            lines.append(f"{action}: {count}")
+        for line in lines:
+            self.cell(0, ROW_HEIGHT + 1, line, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+
+        if grouped:
+            self.ln(4)
+            widths = (50, 30, 30, 30, 30)
+            labels = ("Klasse", "Einträge", "Schüler", "Anmeldung", "Abmeldung")
+            self.set_fill_color(225, 225, 225)
+            for label, width in zip(labels, widths):
+                self.cell(width, ROW_HEIGHT + 1, label, border=1, fill=True)
+            self.ln(ROW_HEIGHT + 1)
+            for klass, rows in grouped:
+                per_action = Counter(row[4] for row in rows)
+                values = (
+                    klass,
+                    len(rows),
+                    len({row[0] for row in rows}),
+                    per_action.get("Anmeldung", 0),
+                    per_action.get("Abmeldung", 0),
+                )
+                for value, width in zip(values, widths):
+                    self.cell(width, ROW_HEIGHT, str(value), border=1)
+                self.ln(ROW_HEIGHT)
+
+
+# ----------------------------
+# Öffentliche Funktionen
+# ----------------------------
+def group_by_class(logs):
+    """Gruppiert Log-Zeilen mit Klasse (6. Spalte) -> [(klasse, zeilen), ...], sortiert."""
+    groups = {}
+    for row in logs:
+        klass = (row[5] if len(row) > 5 else None) or "Ohne Klasse"
+        groups.setdefault(klass, []).append(row)
+    return sorted(groups.items(), key=lambda item: (item[0] == "Ohne Klasse", item[0]))
+
+
+def render_log_report(logs, title, by_class=False, summary=True):
+    """Baut das PDF-Objekt. logs: (student_id, name, date, time, action[, klass])."""
+    pdf = LogReport(title)
+    grouped = group_by_class(logs) if by_class else None
+
+    if grouped:
+        for klass, rows in grouped:
+            pdf.start_table(f"Klasse: {klass} ({len(rows)} Einträge)")
+            pdf.table_rows(rows)
+    else:
+        pdf.start_table()
+        pdf.table_rows(logs)
+
+    if summary:
+        pdf.summary(logs, grouped)
+    return pdf
+
+
+def build_log_report(logs, title, by_class=False, summary=True):
+    """Fertiges PDF als bytes (für st.download_button oder zum Speichern)."""
+    return bytes(render_log_report(logs, title, by_class, summary).output())
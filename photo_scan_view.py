@@ -0,0 +1,43 @@
+"""Streamlit-Ansicht "Barcode scannen" per Foto der Browser-Kamera (Client- und WebUntis-App)."""
+from datetime import datetime
+
+import streamlit as st
+
+from barcode_check import REASON_TEXTS
+from offline_queue import record_codes
+from scanner_core import decode_barcodes
+
+
+def photo_scan_view(not_found):
+    """not_found: Hinweis, wo ein unbekannter Barcode angelegt bzw. zugeordnet wird."""
+    st.subheader("🎦 Barcode scannen (Browser-Kamera)")
+    mode = st.radio("Modus:", ["Anmeldung", "Abmeldung"], horizontal=True)
+    st.caption("Hinweis: Die Kamera läuft im **Browser**. Jede Person nutzt ihre **eigene Webcam**.")
+
+    # st.camera_input nimmt ein Foto auf (Snapshot). Für „Live-Scan“ bräuchte man JS/streamlit-webrtc.
+    img_file = st.camera_input("Kamera freigeben und Foto aufnehmen")
+    if img_file is None:
+        return
+    from frames import open_gray
+
+    results = decode_barcodes(open_gray(img_file))
+    if not results:
+        st.warning("Kein Barcode/QR erkannt. Bitte näher ran oder besseres Licht.")
+        return
+
+    st.success(f"{len(results)} Code(s) erkannt:")
+    for res in results:
+        code = res["data"]
+        st.write(f"- **{res['type']}**: `{code}`")
+        if res["reason"] not in (None, "unknown"):
+            st.warning(f"Kein Schülerausweis ({REASON_TEXTS[res['reason']]}) – ignoriert.")
+            continue
+        _, name, status = record_codes([code], mode)[0] if res["reason"] is None else (None, None, None)
+        if status == "accepted":
+            st.info(f"✅ {mode} registriert: **{name}** ({code}) um {datetime.now().strftime('%H:%M:%S')}")
+        elif status == "queued":
+            st.info(f"⏳ Datenbank nicht erreichbar – {mode} für `{code}` offline gespeichert.")
+        else:
+            st.warning(not_found)
+
+    st.button("Neues Foto machen", type="primary")
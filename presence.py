@@ -0,0 +1,196 @@
+"""Live-Anwesenheit: eine Projektion pro Prozess und DB, gespeist vom Ereignisbus.
+
+Wer gerade da ist (letzte Aktion des Tages = Anmeldung), die letzten Scans und Scans pro
+Minute je Eingang. Dashboards lesen nur snapshot() – der Snapshot wird einmal pro Änderung
+gebaut und von allen Betrachtern geteilt, die DB wird pro Betrachter nie abgefragt.
+
+Scans aus anderen Prozessen (Scan-API, Hintergrunddienste) holt refresh() nach: höchstens
+einmal pro [cache] presence_tail Sekunden eine Abfrage `WHERE id > ?` – unabhängig von der Zahl der Betrachter.
+Auf PostgreSQL committen Schreiber ids nicht in Reihenfolge; die Nachlese rückt deshalb erst vor,
+wenn der Server keine kleinere id mehr nachliefern kann (storage.scan_tail).
+"""
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+
+from events import bus
+from scanner_core import DB_PATH
+from settings import settings
+from storage import storage
+
+RECENT = 30            # letzte Scans im Dashboard
+RATE_MINUTES = 15      # Verlauf Scans/Minute
+NO_ENTRANCE = "–"
+FIELDS = ("id", "student_id", "name", "date", "time", "action", "entrance")
+
+
+class PresenceBoard:
+    def __init__(self, db_path=DB_PATH):
+        self.db_path = db_path
+        self.lock = threading.RLock()
+        self.version = 0
+        self.day = None
+        self.present = {}          # student_id -> {"name", "since", "entrance"}
+        self.recent = deque(maxlen=RECENT)
+        self.per_minute = {}       # entrance -> Counter({"HH:MM": n})
+        self.tail_id = 0           # bis hier ist alles gelesen; die Nachlese beginnt dahinter
+        self.tail_pending = None   # Stand der Server-DB, ab dem tail_id weiterrücken darf
+        self.seen = set()          # schon übernommene IDs > tail_id (Bus oder Nachlese)
+        self.checked_at = 0.0
+        self.cached = None
+        self.cached_version = None
+        self.listeners = []        # callback(scans) für übernommene Scans (z. B. Server-Push)
+        self.unsubscribe = bus.subscribe(self.on_events)
+        self.reload()
+
+    # ----------------------------
+    # Einspeisen
+    # ----------------------------
+    def reload(self):
+        """Heutigen Stand einmal aus der DB laden (Start und Tageswechsel)."""
+        today = datetime.now().strftime("%Y-%m-%d")
+        rows, settled, pending = storage(self.db_path).scan_tail(0, today)
+        with self.lock:
+            self.day = today
+            self.present.clear()
+            self.recent.clear()
+            self.per_minute.clear()
+            self.seen = {row[0] for row in rows if row[0] > settled}
+            for row in rows:
+                self.apply(dict(zip(FIELDS, row)))
+            self.tail_id, self.tail_pending = settled, pending
+            self.checked_at = time.monotonic()
+            self.version += 1
+            for callback in self.listeners:
+                callback(None)
+
+    def apply(self, event):
+        """Einen Scan übernehmen; Rückgabe: Eintrag für "recent" oder None (anderer Tag)."""
+        if event["date"] != self.day:
+            return None
+        name, stamp = event["name"], event["time"]
+        entrance = event.get("entrance") or NO_ENTRANCE
+        if event["action"] == "Abmeldung":
+            self.present.pop(event["student_id"], None)
+        else:
+            self.present[event["student_id"]] = {"name": name, "since": stamp, "entrance": entrance}
+        entry = {"time": stamp, "name": name, "student_id": event["student_id"],
+                 "action": event["action"], "entrance": entrance}
+        self.recent.appendleft(entry)
+        self.per_minute.setdefault(entrance, Counter())[stamp[:5]] += 1
+        return entry
+
+    def _changed(self, applied):
+        """Nach dem Übernehmen (unter Lock): Version erhöhen, Zuhörer benachrichtigen."""
+        if not applied:
+            return
+        self.version += 1
+        for callback in self.listeners:
+            callback(applied)
+
+    def on_events(self, events):
+        """Bus-Abonnent (läuft im Thread des Schreibers – nur Speicher, keine DB)."""
+        with self.lock:
+            applied = []
+            for event in events:
+                if event["kind"] != "scan" or event.get("db") != self.db_path:
+                    continue
+                if event["id"] <= self.tail_id or event["id"] in self.seen:
+                    continue
+                self.seen.add(event["id"])
+                entry = self.apply(event)
+                if entry:
+                    applied.append(entry)
+            self._changed(applied)
+
+    def refresh(self, force=False):
+        """Scans anderer Prozesse nachlesen – gedrosselt, für alle Betrachter gemeinsam."""
+        now = time.monotonic()
+        interval = settings().cache.presence_tail
+        if not force and now - self.checked_at < interval:
+            return
+        with self.lock:
+            if not force and now - self.checked_at < interval:
+                return
+            self.checked_at = now
+            if datetime.now().strftime("%Y-%m-%d") != self.day:
+                self.reload()
+                return
+            rows, settled, self.tail_pending = storage(self.db_path).scan_tail(
+                self.tail_id, self.day, self.tail_pending
+            )
+            applied = []
+            for row in rows:
+                event = dict(zip(FIELDS, row))
+                if event["id"] in self.seen:
+                    continue
+                self.seen.add(event["id"])
+                entry = self.apply(event)
+                if entry:
+                    applied.append(entry)
+            self.tail_id = settled
+            self.seen = {seen_id for seen_id in self.seen if seen_id > settled}
+            self._changed(applied)
+
+    # ----------------------------
+    # Lesen
+    # ----------------------------
+    def snapshot(self):
+        """Aktueller Stand als dict; neu gebaut nur bei Änderungen oder neuer Minute."""
+        self.refresh()
+        with self.lock:
+            key = (self.version, self.minute_key(0))
+            if self.cached_version == key:
+                return self.cached
+            minutes = [self.minute_key(i) for i in range(RATE_MINUTES - 1, -1, -1)]
+            self.cached = {
+                "version": self.version,
+                "day": self.day,
+                "present": sorted(
+                    ({"student_id": sid, **info} for sid, info in self.present.items()),
+                    key=lambda item: item["name"] or "",
+                ),
+                "recent": list(self.recent),
+                "minutes": minutes,
+                "rate": {entrance: [counts.get(m, 0) for m in minutes]
+                         for entrance, counts in sorted(self.per_minute.items())},
+            }
+            self.cached_version = key
+            return self.cached
+
+    @staticmethod
+    def minute_key(minutes_ago):
+        return datetime.fromtimestamp(time.time() - 60 * minutes_ago).strftime("%H:%M")
+
+    def listen(self, callback):
+        """callback(scans) für jeden neu übernommenen Scan-Block, callback(None) nach reload().
+
+        Läuft unter dem Lock – kurz halten.
+        """
+        with self.lock:
+            self.listeners.append(callback)
+
+        def stop():
+            with self.lock:
+                if callback in self.listeners:
+                    self.listeners.remove(callback)
+        return stop
+
+    def close(self):
+        self.unsubscribe()
+
+
+_boards = {}
+_boards_lock = threading.Lock()
+
+
+def board(db_path=DB_PATH):
+    """Die gemeinsame Projektion des Prozesses für `db_path`."""
+    existing = _boards.get(db_path)
+    if existing is None:
+        with _boards_lock:
+            existing = _boards.get(db_path)
+            if existing is None:
+                existing = _boards[db_path] = PresenceBoard(db_path)
+    return existing
@@ -0,0 +1,534 @@
+"""HTTP/JSON-Schnittstelle für Scans außerhalb der Streamlit-Oberfläche.
+
+    python scan_api.py --port 8765
+
+Endpunkte:
+    POST /scans              ein Scan {"code", "action", ["entrance", "scan_id", "scanned_at"]}
+                             oder eine Liste davon
+    GET  /students/{barcode} Schüler zu einem Barcode
+    GET  /logs?from=&to=     Logbuch (Datum YYYY-MM-DD, Standard: heute)
+    POST /sync               Batch offline gesammelter Scans (siehe offline_queue.py)
+    GET  /events             Live-Anwesenheit als Server-Sent Events (Snapshot, dann Scans)
+    GET  /dashboard          Live-Anwesenheit im Browser (nutzt /events)
+    GET  /stats              Zähler der Code-Prüfung (abgelehnte Lesungen je Grund)
+
+Jede Anfrage braucht Zugangsdaten aus [auth]: "Authorization: Bearer <token>" mit einem
+Token aus api_tokens (Geräte, hid_input.py, offline_queue.py) oder HTTP-Basic mit einem
+Benutzer aus users (Browser, /dashboard). Standardmäßig lauscht der Server nur auf
+127.0.0.1; im Schul-Netz --host 0.0.0.0 und eigene Tokens setzen.
+
+Schreibzugriffe laufen über einen einzigen Schreib-Thread, der alle gerade wartenden
+Scans in einer Transaktion übernimmt (Group Commit); jeder Scan wird vorher einzeln
+geprüft, und scheitert der gemeinsame Schreibvorgang doch, wird jede Anfrage für sich
+wiederholt. Ist die DB nicht erreichbar, antwortet der Server mit 503 (Clients puffern dann
+offline). Lesezugriffe über einen kleinen
+Thread-Pool mit je einer offenen Verbindung. Live-Daten kommen aus presence.board():
+jeder Scan wird einmal kodiert und an alle offenen /events-Verbindungen verteilt.
+"""
+import argparse
+import asyncio
+import base64
+import hmac
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from http import HTTPStatus
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from barcode_check import validator
+from presence import board
+from scanner_core import (
+    DB_PATH, fetch_logs_between, get_student_name, initialize_database, insert_scans, local_timestamp, new_scan,
+    publish_scans,
+)
+from settings import settings
+from storage import unavailable_errors
+
+log = logging.getLogger("scan_api")
+
+MAX_BODY = 10 * 1024 * 1024
+LOG_COLUMNS = ("student_id", "name", "date", "time", "action")
+SSE_BUFFER = 1024 * 1024  # ungesendete Bytes pro Verbindung, danach gilt der Client als zu langsam
+SSE_KEEPALIVE = 15     # Sekunden bis zum Kommentar-Ping ohne Ereignisse
+DASHBOARD_HTML = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dashboard.html")
+ACTIONS = ("Anmeldung", "Abmeldung")
+CHALLENGE = (("WWW-Authenticate", 'Basic realm="Scan-API", charset="UTF-8"'),)
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message, headers=()):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = headers
+
+
+class Request:
+    __slots__ = ("method", "path", "query", "headers", "body")
+
+    def __init__(self, method, target, headers, body):
+        url = urlsplit(target)
+        self.method = method
+        self.path = url.path.rstrip("/") or "/"
+        self.query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        self.headers = headers
+        self.body = body
+
+    def json(self):
+        try:
+            return json.loads(self.body or b"null")
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Ungültiges JSON")
+
+
+async def read_request(reader):
+    """Eine HTTP/1.1-Anfrage lesen; None bei geschlossener Verbindung."""
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except (asyncio.IncompleteReadError, ConnectionError):
+        return None
+    except asyncio.LimitOverrunError:
+        raise HTTPError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Header zu groß")
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, target, _ = lines[0].split(" ", 2)
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Ungültige Anfragezeile")
+    headers = {}
+    for line in lines[1:]:
+        if ":" in line:
+            key, value = line.split(":", 1)
+            headers[key.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get("content-length") or 0)
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Ungültige Content-Length")
+    if length > MAX_BODY:
+        raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Anfrage zu groß")
+    body = await reader.readexactly(length) if length else b""
+    return Request(method.upper(), target, headers, body)
+
+
+def authorized(headers, config=None):
+    """Bearer-Token aus [auth] api_tokens oder HTTP-Basic mit einem Benutzer aus [auth] users."""
+    config = config or settings().auth
+    scheme, _, value = headers.get("authorization", "").partition(" ")
+    value = value.strip()
+    if scheme.lower() == "bearer":
+        return any(hmac.compare_digest(value.encode(), token.encode()) for token in config.api_tokens)
+    if scheme.lower() == "basic":
+        try:
+            user, _, password = base64.b64decode(value, validate=True).decode("utf-8").partition(":")
+        except (ValueError, UnicodeDecodeError):
+            return False
+        expected = config.users.get(user)
+        return expected is not None and hmac.compare_digest(password.encode(), expected.encode())
+    return False
+
+
+def normalize_scan(item):
+    """Einen Scan aus einer Anfrage prüfen und in Form bringen; None = ungültig.
+
+    So landet nichts im gemeinsamen Schreibvorgang, was dort für alle anderen Anfragen
+    scheitern würde (Zahlen als Code sind erlaubt, Listen/Objekte nicht).
+    """
+    if not isinstance(item, dict):
+        return None
+    code, action = item.get("code"), item.get("action")
+    entrance, scan_id, scanned_at = item.get("entrance"), item.get("scan_id"), item.get("scanned_at")
+    if isinstance(code, int) and not isinstance(code, bool):
+        code = str(code)
+    if not isinstance(code, str) or not code.strip() or action not in ACTIONS:
+        return None
+    if entrance is not None and not isinstance(entrance, str):
+        return None
+    if scan_id is not None and not (isinstance(scan_id, str) and scan_id):
+        return None
+    if scanned_at is not None:
+        try:
+            local_timestamp(scanned_at)
+        except (TypeError, ValueError):
+            return None
+    return new_scan(code.strip(), action, entrance, scan_id, scanned_at)
+
+
+def encode_response(status, payload, keep_alive=True, headers=()):
+    """JSON-Antwort; bytes werden als HTML ausgeliefert."""
+    if isinstance(payload, bytes):
+        body, content_type = payload, "text/html; charset=utf-8"
+    else:
+        body, content_type = json.dumps(payload, ensure_ascii=False).encode("utf-8"), "application/json; charset=utf-8"
+    status = HTTPStatus(status)
+    head = (
+        f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        + "".join(f"{key}: {value}\r\n" for key, value in headers)
+        + f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    return head.encode("latin-1") + body
+
+
+def encode_event(kind, data):
+    """Ein Server-Sent Event (einmal kodiert, an alle Verbindungen geschickt)."""
+    return f"event: {kind}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8")
+
+
+class EventFanout:
+    """Verteilt neue Scans aus presence.board() an alle /events-Verbindungen.
+
+    Pro Scan-Block gibt es genau eine JSON-Kodierung; dieselben Bytes gehen direkt in den
+    Sendepuffer jeder Verbindung (kein Task-Wechsel pro Client). Einen Snapshot bauen nur
+    neue Verbindungen und Tageswechsel (gecacht pro Version).
+    """
+
+    def __init__(self, db_path):
+        self.board = board(db_path)
+        self.clients = set()
+        self.pending = {}          # writer -> [(version, bytes)], gesammelt während des Snapshots
+        self.loop = None
+        self.stop = None
+        self.snapshot_key = None
+        self.snapshot_bytes = b""
+
+    def start(self):
+        self.loop = asyncio.get_running_loop()
+        self.stop = self.board.listen(self.on_scans)
+
+    def on_scans(self, scans):
+        # läuft im Schreib- oder Leser-Thread (unter dem Lock des Boards) -> an die Event-Loop übergeben
+        if scans is None:
+            self.loop.call_soon_threadsafe(self.loop.create_task, self.send_snapshot())
+        else:
+            self.loop.call_soon_threadsafe(self.broadcast, encode_event("scan", scans), self.board.version)
+
+    def broadcast(self, payload, version):
+        for buffered in self.pending.values():
+            buffered.append((version, payload))
+        for writer in list(self.clients):
+            if writer.transport.get_write_buffer_size() > SSE_BUFFER:
+                # zu langsamer Client: Verbindung beenden, der Browser verbindet sich neu
+                self.clients.discard(writer)
+                writer.close()
+            else:
+                writer.write(payload)
+
+    async def send_snapshot(self):
+        self.broadcast(*await asyncio.get_running_loop().run_in_executor(None, self.snapshot))
+
+    def snapshot(self):
+        """Snapshot als SSE-Bytes und die Version des Boards, die er abbildet."""
+        snapshot = self.board.snapshot()
+        key = (snapshot["version"], snapshot["minutes"][-1])
+        if key != self.snapshot_key:
+            self.snapshot_bytes = encode_event("snapshot", snapshot)
+            self.snapshot_key = key
+        return self.snapshot_bytes, key[0]
+
+    async def tail(self):
+        """Scans anderer Prozesse nachlesen – eine Abfrage pro Intervall für alle Verbindungen."""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(settings().cache.presence_tail)
+            if self.clients or self.pending:
+                try:
+                    await loop.run_in_executor(None, self.board.refresh)
+                except Exception:
+                    log.exception("Nachlesen fehlgeschlagen")
+
+
+class EventStream:
+    """Antwort-Objekt für /events: hält die Verbindung offen, geschrieben wird von EventFanout."""
+
+    def __init__(self, fanout):
+        self.fanout = fanout
+
+    async def run(self, reader, writer):
+        writer.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: text/event-stream; charset=utf-8\r\n"
+            b"Cache-Control: no-cache\r\n"
+            b"Connection: keep-alive\r\n\r\n"
+        )
+        # Schon vor dem Snapshot anmelden: Scans, die währenddessen kommen, werden gepuffert und
+        # danach nachgereicht – außer denen, die der Snapshot laut Version schon enthält.
+        buffered = self.fanout.pending[writer] = []
+        try:
+            payload, version = await asyncio.get_running_loop().run_in_executor(None, self.fanout.snapshot)
+            writer.write(payload)
+            for event_version, event in buffered:
+                if event_version > version:
+                    writer.write(event)
+            self.fanout.clients.add(writer)
+        finally:
+            del self.fanout.pending[writer]
+        await writer.drain()
+        try:
+            # Der Client sendet nichts mehr; read() endet, wenn er die Verbindung schließt
+            while writer in self.fanout.clients:
+                try:
+                    if not await asyncio.wait_for(reader.read(1024), SSE_KEEPALIVE):
+                        break
+                except asyncio.TimeoutError:
+                    writer.write(b": ping\n\n")
+        finally:
+            self.fanout.clients.discard(writer)
+
+
+class ScanWriter:
+    """Group Commit: sammelt die Scans aller wartenden Anfragen und schreibt sie zusammen."""
+
+    def __init__(self, db_path, max_batch=None):
+        self.db_path = db_path
+        self.max_batch = max_batch or settings().batch.api_max_batch
+        # SQLite hat genau einen Schreiber -> ein Thread für Schreibzugriffe
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-writer")
+        self.queue = None
+        self.task = None
+
+    def start(self):
+        self.queue = asyncio.Queue()
+        self.task = asyncio.get_running_loop().create_task(self.run())
+
+    async def submit(self, scans):
+        """Scans schreiben; Rückgabe ({scan_id: status}, {code: name})."""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((scans, future))
+        return await future
+
+    def write(self, scans):
+        events = []
+        result, names = insert_scans(scans, events, self.db_path)
+        publish_scans(events, self.db_path)
+        statuses = {}
+        for status, scan_ids in result.items():
+            for scan_id in scan_ids:
+                statuses[scan_id] = status
+        return statuses, names
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await self.queue.get()]
+            count = len(items[0][0])
+            while count < self.max_batch and not self.queue.empty():
+                item = self.queue.get_nowait()
+                items.append(item)
+                count += len(item[0])
+            scans = [scan for batch, _ in items for scan in batch]
+            try:
+                outcome = await loop.run_in_executor(self.executor, self.write, scans)
+            except Exception as e:
+                if len(items) == 1:
+                    if not items[0][1].done():
+                        items[0][1].set_exception(e)
+                    continue
+                # Eine fehlerhafte Anfrage darf die Scans der anderen nicht mitreißen -> einzeln wiederholen
+                log.warning("Gemeinsamer Schreibvorgang fehlgeschlagen (%s), %d Anfragen einzeln", e, len(items))
+                for batch, future in items:
+                    try:
+                        result = await loop.run_in_executor(self.executor, self.write, batch)
+                    except Exception as single:
+                        if not future.done():
+                            future.set_exception(single)
+                    else:
+                        if not future.done():
+                            future.set_result(result)
+                continue
+            for _, future in items:
+                if not future.done():
+                    future.set_result(outcome)
+
+
+class ScanAPI:
+    def __init__(self, db_path=DB_PATH):
+        self.db_path = db_path
+        self.writer = ScanWriter(db_path)
+        self.readers = ThreadPoolExecutor(max_workers=settings().pools.api_read_workers, thread_name_prefix="db-reader")
+        self.fanout = None
+        self.fanout_task = None
+        self.dashboard = None
+        self.routes = {
+            ("POST", "/scans"): self.post_scans,
+            ("GET", "/logs"): self.get_logs,
+            ("POST", "/sync"): self.post_sync,
+            ("GET", "/events"): self.get_events,
+            ("GET", "/dashboard"): self.get_dashboard,
+            ("GET", "/stats"): self.get_stats,
+        }
+        self.prefix_routes = [
+            ("GET", "/students/", self.get_student),
+        ]
+
+    async def run_read(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.readers, func, *args)
+
+    async def dispatch(self, request):
+        handler = self.routes.get((request.method, request.path))
+        if handler is not None:
+            return await handler(request)
+        for method, prefix, handler in self.prefix_routes:
+            if request.path.startswith(prefix):
+                if method != request.method:
+                    raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, "Methode nicht erlaubt")
+                return await handler(request, unquote(request.path[len(prefix):]))
+        if any(path == request.path for _, path in self.routes):
+            raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, "Methode nicht erlaubt")
+        raise HTTPError(HTTPStatus.NOT_FOUND, "Nicht gefunden")
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                headers = ()
+                try:
+                    request = await read_request(reader)
+                    if request is None:
+                        break
+                    if not authorized(request.headers):
+                        raise HTTPError(HTTPStatus.UNAUTHORIZED, "Anmeldung erforderlich", CHALLENGE)
+                    keep_alive = request.headers.get("connection", "").lower() != "close"
+                    status, payload = await self.dispatch(request)
+                    if isinstance(payload, EventStream):
+                        await payload.run(reader, writer)
+                        break
+                except HTTPError as e:
+                    keep_alive = False
+                    status, payload, headers = e.status, {"error": e.message}, e.headers
+                except unavailable_errors() as e:
+                    # DB gesperrt/Server weg: 503 -> Clients merken die Scans vor und senden später nach
+                    log.warning("Datenbank nicht erreichbar: %s", e)
+                    keep_alive = False
+                    status, payload = HTTPStatus.SERVICE_UNAVAILABLE, {"error": "Datenbank nicht erreichbar"}
+                except Exception:
+                    log.exception("Fehler bei der Anfrage")
+                    keep_alive = False
+                    status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": "Interner Fehler"}
+                writer.write(encode_response(status, payload, keep_alive, headers))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    # ----------------------------
+    # Endpunkte
+    # ----------------------------
+    async def post_scans(self, request):
+        body = request.json()
+        single = isinstance(body, dict)
+        items = [body] if single else body
+        if not isinstance(items, list) or not items:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Erwartet einen Scan oder eine Liste von Scans")
+        limit = settings().batch.api_max_batch
+        if len(items) > limit:
+            raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"Höchstens {limit} Scans pro Anfrage")
+        scans = []
+        for item in items:
+            if not isinstance(item, dict) or not item.get("code") or not item.get("action"):
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "Jeder Scan braucht \"code\" und \"action\"")
+            scan = normalize_scan(item)
+            if scan is None:
+                raise HTTPError(HTTPStatus.BAD_REQUEST, f"Ungültiger Scan (action: {'/'.join(ACTIONS)}, "
+                                "code/entrance/scan_id als Text, scanned_at als ISO-Zeitpunkt)")
+            scans.append(scan)
+
+        statuses, names = await self.writer.submit(scans)
+        out = [
+            {
+                "scan_id": scan["scan_id"],
+                "code": scan["code"],
+                "name": names.get(scan["code"]),
+                "status": statuses.get(scan["scan_id"], "invalid"),
+            }
+            for scan in scans
+        ]
+        return HTTPStatus.OK, out[0] if single else out
+
+    def lookup_checked(self, barcode):
+        """Nur Codes, die barcode_check durchlässt, gehen an die DB."""
+        code, reason = validator(self.db_path).check(barcode)
+        return get_student_name(code, self.db_path) if reason is None else None
+
+    async def get_student(self, request, barcode):
+        name = await self.run_read(self.lookup_checked, barcode)
+        if name is None:
+            raise HTTPError(HTTPStatus.NOT_FOUND, "Kein Schüler mit diesem Barcode")
+        return HTTPStatus.OK, {"id": barcode, "name": name}
+
+    async def get_stats(self, request):
+        return HTTPStatus.OK, {"validation": validator(self.db_path).stats(), "dashboards": len(self.fanout.clients)}
+
+    async def get_logs(self, request):
+        today = date.today().isoformat()
+        date_from = request.query.get("from", today)
+        date_to = request.query.get("to", date_from if "from" in request.query else today)
+        try:
+            date.fromisoformat(date_from), date.fromisoformat(date_to)
+            limit = int(request.query.get("limit", 10000))
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "from/to als YYYY-MM-DD, limit als Zahl")
+        rows = await self.run_read(fetch_logs_between, date_from, date_to, self.db_path, limit)
+        return HTTPStatus.OK, [dict(zip(LOG_COLUMNS, row)) for row in rows]
+
+    async def post_sync(self, request):
+        body = request.json()
+        scans = body.get("scans") if isinstance(body, dict) else body
+        if not isinstance(scans, list):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "Erwartet {\"scans\": [...]}")
+        limit = settings().batch.api_max_batch
+        if len(scans) > limit:
+            raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"Höchstens {limit} Scans pro Batch")
+        result = {"accepted": [], "duplicates": [], "unknown": [], "invalid": [], "rejected": []}
+        valid = []
+        for item in scans:
+            scan = normalize_scan(item) if isinstance(item, dict) and item.get("scan_id") else None
+            if scan is None:
+                scan_id = item.get("scan_id") if isinstance(item, dict) else None
+                result["invalid"].append(scan_id if isinstance(scan_id, str) else None)
+            else:
+                valid.append(scan)
+        statuses, _ = await self.writer.submit(valid) if valid else ({}, {})
+        for scan in valid:
+            result[statuses.get(scan["scan_id"], "invalid")].append(scan["scan_id"])
+        return HTTPStatus.OK, result
+
+    async def get_events(self, request):
+        return HTTPStatus.OK, EventStream(self.fanout)
+
+    async def get_dashboard(self, request):
+        if self.dashboard is None:
+            with open(DASHBOARD_HTML, "rb") as f:
+                self.dashboard = f.read()
+        return HTTPStatus.OK, self.dashboard
+
+    async def serve(self, host, port):
+        self.writer.start()
+        initialize_database(self.db_path)
+        self.fanout = EventFanout(self.db_path)
+        self.fanout.start()
+        self.fanout_task = asyncio.get_running_loop().create_task(self.fanout.tail())
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        log.info("Scan-API auf http://%s:%d", host, port)
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP/JSON-Schnittstelle für Scans")
+    parser.add_argument("--host", default="127.0.0.1", help="0.0.0.0 = im ganzen Netz erreichbar")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--db", default=DB_PATH)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+    try:
+        asyncio.run(ScanAPI(args.db).serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,402 @@
+"""Kern für alle Oberflächen (app.py, barcode_scanner_client.py, scanner_webuntis.py) und Dienste.
+
+Stabile API – Oberflächen greifen nur hierüber auf Schüler, Log, Decoder und Export zu:
+
+    Nachschlagen  get_student_name, lookup_names, fetch_students
+    Protokoll     log_scan, register_codes, ingest_scan_batch
+    Decodieren    decode_barcodes
+    Auswertung    fetch_logs_for_report, fetch_logs_between, export_log_pdf
+    Schema        initialize_database
+
+Schüler anlegen/ändern/löschen: event_store (create_student, rename_student, ...).
+Gelesen und geschrieben wird über storage.py – SQLite (students.db) oder laut [database]
+backend ein PostgreSQL-Server.
+"""
+import json
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+
+from events import bus
+from settings import on_change, settings
+
+# ----------------------------
+# Gemeinsame Datenbank-Helfer (Apps, Hintergrunddienste)
+# ----------------------------
+# Pfad steht in den Standardwerten aller Funktionen -> Änderung erst nach Neustart
+DB_PATH = settings().database.path
+
+
+def connect(db_path=DB_PATH):
+    # Wartezeit bei gesperrter DB (z. B. während VACUUM), statt sofort "database is locked"
+    return sqlite3.connect(db_path, timeout=settings().database.busy_timeout)
+
+
+def apply_pragmas(connection, config=None):
+    """PRAGMAs aus [database] setzen; gilt je Verbindung (journal_mode bleibt in der Datei)."""
+    config = config or settings().database
+    try:
+        connection.execute(f"PRAGMA journal_mode={config.journal_mode}")
+    except sqlite3.OperationalError:
+        pass  # DB gerade gesperrt – dann eben ohne WAL, die nächste Verbindung versucht es erneut
+    connection.execute(f"PRAGMA synchronous={config.synchronous}")
+    connection.execute(f"PRAGMA temp_store={config.temp_store}")
+    if config.cache_size_kib:
+        connection.execute(f"PRAGMA cache_size=-{config.cache_size_kib}")
+    if config.mmap_size_mib:
+        connection.execute(f"PRAGMA mmap_size={config.mmap_size_mib * 1024 * 1024}")
+
+
+# Zähler für geänderte [database]-Einstellungen: gepoolte Verbindungen übernehmen sie beim nächsten get()
+_pragma_generation = 0
+
+
+def _database_changed(old, new):
+    global _pragma_generation
+    if old.database != new.database:
+        _pragma_generation += 1
+
+
+on_change(_database_changed)
+
+
+class ConnectionPool:
+    """Eine offene Verbindung pro Thread (sqlite3-Verbindungen sind nicht threadsicher).
+
+    Spart das Öffnen pro Abfrage; WAL + synchronous=NORMAL (Standard, siehe settings.py)
+    lassen Leser parallel zum Schreiber laufen und machen Commits deutlich billiger.
+    """
+
+    def __init__(self, db_path=DB_PATH):
+        self.db_path = db_path
+        self.local = threading.local()
+
+    def get(self):
+        settings()  # Datei-Beobachtung anstoßen (höchstens alle paar Sekunden ein stat)
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = self.local.connection = connect(self.db_path)
+            self.local.generation = -1
+        if self.local.generation != _pragma_generation:
+            self.local.generation = _pragma_generation
+            connection.execute(f"PRAGMA busy_timeout={int(settings().database.busy_timeout * 1000)}")
+            apply_pragmas(connection)
+        return connection
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def pooled(db_path=DB_PATH):
+    """Verbindung des aktuellen Threads zur DB `db_path`."""
+    pool = _pools.get(db_path)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.setdefault(db_path, ConnectionPool(db_path))
+    return pool.get()
+
+
+def table_columns(connection, table):
+    return {row[1] for row in connection.execute(f"PRAGMA table_info({table})")}
+
+
+# ----------------------------
+# Nachschlagen & Protokollieren (gemeinsam für alle Oberflächen und die Scan-API)
+# ----------------------------
+def _storage(db_path):
+    from storage import storage  # storage importiert scanner_core
+
+    return storage(db_path)
+
+
+def get_student_name(barcode_id, db_path=DB_PATH):
+    return _storage(db_path).student_name(barcode_id)
+
+
+def scan_event(row_id, student_id, name, date, time, action, entrance=None):
+    return {"id": row_id, "student_id": student_id, "name": name, "date": date, "time": time,
+            "action": action, "entrance": entrance}
+
+
+def publish_scans(events, db_path=DB_PATH):
+    """Gespeicherte Scans an den Ereignisbus (erst nach dem Commit aufrufen)."""
+    bus.publish_many("scan", [dict(event, db=db_path) for event in events])
+
+
+def log_scan(student_id, name, action, db_path=DB_PATH):
+    at = datetime.now().isoformat(timespec="milliseconds")
+    seq, = _storage(db_path).write_scans([(student_id, name, action, uuid.uuid4().hex, at, None)])
+    publish_scans([scan_event(seq, student_id, name, at[:10], at[11:19], action)], db_path)
+
+
+def fetch_logs_between(date_from, date_to, db_path=DB_PATH, limit=10000):
+    return _storage(db_path).logs_between(date_from, date_to, limit)
+
+
+def fetch_logs_for_report(date_str, db_path=DB_PATH):
+    """Logzeilen eines Tages mit Klasse als 6. Spalte."""
+    return _storage(db_path).logs_for_day(date_str)
+
+
+def fetch_students(db_path=DB_PATH):
+    """Aktuelle Schüler als (id, name, klass, untis_student_id), nach Name sortiert."""
+    return _storage(db_path).students()
+
+
+def decode_barcodes(gray, db_path=DB_PATH):
+    """Codes in einem Graustufenbild (frames.open_gray) – geprüft, aber noch nicht nachgeschlagen.
+
+    Rückgabe: [{"type", "data", "reason"}], reason None = gültig, sonst Grund aus barcode_check.REASONS.
+    """
+    from barcode_check import validator
+    from frames import thread_decoder
+
+    check = validator(db_path)
+    out = []
+    for r in thread_decoder(check.zbar_symbols()).decode(gray):
+        data, reason = check.check(r.data, r.type)
+        out.append({"type": r.type, "data": data if data is not None else repr(r.data), "reason": reason})
+    return out
+
+
+def export_log_pdf(logs, date_str):
+    """PDF-Logbuch eines Tages: (dateiname, bytes). Mit Klassen (6. Spalte) nach Klassen gruppiert."""
+    from pdf_report import build_log_report
+
+    by_class = any(len(row) > 5 and row[5] for row in logs)
+    return f"logbuch_{date_str}.pdf", build_log_report(logs, f"Schüler-Logbuch für {date_str}", by_class=by_class)
+
+
+# ----------------------------
+# Ereignisse (append-only) – students, student_history und log sind Projektionen daraus
+# ----------------------------
+EVENT_KINDS = ("scan", "student_created", "student_renamed", "student_deleted", "mapping_changed")
+
+
+def append_event(connection, kind, student_id, data=None, at=None, scan_id=None):
+    """Ein Ereignis anhängen (ohne Commit); Rückgabe: seq, bei bereits bekannter scan_id None."""
+    cursor = connection.execute(
+        "INSERT OR IGNORE INTO events (kind, student_id, at, scan_id, data) VALUES (?, ?, ?, ?, ?)",
+        (kind, student_id, at or datetime.now().isoformat(timespec="milliseconds"), scan_id,
+         json.dumps(data or {}, ensure_ascii=False)),
+    )
+    return cursor.lastrowid if cursor.rowcount else None
+
+
+def project_scan(connection, seq, student_id, name, date, time, action,
+                 scan_id=None, scanned_at=None, entrance=None):
+    """Log-Projektion eines Scans; log.id ist die seq des Ereignisses (bleibt bei Rebuilds gleich)."""
+    connection.execute(
+        """INSERT INTO log (id, student_id, name, date, time, action, scan_id, scanned_at, entrance)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+        (seq, student_id, name, date, time, action, scan_id, scanned_at, entrance),
+    )
+
+
+# ----------------------------
+# Schema (einmal pro Prozess statt bei jedem Streamlit-Rerun)
+# ----------------------------
+STUDENT_COLUMNS = {"untis_student_id": "TEXT", "klass": "TEXT"}
+LOG_COLUMNS = {"scan_id": "TEXT", "scanned_at": "TEXT", "entrance": "TEXT"}
+
+# Ein Eintrag je Inhaber einer Ausweisnummer (created_seq..deleted_seq); legacy-Schüler ab 0
+# NULL ist in UNIQUE-Indizes mehrfach erlaubt -> alte Zeilen ohne scan_id bleiben gültig
+LOG_INDEXES = {
+    "idx_log_scan_id": "CREATE UNIQUE INDEX IF NOT EXISTS idx_log_scan_id ON log (scan_id)",
+    "idx_log_date_time": "CREATE INDEX IF NOT EXISTS idx_log_date_time ON log (date, time)",
+    "idx_log_student": "CREATE INDEX IF NOT EXISTS idx_log_student ON log (student_id)",
+}
+
+_initialized = set()
+_init_lock = threading.Lock()
+
+
+def initialize_database(db_path=DB_PATH):
+    """Tabellen anlegen und fehlende Spalten nachrüsten.
+
+    Streamlit führt das Skript bei jeder Interaktion neu aus, Module bleiben aber geladen –
+    deshalb merkt sich der Prozess hier, welche DBs schon geprüft sind.
+    """
+    if db_path in _initialized:
+        return
+    with _init_lock:
+        if db_path in _initialized:
+            return
+        with connect(db_path) as connection:
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS students (
+                    id TEXT PRIMARY KEY,
+                    name TEXT NOT NULL
+                )
+            """)
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS log (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    student_id TEXT,
+                    name TEXT,
+                    date TEXT,
+                    time TEXT,
+                    action TEXT
+                )
+            """)
+            for table, wanted in (("students", STUDENT_COLUMNS), ("log", LOG_COLUMNS)):
+                existing = table_columns(connection, table)
+                for column, kind in wanted.items():
+                    if column not in existing:
+                        connection.execute(f"ALTER TABLE {table} ADD COLUMN {column} {kind}")
+            for statement in LOG_INDEXES.values():
+                connection.execute(statement)
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS events (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    kind TEXT NOT NULL,
+                    student_id TEXT,
+                    at TEXT NOT NULL,
+                    scan_id TEXT UNIQUE,
+                    data TEXT NOT NULL DEFAULT '{}'
+                )
+            """)
+            for action in ("UPDATE", "DELETE"):
+                connection.execute(f"""
+                    CREATE TRIGGER IF NOT EXISTS events_no_{action.lower()} BEFORE {action} ON events
+                    BEGIN SELECT RAISE(ABORT, 'events ist append-only'); END
+                """)
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS student_history (
+                    id TEXT NOT NULL,
+                    name TEXT,
+                    klass TEXT,
+                    untis_student_id TEXT,
+                    created_at TEXT,
+                    deleted_at TEXT,
+                    created_seq INTEGER NOT NULL,
+                    deleted_seq INTEGER,
+                    PRIMARY KEY (id, created_seq)
+                )
+            """)
+            from event_store import ensure_event_log
+
+            ensure_event_log(connection)
+            connection.commit()
+        _initialized.add(db_path)
+
+
+def lookup_names(codes, connection):
+    """{barcode: name} für alle bekannten Codes mit einer IN-Abfrage."""
+    codes = list(set(codes))
+    names = {}
+    # SQLite erlaubt höchstens 999 Parameter pro Abfrage (ältere Versionen)
+    for i in range(0, len(codes), 900):
+        chunk = codes[i:i + 900]
+        placeholders = ",".join("?" * len(chunk))
+        names.update(connection.execute(
+            f"SELECT id, name FROM students WHERE id IN ({placeholders})", chunk
+        ).fetchall())
+    return names
+
+
+def new_scan(code, action, entrance=None, scan_id=None, scanned_at=None):
+    """Scan-Dict im Format von ingest_scan_batch (scan_id/Zeitstempel werden ergänzt)."""
+    return {
+        "scan_id": scan_id or uuid.uuid4().hex,
+        "code": code,
+        "action": action,
+        "scanned_at": scanned_at or datetime.now().isoformat(timespec="milliseconds"),
+        "entrance": entrance,
+    }
+
+
+def local_timestamp(value):
+    """ISO-Zeitstempel als naive Ortszeit – wie alle Zeilen im Logbuch.
+
+    Geräte mit "...Z" oder "+02:00" würden sonst beim Sortieren mit naiven Zeiten kollidieren.
+    """
+    stamp = datetime.fromisoformat(value)
+    if stamp.tzinfo is not None:
+        stamp = stamp.astimezone().replace(tzinfo=None)
+    return stamp
+
+
+def insert_scans(scans, events=None, db_path=DB_PATH):
+    """Scans prüfen, Namen mit einer Abfrage holen und in einer Transaktion einfügen.
+
+    Codes, die barcode_check ablehnt, gehen gar nicht erst in die IN-Abfrage: Format- oder
+    Prüfzifferfehler landen unter "rejected", nicht vorhandene IDs wie bisher unter "unknown".
+    Rückgabe: (Ergebnis wie bei ingest_scan_batch, {code: name}). Ist `events` eine Liste,
+    kommt dort für jede neue Zeile ein scan_event() hinzu – für publish_scans() nach dem Commit.
+    """
+    from barcode_check import validator
+
+    check = validator(db_path)
+    result = {"accepted": [], "duplicates": [], "unknown": [], "invalid": [], "rejected": []}
+    valid = []
+    for scan in scans:
+        try:
+            stamp = local_timestamp(scan["scanned_at"])
+            if not scan["scan_id"] or not scan["code"] or not scan["action"]:
+                raise ValueError
+        except (KeyError, TypeError, ValueError):
+            result["invalid"].append(scan.get("scan_id") if isinstance(scan, dict) else None)
+            continue
+        reason = check.check(scan["code"])[1]
+        if reason:
+            result["unknown" if reason == "unknown" else "rejected"].append(scan["scan_id"])
+            continue
+        valid.append((stamp, scan))
+    valid.sort(key=lambda item: item[0])
+
+    store = _storage(db_path)
+    names = store.lookup_names([scan["code"] for _, scan in valid]) if valid else {}
+    rows = []
+    for stamp, scan in valid:
+        name = names.get(scan["code"])
+        if name is None:
+            result["unknown"].append(scan["scan_id"])
+            continue
+        rows.append((scan["code"], name, scan["action"], scan["scan_id"],
+                     stamp.isoformat(timespec="milliseconds"), scan.get("entrance")))
+    # events.scan_id ist UNIQUE -> doppelt gesendete Scans erzeugen kein zweites Ereignis
+    for row, seq in zip(rows, store.write_scans(rows) if rows else []):
+        if seq is None:
+            result["duplicates"].append(row[3])
+            continue
+        result["accepted"].append(row[3])
+        if events is not None:
+            student_id, name, action, _, at, entrance = row
+            events.append(scan_event(seq, student_id, name, at[:10], at[11:19], action, entrance))
+    return result, names
+
+
+def ingest_scan_batch(scans, db_path=DB_PATH):
+    """Offline gesammelte Scans übernehmen.
+
+    scans: Liste von Dicts mit scan_id, code, action, scanned_at (ISO) und optional entrance.
+    Doppelt gesendete scan_ids werden ignoriert, Einträge nach Original-Zeitstempel eingefügt.
+    Rückgabe: {"accepted": [...], "duplicates": [...], "unknown": [...], "invalid": [...],
+    "rejected": [...]} (scan_ids).
+    """
+    events = []
+    result, _ = insert_scans(scans, events, db_path)
+    publish_scans(events, db_path)
+    return result
+
+
+def register_codes(codes, action, entrance=None, db_path=DB_PATH):
+    """Mehrere gescannte Codes in einer Transaktion protokollieren.
+
+    Rückgabe: Liste (code, name, status) in Eingabereihenfolge; status wie bei insert_scans.
+    """
+    return register_scans([new_scan(code, action, entrance) for code in codes], db_path)
+
+
+def register_scans(scans, db_path=DB_PATH):
+    """Wie register_codes, aber für fertige Scans (new_scan) mit scan_id und Zeitpunkt der Erfassung."""
+    if not scans:
+        return []
+    events = []
+    result, names = insert_scans(scans, events, db_path)
+    publish_scans(events, db_path)
+    statuses = {scan_id: status for status, ids in result.items() for scan_id in ids}
+    return [(scan["code"], names.get(scan["code"]), statuses.get(scan["scan_id"], "invalid")) for scan in scans]
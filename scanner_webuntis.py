@@ -1,91 +1,44 @@
+from __future__ import annotations
+
 import os
 import time
 from typing import Optional
-from datetime import datetime, date, timedelta
+from datetime import date, timedelta
 
 import streamlit as st
-import sqlite3
-import pandas as pd
-from fpdf import FPDF
-from PIL import Image
-from pyzbar.pyzbar import decode
+from event_store import delete_student, set_mapping
+from scanner_core import (
+    DB_PATH, export_log_pdf, fetch_logs_for_report, fetch_students, initialize_database,
+)
+from scheduler import fetch_job_runs, fetch_job_stats, initialize_job_tables
+from settings import settings
+from untis_sync import fetch_roster, load_synced_roster, untis_session
 
-# ============= Konfiguration / Zugangsdaten =============
+# pandas, PIL, pyzbar, fpdf und webuntis werden erst in der Ansicht geladen, die sie braucht.
 
-# Bitte diese Zugangsdaten sicher in einer .env-Datei ablegen!
+# ============= Konfiguration / Zugangsdaten =============
+# WebUntis-Zugang ([untis] bzw. UNTIS_*), Benutzer-Login, DB-Pfad und Cache-TTLs: settings.py
 STUDENT_ID   = "5186600"  # Schulnummer
-SCHOOL_NAME  = "flbk-bonn"
-SERVER_URL   = "ajax.webuntis.com"
-UNTIS_USER   = "Vorname.Nachname"
-UNTIS_PASS   = ".."  # Passwort
-UNTIS_AGENT  = "WebUntis"
-
-# Für streamlit Benutzer-Login:
-USER_CREDENTIALS = {"admin": "flb23"}
-
-DB_PATH = "students.db"
 
 # ============= Streamlit Grundkonfiguration =============
 st.set_page_config(page_title="Barcode-Scanner FLB (WebUntis)", page_icon="📷", layout="wide")
 
 
-# ============= DB Setup =============
-def initialize_database():
-    with sqlite3.connect(DB_PATH) as connection:
-        cursor = connection.cursor()
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS students (
-                id TEXT PRIMARY KEY,
-                name TEXT NOT NULL,
-                untis_student_id TEXT,
-                klass TEXT
-            )
-        """)
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS log (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                student_id TEXT,
-                name TEXT,
-                date TEXT,
-                time TEXT,
-                action TEXT
-            )
-        """)
-        connection.commit()
-
-
 # ============= WebUntis Hilfen =============
-@st.cache_data(show_spinner=False, ttl=300)
+@st.cache_data(show_spinner=False, ttl=settings().cache.untis_login_ttl)
 def untis_login_cached(server, school, user, pwd, ua) -> dict:
-    import webuntis
+    ticket = {"server": server, "school": school, "username": user, "password": pwd, "useragent": ua}
     last_err = None
     for attempt in range(3):
         try:
-            s = webuntis.Session(
-                server=server,
-                school=school,
-                username=user,
-                password=pwd,
-                useragent=ua or "WebUntis"
-            ).login()
-            s.logout()
-            return {"server": server, "school": school, "username": user, "password": pwd, "useragent": ua}
+            untis_session(ticket).logout()
+            return ticket
         except Exception as e:
             last_err = e
             time.sleep(0.6 * (attempt + 1))
     raise RuntimeError(f"WebUntis-Login fehlgeschlagen: {last_err}")
 
-def untis_session(ticket: dict):
-    import webuntis
-    return webuntis.Session(
-        server=ticket["server"],
-        school=ticket["school"],
-        username=ticket["username"],
-        password=ticket["password"],
-        useragent=ticket.get("useragent") or "WebUntis",
-    ).login()
-
-@st.cache_data(show_spinner=False, ttl=300)
+@st.cache_data(show_spinner=False, ttl=settings().cache.untis_lists_ttl)
 def untis_list_classes(ticket: dict) -> list:
     s = untis_session(ticket)
     try:
@@ -94,31 +47,21 @@ def untis_list_classes(ticket: dict) -> list:
         try: s.logout()
         except: pass
 
-@st.cache_data(show_spinner=False, ttl=300)
+@st.cache_data(show_spinner=False, ttl=settings().cache.untis_lists_ttl)
 def untis_list_students(ticket: dict) -> pd.DataFrame:
+    import pandas as pd
     cols = ["untis_student_id", "name", "klass"]
+    # Vom Scheduler (roster_sync) gespiegelte Liste bevorzugen – kein Live-Abruf in der Sitzung
+    synced = load_synced_roster(DB_PATH)
+    if synced:
+        return pd.DataFrame(synced, columns=cols)
     try:
-        s = untis_session(ticket)
+        rows = fetch_roster(ticket)
     except Exception:
         return pd.DataFrame(columns=cols)
-    try:
-        rows = []
-        studs = s.students()
-        for st_obj in studs:
-            sid = str(getattr(st_obj, "id", "")) or None
-            long_name = getattr(st_obj, "long_name", None)
-            short_name = getattr(st_obj, "name", None)
-            fname = getattr(st_obj, "forename", "") or ""
-            sname = getattr(st_obj, "surname", "") or ""
-            nm = long_name or short_name or f"{fname} {sname}".strip() or "Unbekannt"
-            klasse = getattr(st_obj, "klasse", None) or getattr(st_obj, "class_name", None)
-            rows.append({"untis_student_id": sid, "name": nm, "klass": klasse})
-        return pd.DataFrame(rows, columns=cols)
-    finally:
-        try: s.logout()
-        except: pass
+    return pd.DataFrame(rows, columns=cols)
 
-@st.cache_data(show_spinner=False, ttl=120)
+@st.cache_data(show_spinner=False, ttl=settings().cache.untis_timetable_ttl)
 def untis_timetable_for_class(ticket: dict, class_name: str, start: date, end: date) -> pd.DataFrame:
     import pandas as pd
     s = untis_session(ticket)
@@ -140,59 +83,14 @@ def add_mapping(barcode_id: str, name: str, klass: Optional[str], untis_student_
     barcode_id = (barcode_id or "").strip()
     if not barcode_id:
         return "Fehler: leere Barcode-ID."
-    with sqlite3.connect(DB_PATH) as con:
-        cur = con.cursor()
-        cur.execute("SELECT 1 FROM students WHERE id = ?", (barcode_id,))
-        if cur.fetchone():
-            cur.execute(
-                "UPDATE students SET name=?, klass=?, untis_student_id=? WHERE id=?",
-                (name, klass, untis_student_id, barcode_id)
-            )
-        else:
-            cur.execute(
-                "INSERT INTO students (id, name, klass, untis_student_id) VALUES (?,?,?,?)",
-                (barcode_id, name, klass, untis_student_id)
-            )
-        con.commit()
+    try:
+        set_mapping(barcode_id, name, klass, untis_student_id, db_path=DB_PATH)
+    except ValueError as e:
+        return f"Fehler: {e}"
     return f"Mapping gespeichert: {name} ⇄ {barcode_id}"
 
-def get_mapped_name(barcode_id: str):
-    with sqlite3.connect(DB_PATH) as con:
-        cur = con.cursor()
-        cur.execute("SELECT name FROM students WHERE id = ?", (barcode_id,))
-        r = cur.fetchone()
-        return r[0] if r else None
-
-def log_scan(student_id: str, name: str, action: str):
-    now = datetime.now()
-    with sqlite3.connect(DB_PATH) as con:
-        cur = con.cursor()
-        cur.execute(
-            "INSERT INTO log (student_id, name, date, time, action) VALUES (?,?,?,?,?)",
-            (student_id, name, now.strftime("%Y-%m-%d"), now.strftime("%H:%M:%S"), action)
-        )
-        con.commit()
-
-def fetch_logs_by_date(date_str: str):
-    with sqlite3.connect(DB_PATH) as con:
-        cur = con.cursor()
-        cur.execute(
-            "SELECT student_id, name, date, time, action FROM log WHERE date=? ORDER BY time ASC",
-            (date_str,)
-        )
-        return cur.fetchall()
-
-def fetch_all_mappings():
-    with sqlite3.connect(DB_PATH) as con:
-        cur = con.cursor()
-        cur.execute("SELECT id, name, klass, untis_student_id FROM students ORDER BY name ASC")
-        return cur.fetchall()
-
 def delete_mapping(barcode_id: str):
-    with sqlite3.connect(DB_PATH) as con:
-        cur = con.cursor()
-        cur.execute("DELETE FROM students WHERE id = ?", (barcode_id,))
-        con.commit()
+    delete_student(barcode_id, db_path=DB_PATH)
 
 # ============= UI: Cookies & Login ============
 def cookies_notice():
@@ -209,7 +107,7 @@ def login_page():
     username = st.text_input("Benutzername:", value="admin")
     password = st.text_input("Passwort:", type="password")
     if st.button("Login"):
-        if USER_CREDENTIALS.get(username) == password:
+        if settings().auth.users.get(username) == password:
             st.session_state["logged_in"] = True
             st.success("Erfolgreich angemeldet.")
             st.rerun()
@@ -221,65 +119,27 @@ def export_filtered_log_to_pdf(logs, selected_date):
     if not logs:
         st.warning("Keine Daten zum Exportieren.")
         return
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_font("Arial", size=12)
-    pdf.cell(200, 10, txt=f"Schüler-Logbuch für {selected_date}", ln=True, align='C')
-    pdf.ln(10)
-    for student_id, name, d, t, action in logs:
-        pdf.cell(200, 8, txt=f"{d} {t} - {name} ({student_id}) - {action}", ln=True)
-    filename = f"logbuch_{selected_date}.pdf"
-    pdf_bytes = pdf.output(dest="S").encode("latin-1", "ignore")
+    # Mit Klasse (6. Spalte) wird nach Klassen gruppiert, inkl. Übersicht pro Klasse
+    filename, pdf_bytes = export_log_pdf(logs, selected_date)
     st.download_button("📄 PDF herunterladen", data=pdf_bytes, file_name=filename, mime="application/pdf")
 
-# ============= Barcode Scanner =============
-def decode_barcodes_from_image(pil_image):
-    out = []
-    for r in decode(pil_image):
-        try:
-            data = r.data.decode("utf-8", errors="ignore")
-        except Exception:
-            data = str(r.data)
-        out.append({"type": r.type, "data": data})
-    return out
-
-def scanner_view():
-    st.subheader("🎦 Barcode scannen (Browser-Kamera)")
-    mode = st.radio("Modus:", ["Anmeldung", "Abmeldung"], horizontal=True)
-    st.caption("Hinweis: Die Kamera läuft im **Browser**. Für Live-Scan wäre streamlit-webrtc nötig; hier Snapshots.")
-    img_file = st.camera_input("Kamera freigeben und Foto aufnehmen")
-    if img_file is None:
-        return
-    pil_img = Image.open(img_file)
-    results = decode_barcodes_from_image(pil_img)
-    if not results:
-        st.warning("Kein Barcode erkannt. Bitte näher ran oder besseres Licht.")
-        return
-    st.success(f"{len(results)} Code(s) erkannt:")
-    for res in results:
-        code = res["data"]
-        st.write(f"- **{res['type']}**: `{code}`")
-        name = get_mapped_name(code)
-        if name:
-            log_scan(code, name, mode)
-            st.info(f"✅ {mode} registriert: **{name}** ({code}) um {datetime.now().strftime('%H:%M:%S')}")
-        else:
-            st.warning("Kein Mapping für diesen Barcode gefunden. Bitte im Menü 'WebUntis & Mappings' zuordnen.")
-
 # ============= WebUntis & Mappings UI =============
 def webuntis_and_mapping_view():
+    import pandas as pd
+
     st.subheader("🌐 WebUntis & Barcode-Mappings")
     colA, colB = st.columns([2,1])
+    untis = settings().untis
     with colA:
-        st.caption("Verbindungseinstellungen:")
+        st.caption("Verbindungseinstellungen (settings.py, Abschnitt [untis]):")
         st.code(
-            f"SERVER={SERVER_URL}\nSCHOOL={SCHOOL_NAME}\nUSER={UNTIS_USER}\nUA={UNTIS_AGENT}",
+            f"SERVER={untis.server}\nSCHOOL={untis.school}\nUSER={untis.user}\nUA={untis.useragent}",
             language="bash"
         )
     with colB:
         if st.button("🔌 Mit WebUntis verbinden"):
             try:
-                _ = untis_login_cached(SERVER_URL, SCHOOL_NAME, UNTIS_USER, UNTIS_PASS, UNTIS_AGENT)
+                _ = untis_login_cached(untis.server, untis.school, untis.user, untis.password, untis.useragent)
                 st.success("Login erfolgreich ✅")
                 st.session_state["untis_ok"] = True
             except Exception as e:
@@ -288,11 +148,11 @@ def webuntis_and_mapping_view():
     ticket = None
     if st.session_state.get("untis_ok"):
         ticket = {
-            "server": SERVER_URL,
-            "school": SCHOOL_NAME,
-            "username": UNTIS_USER,
-            "password": UNTIS_PASS,
-            "useragent": UNTIS_AGENT
+            "server": untis.server,
+            "school": untis.school,
+            "username": untis.user,
+            "password": untis.password,
+            "useragent": untis.useragent
         }
 
     st.markdown("---")
@@ -334,11 +194,14 @@ def webuntis_and_mapping_view():
                 st.error("Bitte mindestens **Name** und **Barcode** angeben.")
             else:
                 msg = add_mapping(barcode_input, name_input, klass if klass else None, untis_id_input or None)
-                st.success(msg)
+                if msg.startswith("Fehler"):
+                    st.error(msg)
+                else:
+                    st.success(msg)
 
     st.markdown("---")
     st.markdown("#### 3) Bestehende Mappings")
-    rows = fetch_all_mappings()
+    rows = fetch_students()
     if rows:
         df_map = pd.DataFrame(rows, columns=["Barcode-ID", "Name", "Klasse", "Untis-ID"])
         st.dataframe(df_map, use_container_width=True)
@@ -358,10 +221,12 @@ def logbuch_mit_filter_view():
     if not selected_date:
         return
     date_str = selected_date.strftime("%Y-%m-%d")
-    logs = fetch_logs_by_date(date_str)
+    logs = fetch_logs_for_report(date_str)
     if logs:
+        import pandas as pd
+
         st.success(f"{len(logs)} Einträge gefunden für {date_str}")
-        df = pd.DataFrame(logs, columns=["Barcode-ID", "Name", "Datum", "Uhrzeit", "Aktion"])
+        df = pd.DataFrame(logs, columns=["Barcode-ID", "Name", "Datum", "Uhrzeit", "Aktion", "Klasse"])
         st.dataframe(df, use_container_width=True)
         export_filtered_log_to_pdf(logs, date_str)
         csv = df.to_csv(index=False).encode("utf-8")
@@ -369,6 +234,27 @@ def logbuch_mit_filter_view():
     else:
         st.warning("Keine Einträge für dieses Datum.")
 
+# ============= Hintergrundjobs =============
+def hintergrundjobs_view():
+    import pandas as pd
+
+    st.subheader("⏱️ Hintergrundjobs")
+    st.caption("Läufe des Schedulers (`python scheduler.py`): Berichte, WebUntis-Abgleich, DB-Wartung.")
+    initialize_job_tables(DB_PATH)
+    stats = fetch_job_stats(DB_PATH)
+    if not stats:
+        st.info("Noch keine Läufe. Läuft der Scheduler-Dienst?")
+        return
+    st.dataframe(
+        pd.DataFrame(stats, columns=["Job", "Läufe", "Fehler", "Ø Dauer (ms)", "Max. Dauer (ms)", "Letzter Start"]),
+        use_container_width=True,
+    )
+    runs = fetch_job_runs(DB_PATH, limit=50)
+    st.dataframe(
+        pd.DataFrame(runs, columns=["Job", "Start", "Dauer (ms)", "Status", "Meldung"]),
+        use_container_width=True,
+    )
+
 # ============= Impressum/Datenschutz =============
 def impressum_view():
     st.title("📄 Impressum")
@@ -388,7 +274,11 @@ def main():
     menu = [
         "🌐 WebUntis & Mappings",
         "🎦 Barcode scannen",
+        "⌨️ Handscanner",
+        "📦 Stapel-Scan",
+        "📡 Live-Anwesenheit",
         "📅 Logbuch & Export",
+        "⏱️ Hintergrundjobs",
         "📄 Impressum",
         "🔒 Datenschutz",
     ]
@@ -396,9 +286,25 @@ def main():
     if choice == "🌐 WebUntis & Mappings":
         webuntis_and_mapping_view()
     elif choice == "🎦 Barcode scannen":
-        scanner_view()
+        from photo_scan_view import photo_scan_view
+
+        photo_scan_view("Kein Mapping für diesen Barcode gefunden. Bitte im Menü 'WebUntis & Mappings' zuordnen.")
+    elif choice == "⌨️ Handscanner":
+        from handscanner_view import handscanner_view
+
+        handscanner_view()
+    elif choice == "📦 Stapel-Scan":
+        from batch_scan_view import batch_scan_view
+
+        batch_scan_view()
+    elif choice == "📡 Live-Anwesenheit":
+        from live_dashboard import live_dashboard_view
+
+        live_dashboard_view()
     elif choice == "📅 Logbuch & Export":
         logbuch_mit_filter_view()
+    elif choice == "⏱️ Hintergrundjobs":
+        hintergrundjobs_view()
     elif choice == "📄 Impressum":
         impressum_view()
     elif choice == "🔒 Datenschutz":
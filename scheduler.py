@@ -0,0 +1,337 @@
+"""Hintergrund-Scheduler: nächtliche Berichte, WebUntis-Abgleich, Snapshots, DB-Wartung.
+
+Läuft als eigener Prozess neben Streamlit, damit keine Benutzersitzung blockiert:
+
+    python scheduler.py                  # Dienst starten
+    python scheduler.py --list           # Jobs und nächste Ausführung
+    python scheduler.py --run vacuum     # einen Job sofort ausführen
+    python scheduler.py --history        # letzte Läufe mit Dauer
+"""
+import argparse
+import csv
+import logging
+import os
+import threading
+import time
+import traceback
+from datetime import datetime, timedelta
+
+from scanner_core import DB_PATH, apply_pragmas, connect, fetch_logs_for_report
+from settings import settings
+from storage import served_by_postgres
+
+log = logging.getLogger("scheduler")
+
+# ----------------------------
+# Cron-Ausdrücke ("min std tag monat wochentag")
+# ----------------------------
+CRON_FIELDS = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 6)]
+
+
+def _parse_field(text, low, high):
+    values = set()
+    for part in text.split(","):
+        step = 1
+        if "/" in part:
+            part, step_text = part.split("/", 1)
+            step = int(step_text)
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start, end = (int(v) for v in part.split("-", 1))
+        else:
+            start = end = int(part)
+            if step != 1:
+                end = high
+        if start < low or end > high or start > end or step < 1:
+            raise ValueError(f"Ungültiges Cron-Feld: {text}")
+        values.update(range(start, end + 1, step))
+    return frozenset(values)
+
+
+class Cron:
+    def __init__(self, expr):
+        parts = expr.split()
+        if len(parts) != 5:
+            raise ValueError(f"Cron-Ausdruck braucht 5 Felder: {expr!r}")
+        self.expr = expr
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            _parse_field(part, low, high) for part, (low, high) in zip(parts, CRON_FIELDS)
+        )
+        # Cron: 0 = Sonntag, Python: 0 = Montag
+        self.weekdays = frozenset((d - 1) % 7 for d in weekdays)
+
+    def matches(self, dt):
+        return (dt.minute in self.minutes and dt.hour in self.hours and dt.day in self.days
+                and dt.month in self.months and dt.weekday() in self.weekdays)
+
+    def next_after(self, dt):
+        dt = dt.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = dt + timedelta(days=366)
+        while dt < limit:
+            if dt.month not in self.months or dt.day not in self.days or dt.weekday() not in self.weekdays:
+                dt = dt.replace(hour=0, minute=0) + timedelta(days=1)
+            elif dt.hour not in self.hours:
+                dt = dt.replace(minute=0) + timedelta(hours=1)
+            elif dt.minute not in self.minutes:
+                dt += timedelta(minutes=1)
+            else:
+                return dt
+        raise ValueError(f"Cron-Ausdruck trifft nie zu: {self.expr}")
+
+
+# ----------------------------
+# Laufhistorie
+# ----------------------------
+def initialize_job_tables(db_path=DB_PATH):
+    with connect(db_path) as con:
+        con.execute("""
+            CREATE TABLE IF NOT EXISTS job_runs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                job TEXT NOT NULL,
+                started_at TEXT NOT NULL,
+                duration_ms INTEGER,
+                status TEXT,
+                message TEXT
+            )
+        """)
+        con.execute("CREATE INDEX IF NOT EXISTS idx_job_runs_job ON job_runs (job, started_at)")
+        con.commit()
+
+
+def record_run(db_path, job, started_at, duration_ms, status, message):
+    with connect(db_path) as con:
+        con.execute(
+            "INSERT INTO job_runs (job, started_at, duration_ms, status, message) VALUES (?,?,?,?,?)",
+            (job, started_at, duration_ms, status, message),
+        )
+        con.commit()
+
+
+def fetch_job_runs(db_path=DB_PATH, limit=50):
+    with connect(db_path) as con:
+        return con.execute(
+            "SELECT job, started_at, duration_ms, status, message FROM job_runs ORDER BY id DESC LIMIT ?",
+            (limit,),
+        ).fetchall()
+
+
+def fetch_job_stats(db_path=DB_PATH):
+    """Pro Job: Anzahl Läufe, Fehler, Ø/max Dauer (ms), letzter Start."""
+    with connect(db_path) as con:
+        return con.execute("""
+            SELECT job, COUNT(*), SUM(status != 'ok'), CAST(AVG(duration_ms) AS INTEGER),
+                   MAX(duration_ms), MAX(started_at)
+            FROM job_runs GROUP BY job ORDER BY job
+        """).fetchall()
+
+
+# ----------------------------
+# Jobs
+# ----------------------------
+def job_nightly_report(db_path, day=None):
+    """Logbuch des Vortags als PDF und CSV nach [reports] dir."""
+    from pdf_report import build_log_report
+
+    day = day or (datetime.now().date() - timedelta(days=1))
+    date_str = day.strftime("%Y-%m-%d")
+    logs = fetch_logs_for_report(date_str, db_path)
+    if not logs:
+        return f"Keine Einträge für {date_str}"
+
+    report_dir = settings().reports.dir
+    os.makedirs(report_dir, exist_ok=True)
+    by_class = any(row[5] for row in logs)
+    pdf_path = os.path.join(report_dir, f"logbuch_{date_str}.pdf")
+    with open(pdf_path, "wb") as f:
+        f.write(build_log_report(logs, f"Schüler-Logbuch für {date_str}", by_class=by_class))
+
+    csv_path = os.path.join(report_dir, f"logbuch_{date_str}.csv")
+    header = ["Barcode-ID", "Name", "Datum", "Uhrzeit", "Aktion", "Klasse"]
+    with open(csv_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(logs)
+    return f"{len(logs)} Einträge -> {pdf_path}, {csv_path}"
+
+
+def job_roster_sync(db_path):
+    from untis_sync import sync_roster, untis_ticket
+
+    ticket = untis_ticket()
+    if not ticket:
+        return "übersprungen: [untis] user/password nicht gesetzt"
+    return f"{sync_roster(ticket, db_path)} Schüler synchronisiert"
+
+
+def job_timetable_sync(db_path):
+    from untis_sync import sync_timetables, untis_ticket
+
+    ticket = untis_ticket()
+    if not ticket:
+        return "übersprungen: [untis] user/password nicht gesetzt"
+    return f"{sync_timetables(ticket, db_path)} Stunden synchronisiert"
+
+
+# WAL-Checkpoint, ANALYZE, VACUUM und Snapshots gibt es nur für die SQLite-Datei; liegt die DB
+# auf dem PostgreSQL-Server, ist die Datei veraltet und die Wartung macht der Server (autovacuum)
+SERVER_SKIP = "übersprungen: [database] backend = postgres (Wartung auf dem Server)"
+
+
+def job_wal_checkpoint(db_path):
+    if served_by_postgres(db_path):
+        return SERVER_SKIP
+    with connect(db_path) as con:
+        busy, wal_pages, moved = con.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+    return f"WAL: {moved}/{wal_pages} Seiten übertragen" + (" (teilweise, DB belegt)" if busy else "")
+
+
+def job_analyze(db_path):
+    if served_by_postgres(db_path):
+        return SERVER_SKIP
+    with connect(db_path) as con:
+        con.execute("ANALYZE")
+        con.execute("PRAGMA optimize")
+    return "ANALYZE ok"
+
+
+def job_event_snapshot(db_path):
+    from event_store import take_snapshot
+
+    if served_by_postgres(db_path):
+        return SERVER_SKIP
+    with connect(db_path) as con:
+        seq = take_snapshot(con)
+        con.commit()
+    return f"Snapshot bis Ereignis {seq}"
+
+
+def job_vacuum(db_path):
+    if served_by_postgres(db_path):
+        return SERVER_SKIP
+    before = os.path.getsize(db_path)
+    con = connect(db_path)
+    try:
+        # VACUUM sperrt die DB kurz exklusiv -> nur nachts, Scanner warten per busy_timeout
+        con.execute("VACUUM")
+    finally:
+        con.close()
+    return f"{before // 1024} KiB -> {os.path.getsize(db_path) // 1024} KiB"
+
+
+DEFAULT_JOBS = [
+    ("nightly_report", "5 0 * * *", job_nightly_report),
+    ("roster_sync", "0 6-18/2 * * 1-5", job_roster_sync),
+    ("timetable_sync", "30 5 * * 1-5", job_timetable_sync),
+    ("wal_checkpoint", "*/15 * * * *", job_wal_checkpoint),
+    ("analyze", "30 3 * * *", job_analyze),
+    ("event_snapshot", "15 3 * * *", job_event_snapshot),
+    ("vacuum", "45 3 * * 0", job_vacuum),
+]
+
+
+# ----------------------------
+# Scheduler
+# ----------------------------
+class Scheduler:
+    def __init__(self, db_path=DB_PATH, jobs=DEFAULT_JOBS):
+        self.db_path = db_path
+        self.jobs = {name: (Cron(expr), func) for name, expr, func in jobs}
+        self.next_runs = {}
+        self.running = set()
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def run_job(self, name):
+        """Job sofort im aufrufenden Thread ausführen; parallele Läufe desselben Jobs werden übersprungen."""
+        _, func = self.jobs[name]
+        with self.lock:
+            if name in self.running:
+                return None
+            self.running.add(name)
+        started_at = datetime.now().isoformat(timespec="seconds")
+        start = time.perf_counter()
+        try:
+            message, status = func(self.db_path), "ok"
+        except Exception as e:
+            message, status = f"{e}\n{traceback.format_exc(limit=3)}", "error"
+        finally:
+            with self.lock:
+                self.running.discard(name)
+        duration_ms = int((time.perf_counter() - start) * 1000)
+        record_run(self.db_path, name, started_at, duration_ms, status, message)
+        log.info("%s: %s in %d ms – %s", name, status, duration_ms, (message or "").partition("\n")[0])
+        return status
+
+    def run_in_background(self, name):
+        threading.Thread(target=self.run_job, args=(name,), name=f"job-{name}", daemon=True).start()
+
+    def schedule_all(self, now=None):
+        now = now or datetime.now()
+        for name, (cron, _) in self.jobs.items():
+            self.next_runs[name] = cron.next_after(now)
+
+    def loop(self):
+        self.schedule_all()
+        while not self.stop_event.is_set():
+            now = datetime.now()
+            for name, due in sorted(self.next_runs.items(), key=lambda item: item[1]):
+                if due <= now:
+                    self.next_runs[name] = self.jobs[name][0].next_after(now)
+                    # Jeder Lauf im eigenen Thread: ein langer Bericht hält den Checkpoint nicht auf
+                    self.run_in_background(name)
+            wait = (min(self.next_runs.values()) - datetime.now()).total_seconds()
+            self.stop_event.wait(max(1.0, min(wait, 60.0)))
+
+    def start(self):
+        if self.thread and self.thread.is_alive():
+            return self
+        initialize_job_tables(self.db_path)
+        with connect(self.db_path) as con:
+            # WAL (Standard): Leser (Scanner, Berichte) blockieren Schreiber nicht und umgekehrt
+            apply_pragmas(con)
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.loop, name="scheduler", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=5)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hintergrundjobs für den Barcode-Scanner")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--run", metavar="JOB", help="Job sofort ausführen und beenden")
+    parser.add_argument("--list", action="store_true", help="Jobs und nächste Ausführung anzeigen")
+    parser.add_argument("--history", action="store_true", help="Letzte Läufe anzeigen")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+
+    scheduler = Scheduler(args.db)
+    initialize_job_tables(args.db)
+    if args.list:
+        scheduler.schedule_all()
+        for name, due in sorted(scheduler.next_runs.items(), key=lambda item: item[1]):
+            print(f"{name:16s} {scheduler.jobs[name][0].expr:18s} nächster Lauf {due:%Y-%m-%d %H:%M}")
+    elif args.history:
+        for job, count, errors, avg_ms, max_ms, last in fetch_job_stats(args.db):
+            print(f"{job:16s} {count:5d} Läufe  {errors or 0:3d} Fehler  Ø {avg_ms} ms  max {max_ms} ms  zuletzt {last}")
+    elif args.run:
+        if args.run not in scheduler.jobs:
+            parser.error(f"Unbekannter Job: {args.run} ({', '.join(scheduler.jobs)})")
+        raise SystemExit(0 if scheduler.run_job(args.run) == "ok" else 1)
+    else:
+        scheduler.start()
+        try:
+            while scheduler.thread.is_alive():
+                scheduler.thread.join(timeout=1)
+        except KeyboardInterrupt:
+            scheduler.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,366 @@
+"""Einstellungen für alle Apps und Dienste: Standardwerte < Datei < Umgebungsvariablen.
+
+Datei: settings.toml im Arbeitsverzeichnis (oder Pfad in SCANNER_SETTINGS), Abschnitte wie
+unten, z. B.
+
+    [camera]
+    index = 1
+    width = 1280
+
+    [database]
+    synchronous = "OFF"
+
+Jeder Wert lässt sich per SCANNER_<ABSCHNITT>_<NAME> setzen (SCANNER_CAMERA_INDEX=1); die
+bisherigen Variablen (UNTIS_*, BARCODE_*, REPORT_*) gelten weiter.
+
+settings() ist billig (ein Zeitvergleich) und prüft höchstens alle WATCH_INTERVAL Sekunden,
+ob sich die Datei geändert hat. Eine fehlerhafte Datei beim Neuladen wird protokolliert,
+die letzten gültigen Werte bleiben aktiv. Was erst nach einem Neustart greift, steht in RESTART.
+
+    python settings.py             # wirksame Werte und Herkunft
+    python settings.py --example   # Vorlage für settings.toml
+"""
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field, fields
+
+log = logging.getLogger("settings")
+
+SETTINGS_FILE = os.environ.get("SCANNER_SETTINGS", "settings.toml")
+WATCH_INTERVAL = 2.0
+ENV_PREFIX = "SCANNER"
+
+
+def setting(default, env=None):
+    """Feld mit Standardwert; env = zusätzlicher (historischer) Variablenname."""
+    if isinstance(default, (dict, list)):
+        return field(default_factory=lambda: type(default)(default), metadata={"env": env})
+    return field(default=default, metadata={"env": env})
+
+
+# ----------------------------
+# Abschnitte
+# ----------------------------
+@dataclass(frozen=True)
+class Database:
+    path: str = setting("students.db")
+    busy_timeout: float = setting(30.0)      # s Warten bei gesperrter DB (z. B. VACUUM)
+    journal_mode: str = setting("WAL")
+    synchronous: str = setting("NORMAL")     # OFF ist schneller, verliert beim Stromausfall aber Commits
+    cache_size_kib: int = setting(0)         # 0 = SQLite-Standard (2 MiB)
+    mmap_size_mib: int = setting(0)
+    temp_store: str = setting("DEFAULT")     # MEMORY: Sortierungen/Temp-Tabellen im RAM
+    backend: str = setting("sqlite")         # postgres: Server-DB für viele gleichzeitige Schreiber (storage.py)
+    url: str = setting("")                   # postgres: z. B. postgresql://scanner:pw@localhost/scanner
+    pool_min: int = setting(1)               # postgres: offene Verbindungen pro Prozess
+    pool_max: int = setting(10)
+
+
+@dataclass(frozen=True)
+class Auth:
+    users: dict = setting({"admin": "flb23"})   # Umgebung: "admin:pw,lehrer:pw2"
+    api_tokens: tuple = setting(())          # Scan-API: erlaubte Bearer-Tokens der Geräte (sonst Basic mit users)
+    api_token: str = setting("")             # Token, das hid_input/offline_queue an die Scan-API schicken
+
+
+@dataclass(frozen=True)
+class Camera:
+    index: int = setting(0)
+    width: int = setting(0)                  # 0 = Treiberstandard
+    height: int = setting(0)
+    fps: int = setting(0)
+    buffer_size: int = setting(1)            # Frames im Treiberpuffer; 1 = immer das neueste Bild
+    display_fps: float = setting(8.0)
+
+
+@dataclass(frozen=True)
+class Decode:
+    strategy: str = setting("adaptive")      # adaptive: Ruhemodus ohne Bewegung; every_frame: jedes Bild
+    idle_fps: float = setting(2.0)
+    idle_after: float = setting(3.0)
+
+
+@dataclass(frozen=True)
+class Barcode:
+    symbologies: tuple = setting(("CODE128", "CODE39", "CODE93", "I25", "QRCODE"), env="BARCODE_SYMBOLOGIES")
+    pattern: str = setting("", env="BARCODE_PATTERN")            # leer = Schulformat bzw. Standard
+    check: str = setting("", env="BARCODE_CHECK")                # luhn, gs1, mod11
+    known_only: bool = setting(True, env="BARCODE_KNOWN_ONLY")
+
+
+@dataclass(frozen=True)
+class Batch:
+    max_images: int = setting(2000)          # Stapel-Scan
+    max_upload_mib: int = setting(1024)      # Stapel-Scan: Bilder insgesamt (entpackt), geprüft vor dem Entpacken
+    chunksize: int = setting(4)              # Bilder pro Auftrag an einen Worker
+    hid_flush_size: int = setting(200)       # Handscanner: Scans pro Transaktion
+    hid_flush_interval: float = setting(0.1)
+    offline_batch_size: int = setting(500)   # Warteschlange: Scans pro /sync-Aufruf
+    api_max_batch: int = setting(5000)       # Scan-API: Scans pro Anfrage
+
+
+@dataclass(frozen=True)
+class Pools:
+    batch_workers: int = setting(0)          # 0 = Kerne - 1 (höchstens 8)
+    api_read_workers: int = setting(4)
+
+
+@dataclass(frozen=True)
+class Cache:
+    untis_login_ttl: int = setting(300)
+    untis_lists_ttl: int = setting(300)      # Klassen- und Schülerlisten
+    untis_timetable_ttl: int = setting(120)
+    known_ids_recheck: float = setting(5.0)  # unbekannte ID: Ausweisliste höchstens so oft neu laden
+    presence_tail: float = setting(1.0)      # Live-Anwesenheit: Nachlesen fremder Scans
+    dashboard_refresh: float = setting(2.0)
+
+
+@dataclass(frozen=True)
+class Untis:
+    server: str = setting("ajax.webuntis.com", env="UNTIS_SERVER")
+    school: str = setting("flbk-bonn", env="UNTIS_SCHOOL")
+    user: str = setting("", env="UNTIS_USER")
+    password: str = setting("", env="UNTIS_PASS")
+    useragent: str = setting("WebUntis", env="UNTIS_AGENT")
+
+    def ticket(self):
+        """Zugang für untis_sync/webuntis; None, solange Benutzer oder Passwort fehlen."""
+        if not (self.server and self.school and self.user and self.password):
+            return None
+        return {"server": self.server, "school": self.school, "username": self.user,
+                "password": self.password, "useragent": self.useragent}
+
+
+@dataclass(frozen=True)
+class Reports:
+    dir: str = setting("reports", env="REPORT_DIR")
+    font_path: str = setting("", env="REPORT_FONT_PATH")
+
+
+@dataclass(frozen=True)
+class Settings:
+    database: Database = field(default_factory=Database)
+    auth: Auth = field(default_factory=Auth)
+    camera: Camera = field(default_factory=Camera)
+    decode: Decode = field(default_factory=Decode)
+    barcode: Barcode = field(default_factory=Barcode)
+    batch: Batch = field(default_factory=Batch)
+    pools: Pools = field(default_factory=Pools)
+    cache: Cache = field(default_factory=Cache)
+    untis: Untis = field(default_factory=Untis)
+    reports: Reports = field(default_factory=Reports)
+
+
+# Greifen erst nach Neustart (Standardwerte von Funktionen bzw. beim Start angelegte Pools)
+RESTART = ("database.path", "database.backend", "database.url", "database.pool_min", "database.pool_max",
+           "pools.api_read_workers", "cache.dashboard_refresh", "reports.font_path")
+# Raten, Intervalle, Stapelgrößen und Pools: 0 hieße Division durch 0, Leerlaufschleife oder leerer Pool
+POSITIVE = ("database.pool_max", "camera.buffer_size", "camera.display_fps", "decode.idle_fps",
+            "batch.max_images", "batch.max_upload_mib", "batch.chunksize", "batch.hid_flush_size",
+            "batch.hid_flush_interval", "batch.offline_batch_size", "batch.api_max_batch",
+            "pools.api_read_workers", "cache.presence_tail", "cache.dashboard_refresh")
+CHOICES = {
+    "database.backend": ("sqlite", "postgres"),
+    "database.journal_mode": ("WAL", "DELETE", "TRUNCATE", "PERSIST", "MEMORY", "OFF"),
+    "database.synchronous": ("OFF", "NORMAL", "FULL", "EXTRA"),
+    "database.temp_store": ("DEFAULT", "FILE", "MEMORY"),
+    "decode.strategy": ("adaptive", "every_frame"),
+    "barcode.check": ("", "luhn", "gs1", "mod11"),
+}
+
+
+# ----------------------------
+# Laden & Typprüfung
+# ----------------------------
+def coerce(value, kind, key):
+    """Wert aus Datei (schon typisiert) oder Umgebung (Text) in den Feldtyp bringen.
+
+    Zahlen sind nie negativ, die Schlüssel in POSITIVE auch nicht 0.
+    """
+    text = isinstance(value, str)
+    try:
+        if kind is bool:
+            if text:
+                lowered = value.strip().lower()
+                if lowered not in ("1", "0", "true", "false", "yes", "no", "on", "off"):
+                    raise ValueError(value)
+                return lowered in ("1", "true", "yes", "on")
+            if not isinstance(value, bool):
+                raise ValueError(value)
+            return value
+        if kind in (int, float):
+            if isinstance(value, bool) or not (text or isinstance(value, (int, float))):
+                raise ValueError(value)
+            number = float(value) if kind is float else int(value)
+            if number < 0 or (key in POSITIVE and number <= 0):
+                raise ValueError(value)
+            return number
+        if kind is tuple:
+            items = value.split(",") if text else value
+            return tuple(str(item).strip() for item in items if str(item).strip())
+        if kind is dict:
+            if text:
+                value = dict(pair.split(":", 1) for pair in value.split(",") if pair.strip())
+            return {str(k).strip(): str(v).strip() for k, v in value.items()}
+        if not text:
+            raise ValueError(value)
+        return value
+    except (ValueError, TypeError, AttributeError):
+        bound = " > 0" if key in POSITIVE else ""
+        raise ValueError(f"Einstellung {key}: {value!r} ist kein gültiger Wert ({kind.__name__}{bound})") from None
+
+
+def read_file(path):
+    if not path or not os.path.exists(path):
+        return {}
+    if path.endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    import tomllib
+
+    with open(path, "rb") as f:
+        return tomllib.load(f)
+
+
+def load(path=SETTINGS_FILE, environ=None):
+    """Settings aus Datei + Umgebung; ValueError bei unbekannten Schlüsseln oder falschen Typen."""
+    settings, _ = load_with_sources(path, environ)
+    return settings
+
+
+def load_with_sources(path=SETTINGS_FILE, environ=None):
+    environ = os.environ if environ is None else environ
+    data = read_file(path)
+    unknown = set(data) - {f.name for f in fields(Settings)}
+    if unknown:
+        raise ValueError(f"Unbekannte Abschnitte in {path}: {', '.join(sorted(unknown))}")
+    sections, sources = {}, {}
+    for section in fields(Settings):
+        from_file = data.get(section.name, {})
+        names = {f.name for f in fields(section.type)}
+        unknown = set(from_file) - names
+        if unknown:
+            raise ValueError(f"Unbekannte Einstellungen in [{section.name}]: {', '.join(sorted(unknown))}")
+        values = {}
+        for item in fields(section.type):
+            key = f"{section.name}.{item.name}"
+            if item.name in from_file:
+                values[item.name] = coerce(from_file[item.name], item.type, key)
+                sources[key] = path
+            for env in (f"{ENV_PREFIX}_{section.name}_{item.name}".upper(), item.metadata.get("env")):
+                if env and environ.get(env, "") != "":
+                    values[item.name] = coerce(environ[env], item.type, key)
+                    sources[key] = f"${env}"
+                    break
+            if key in CHOICES and values.get(item.name, item.default) not in CHOICES[key]:
+                raise ValueError(f"Einstellung {key}: erlaubt sind {', '.join(map(repr, CHOICES[key]))}")
+        sections[section.name] = section.type(**values)
+    return Settings(**sections), sources
+
+
+# ----------------------------
+# Cache & Beobachtung der Datei
+# ----------------------------
+def file_stamp(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class SettingsCache:
+    def __init__(self, path=SETTINGS_FILE):
+        self.path = path
+        self.current = None
+        self.stamp = None
+        self.checked_at = 0.0
+        self.listeners = []
+        self.lock = threading.Lock()
+
+    def get(self):
+        if self.current is None or time.monotonic() - self.checked_at >= WATCH_INTERVAL:
+            self.refresh()
+        return self.current
+
+    def refresh(self):
+        with self.lock:
+            self.checked_at = time.monotonic()
+            stamp = file_stamp(self.path)
+            if self.current is not None and stamp == self.stamp:
+                return
+            try:
+                new = load(self.path)
+            except Exception as e:
+                if self.current is None:
+                    raise
+                log.warning("Einstellungen nicht neu geladen (%s) – alte Werte bleiben aktiv", e)
+                self.stamp = stamp
+                return
+            old, self.current, self.stamp = self.current, new, stamp
+            listeners = list(self.listeners)
+        if old is not None and new != old:
+            log.info("Einstellungen neu geladen aus %s", self.path)
+            for callback in listeners:
+                callback(old, new)
+
+    def on_change(self, callback):
+        """callback(alt, neu) nach jedem Neuladen mit geänderten Werten."""
+        with self.lock:
+            self.listeners.append(callback)
+
+
+_cache = SettingsCache()
+
+
+def settings():
+    """Aktuelle Einstellungen des Prozesses (gecacht, Datei wird beobachtet)."""
+    return _cache.get()
+
+
+def on_change(callback):
+    _cache.on_change(callback)
+
+
+def example():
+    """settings.toml-Vorlage mit allen Standardwerten."""
+    lines = []
+    for section in fields(Settings):
+        lines.append(f"[{section.name}]")
+        for item in fields(section.type):
+            value = getattr(section.type(), item.name)
+            if isinstance(value, dict):
+                value = "{ " + ", ".join(f"{k} = {json.dumps(v)}" for k, v in value.items()) + " }"
+            elif isinstance(value, bool):
+                value = str(value).lower()
+            else:
+                value = json.dumps(list(value) if isinstance(value, tuple) else value, ensure_ascii=False)
+            lines.append(f"{item.name} = {value}")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Einstellungen anzeigen")
+    parser.add_argument("--example", action="store_true", help="Vorlage für settings.toml ausgeben")
+    args = parser.parse_args()
+    if args.example:
+        print(example())
+        return
+    current, sources = load_with_sources()
+    for section in fields(Settings):
+        for item in fields(section.type):
+            key = f"{section.name}.{item.name}"
+            value = getattr(getattr(current, section.name), item.name)
+            if item.name in ("password", "users", "url", "api_tokens", "api_token"):
+                value = "***" if value else value
+            print(f"{key:28s} {value!s:30s} {sources.get(key, 'Standard')}"
+                  + ("  (Neustart)" if key in RESTART else ""))
+
+
+if __name__ == "__main__":
+    main()
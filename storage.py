@@ -0,0 +1,520 @@
+"""Speicher-Backends unter Nachschlagen, Protokoll und Logbuch (scanner_core, event_store).
+
+    sqlite    students.db (Standard): gepoolte Verbindung pro Thread, aber nur ein Schreiber
+              zur Zeit – bei vielen Eingängen/Sitzungen warten die anderen auf die Sperre
+    postgres  PostgreSQL-Server: gleichzeitige Schreiber, Verbindungspool (psycopg_pool),
+              Scans im Stapel per COPY in eine Temp-Tabelle und ein INSERT ... SELECT
+
+Auswahl in settings.toml (greift nach Neustart):
+
+    [database]
+    backend = "postgres"
+    url = "postgresql://scanner:pw@localhost/scanner"
+
+Umgeleitet wird nur die DB aus [database] path; ausdrücklich angegebene Dateien (--db,
+Benchmarks, Kopien) bleiben SQLite. Beide Backends führen dieselben Tabellen (events, students,
+student_history, log; log.id = events.seq). Job-Protokoll und WebUntis-Zwischenspeicher bleiben
+in der SQLite-Datei. Rebuild und Snapshots (event_store.py) sowie WAL-Checkpoint, ANALYZE und
+VACUUM (scheduler.py) arbeiten nur auf SQLite und verweigern bzw. überspringen eine DB, die auf
+den Server umgeleitet ist (served_by_postgres) – dort übernimmt autovacuum die Wartung.
+
+    python storage.py migrate --url postgresql://scanner@localhost/scanner   # students.db übertragen
+    python storage.py info                                                    # Backend und Zeilen
+"""
+import argparse
+import json
+import threading
+import time
+from datetime import datetime
+
+from scanner_core import DB_PATH, append_event, connect, initialize_database, lookup_names, pooled, project_scan
+from settings import settings
+
+TABLES = {
+    "events": ("seq", "kind", "student_id", "at", "scan_id", "data"),
+    "students": ("id", "name", "klass", "untis_student_id"),
+    "student_history": ("id", "name", "klass", "untis_student_id", "created_at", "deleted_at", "created_seq",
+                        "deleted_seq"),
+    "log": ("id", "student_id", "name", "date", "time", "action", "scan_id", "scanned_at", "entrance"),
+}
+
+
+# Klasse zum Scan: Inhaber der Ausweisnummer zum Zeitpunkt des Scans (log.id = events.seq),
+# nicht ein späterer Schüler, der dieselbe Nummer bekommen hat
+LOGS_FOR_DAY = """
+    SELECT l.student_id, l.name, l.date, l.time, l.action, s.klass
+    FROM log l LEFT JOIN student_history s
+      ON s.id = l.student_id AND l.id > s.created_seq AND (s.deleted_seq IS NULL OR l.id < s.deleted_seq)
+    WHERE l.date = {param} ORDER BY l.time ASC
+"""
+
+
+def scan_data(name, action, entrance):
+    return {"name": name, "action": action, "entrance": entrance}
+
+
+def scan_rows_query(after_id, until_id, date):
+    """Nur gesetzte Bedingungen ins SQL – sonst nutzt SQLite den Index (date, time) nicht."""
+    where, params = ["id > ?"], [after_id]
+    if until_id is not None:
+        where.append("id <= ?")
+        params.append(until_id)
+    if date is not None:
+        where.append("date = ?")
+        params.append(date)
+    return (f"SELECT id, student_id, name, date, time, action, entrance FROM log "
+            f"WHERE {' AND '.join(where)} ORDER BY id", params)
+
+
+# ----------------------------
+# SQLite (students.db)
+# ----------------------------
+class SqliteStorage:
+    kind = "sqlite"
+
+    def __init__(self, db_path=DB_PATH):
+        self.db_path = db_path
+
+    def connection(self):
+        initialize_database(self.db_path)
+        return pooled(self.db_path)
+
+    # Nachschlagen
+    def student_name(self, student_id):
+        row = self.connection().execute("SELECT name FROM students WHERE id = ?", (student_id,)).fetchone()
+        return row[0] if row else None
+
+    def lookup_names(self, codes):
+        return lookup_names(codes, self.connection())
+
+    def student_ids(self):
+        return {row[0] for row in self.connection().execute("SELECT id FROM students")}
+
+    def students(self):
+        return self.connection().execute(
+            "SELECT id, name, klass, untis_student_id FROM students ORDER BY name ASC"
+        ).fetchall()
+
+    # Schreiben
+    def write_scans(self, rows):
+        """Scans als Ereignis + Logzeile in einer Transaktion.
+
+        rows: [(student_id, name, action, scan_id, scanned_at ISO, entrance)].
+        Rückgabe: seq je Zeile, None = scan_id schon bekannt.
+        """
+        connection = self.connection()
+        seqs, batch = [], set()
+        with connection:
+            for student_id, name, action, scan_id, at, entrance in rows:
+                if scan_id in batch:  # doppelt im selben Stapel: keine seq verbrauchen (wie PostgresStorage)
+                    seqs.append(None)
+                    continue
+                batch.add(scan_id)
+                seq = append_event(connection, "scan", student_id, scan_data(name, action, entrance),
+                                   at=at, scan_id=scan_id)
+                if seq is not None:
+                    project_scan(connection, seq, student_id, name, at[:10], at[11:19], action,
+                                 scan_id, at, entrance)
+                seqs.append(seq)
+        return seqs
+
+    def record_student_events(self, events, at=None):
+        """[(kind, student_id, data)] anhängen und projizieren (eine Transaktion); Rückgabe: seqs."""
+        from event_store import project_student_event
+
+        at = at or datetime.now().isoformat(timespec="milliseconds")
+        connection = self.connection()
+        seqs = []
+        with connection:
+            for kind, student_id, data in events:
+                seq = append_event(connection, kind, student_id, data, at=at)
+                project_student_event(connection, seq, kind, student_id, data, at)
+                seqs.append(seq)
+        return seqs
+
+    # Auswertung
+    def logs_for_day(self, date_str):
+        return self.connection().execute(LOGS_FOR_DAY.format(param="?"), (date_str,)).fetchall()
+
+    def student_events(self, student_id):
+        return self.connection().execute(
+            "SELECT seq, kind, at, data FROM events WHERE student_id = ? ORDER BY seq", (student_id,)
+        ).fetchall()
+
+    def event_kinds(self):
+        return self.connection().execute("SELECT kind, COUNT(*) FROM events GROUP BY kind ORDER BY kind").fetchall()
+
+    def logs_between(self, date_from, date_to, limit=10000):
+        return self.connection().execute(
+            """SELECT student_id, name, date, time, action FROM log
+               WHERE date BETWEEN ? AND ? ORDER BY date, time LIMIT ?""",
+            (date_from, date_to, limit),
+        ).fetchall()
+
+    def last_scan_id(self):
+        return self.connection().execute("SELECT COALESCE(MAX(id), 0) FROM log").fetchone()[0]
+
+    def scan_rows(self, after_id=0, until_id=None, date=None):
+        """(id, student_id, name, date, time, action, entrance) nach id – für die Live-Anwesenheit."""
+        sql, params = scan_rows_query(after_id, until_id, date)
+        return self.connection().execute(sql, params).fetchall()
+
+    def scan_tail(self, after_id, date, pending=None):
+        """Neue Scans seit `after_id` für die Live-Anwesenheit; Rückgabe (rows, settled_id, pending).
+
+        settled_id: bis hier ist nichts mehr zu erwarten – die nächste Nachlese beginnt dort.
+        Ein Schreiber zur Zeit vergibt und committet die ids in Reihenfolge, also gilt die höchste.
+        """
+        top = self.last_scan_id()
+        return self.scan_rows(after_id, top, date), top, None
+
+    def counts(self):
+        connection = self.connection()
+        return {table: connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in TABLES}
+
+
+# ----------------------------
+# PostgreSQL (psycopg 3 + psycopg_pool)
+# ----------------------------
+PG_SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS events (
+           seq BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+           kind TEXT NOT NULL,
+           student_id TEXT,
+           at TEXT NOT NULL,
+           scan_id TEXT UNIQUE,
+           data TEXT NOT NULL DEFAULT '{}'
+       )""",
+    """CREATE OR REPLACE FUNCTION events_append_only() RETURNS trigger LANGUAGE plpgsql AS
+       $$ BEGIN RAISE EXCEPTION 'events ist append-only'; END $$""",
+    """CREATE OR REPLACE TRIGGER events_append_only BEFORE UPDATE OR DELETE OR TRUNCATE ON events
+       FOR EACH STATEMENT EXECUTE FUNCTION events_append_only()""",
+    """CREATE TABLE IF NOT EXISTS students (
+           id TEXT PRIMARY KEY,
+           name TEXT NOT NULL,
+           klass TEXT,
+           untis_student_id TEXT
+       )""",
+    """CREATE TABLE IF NOT EXISTS student_history (
+           id TEXT NOT NULL,
+           name TEXT,
+           klass TEXT,
+           untis_student_id TEXT,
+           created_at TEXT,
+           deleted_at TEXT,
+           created_seq BIGINT NOT NULL,
+           deleted_seq BIGINT,
+           PRIMARY KEY (id, created_seq)
+       )""",
+    """CREATE TABLE IF NOT EXISTS log (
+           id BIGINT PRIMARY KEY,
+           student_id TEXT,
+           name TEXT,
+           date TEXT,
+           time TEXT,
+           action TEXT,
+           scan_id TEXT UNIQUE,
+           scanned_at TEXT,
+           entrance TEXT
+       )""",
+    "CREATE INDEX IF NOT EXISTS idx_log_date_time ON log (date, time)",
+    "CREATE INDEX IF NOT EXISTS idx_log_student ON log (student_id)",
+)
+
+# Pro Verbindung einmal angelegt, nach jedem Commit wieder leer
+PG_STAGE = """CREATE TEMP TABLE IF NOT EXISTS scan_stage (
+                  pos INTEGER, student_id TEXT, name TEXT, action TEXT, scan_id TEXT, at TEXT, entrance TEXT
+              ) ON COMMIT DELETE ROWS"""
+
+# Nachlese: eigener Snapshot, höchste sichtbare id, keine offene Transaktion, und ob alle beim
+# vorigen Snapshot offenen inzwischen fertig sind (dann sind auch ihre kleineren seqs sichtbar).
+# Die Schreiber haben ihre xid vor dem Ziehen der seq (COPY in scan_stage in write_scans).
+PG_TAIL_STATE = """
+    SELECT pg_current_snapshot()::text,
+           (SELECT COALESCE(MAX(id), 0) FROM log),
+           NOT EXISTS (SELECT FROM pg_snapshot_xip(pg_current_snapshot())),
+           %s::pg_snapshot IS NULL OR NOT EXISTS (
+               SELECT FROM pg_snapshot_xip(%s::pg_snapshot) AS open (xid)
+               WHERE NOT pg_visible_in_snapshot(open.xid, pg_current_snapshot()))
+"""
+
+# Ein Statement für den ganzen Stapel: Ereignisse anhängen (bekannte scan_ids überspringen),
+# aus den neuen seqs die Logzeilen bilden
+PG_INSERT_STAGED = """
+    WITH new AS (
+        INSERT INTO events (kind, student_id, at, scan_id, data)
+        SELECT 'scan', student_id, at, scan_id,
+               json_build_object('name', name, 'action', action, 'entrance', entrance)::text
+        FROM scan_stage ORDER BY pos
+        ON CONFLICT (scan_id) DO NOTHING
+        RETURNING seq, scan_id
+    )
+    INSERT INTO log (id, student_id, name, date, time, action, scan_id, scanned_at, entrance)
+    SELECT new.seq, s.student_id, s.name, substr(s.at, 1, 10), substr(s.at, 12, 8), s.action,
+           s.scan_id, s.at, s.entrance
+    FROM new JOIN scan_stage s ON s.scan_id = new.scan_id
+    RETURNING scan_id, id
+"""
+
+
+def pg_project_student_event(cursor, seq, kind, student_id, data, at):
+    """event_store.project_student_event im PostgreSQL-Dialekt."""
+    values = (data.get("name"), data.get("klass"), data.get("untis_student_id"))
+    if kind == "student_created":
+        cursor.execute("INSERT INTO students (id, name, klass, untis_student_id) VALUES (%s, %s, %s, %s)",
+                       (student_id, *values))
+        cursor.execute(
+            """INSERT INTO student_history (id, name, klass, untis_student_id, created_at, deleted_at, created_seq)
+               VALUES (%s, %s, %s, %s, %s, NULL, %s)""",
+            (student_id, *values, at, seq),
+        )
+    elif kind in ("student_renamed", "mapping_changed"):
+        if kind == "student_renamed":
+            cursor.execute("UPDATE students SET name = %s WHERE id = %s", (data["name"], student_id))
+            cursor.execute("UPDATE student_history SET name = %s WHERE id = %s AND deleted_at IS NULL",
+                           (data["name"], student_id))
+        else:
+            cursor.execute("UPDATE students SET name = %s, klass = %s, untis_student_id = %s WHERE id = %s",
+                           (*values, student_id))
+            cursor.execute(
+                """UPDATE student_history SET name = %s, klass = %s, untis_student_id = %s
+                   WHERE id = %s AND deleted_at IS NULL""",
+                (*values, student_id),
+            )
+        cursor.execute(
+            """UPDATE log SET name = %s WHERE student_id = %s
+               AND id > (SELECT created_seq FROM student_history WHERE id = %s AND deleted_at IS NULL)""",
+            (data.get("name"), student_id, student_id),
+        )
+    elif kind == "student_deleted":
+        cursor.execute("DELETE FROM students WHERE id = %s", (student_id,))
+        cursor.execute(
+            "UPDATE student_history SET deleted_at = %s, deleted_seq = %s WHERE id = %s AND deleted_at IS NULL",
+            (at, seq, student_id),
+        )
+
+
+class PostgresStorage:
+    """Server-DB; Verbindungen aus einem Pool, jede Methode ist eine Transaktion (Commit beim Verlassen)."""
+
+    kind = "postgres"
+
+    def __init__(self, url, min_size=1, max_size=10):
+        from psycopg_pool import ConnectionPool
+
+        self.url = url
+        self.pool = ConnectionPool(url, min_size=min_size, max_size=max_size, open=True)
+        self.initialize()
+
+    def initialize(self):
+        with self.pool.connection() as connection:
+            # Mehrere Prozesse starten gleichzeitig -> Schema nur einer nach dem anderen
+            connection.execute("SELECT pg_advisory_xact_lock(4711)")
+            for statement in PG_SCHEMA:
+                connection.execute(statement)
+
+    def query(self, sql, params=()):
+        with self.pool.connection() as connection:
+            return connection.execute(sql, params).fetchall()
+
+    # Nachschlagen
+    def student_name(self, student_id):
+        rows = self.query("SELECT name FROM students WHERE id = %s", (student_id,))
+        return rows[0][0] if rows else None
+
+    def lookup_names(self, codes):
+        return dict(self.query("SELECT id, name FROM students WHERE id = ANY(%s)", (list(set(codes)),)))
+
+    def student_ids(self):
+        return {row[0] for row in self.query("SELECT id FROM students")}
+
+    def students(self):
+        return self.query("SELECT id, name, klass, untis_student_id FROM students ORDER BY name ASC")
+
+    # Schreiben
+    def write_scans(self, rows):
+        """Wie SqliteStorage.write_scans; der Stapel geht per COPY in scan_stage und mit einem Statement weiter."""
+        seqs = [None] * len(rows)
+        if not rows:
+            return seqs
+        first = {}
+        for pos, row in enumerate(rows):
+            first.setdefault(row[3], pos)  # doppelte scan_id im selben Stapel: nur die erste zählt
+        with self.pool.connection() as connection, connection.cursor() as cursor:
+            cursor.execute(PG_STAGE)
+            with cursor.copy("COPY scan_stage (pos, student_id, name, action, scan_id, at, entrance) FROM STDIN") as copy:
+                for scan_id, pos in first.items():
+                    copy.write_row((pos, *rows[pos]))
+            cursor.execute(PG_INSERT_STAGED)
+            for scan_id, seq in cursor.fetchall():
+                seqs[first[scan_id]] = seq
+        return seqs
+
+    def record_student_events(self, events, at=None):
+        at = at or datetime.now().isoformat(timespec="milliseconds")
+        seqs = []
+        with self.pool.connection() as connection, connection.cursor() as cursor:
+            for kind, student_id, data in events:
+                cursor.execute(
+                    "INSERT INTO events (kind, student_id, at, data) VALUES (%s, %s, %s, %s) RETURNING seq",
+                    (kind, student_id, at, json.dumps(data or {}, ensure_ascii=False)),
+                )
+                seq = cursor.fetchone()[0]
+                pg_project_student_event(cursor, seq, kind, student_id, data or {}, at)
+                seqs.append(seq)
+        return seqs
+
+    # Auswertung
+    def logs_for_day(self, date_str):
+        return self.query(LOGS_FOR_DAY.format(param="%s"), (date_str,))
+
+    def student_events(self, student_id):
+        return self.query("SELECT seq, kind, at, data FROM events WHERE student_id = %s ORDER BY seq", (student_id,))
+
+    def event_kinds(self):
+        return self.query("SELECT kind, COUNT(*) FROM events GROUP BY kind ORDER BY kind")
+
+    def logs_between(self, date_from, date_to, limit=10000):
+        return self.query(
+            """SELECT student_id, name, date, time, action FROM log
+               WHERE date BETWEEN %s AND %s ORDER BY date, time LIMIT %s""",
+            (date_from, date_to, limit),
+        )
+
+    def last_scan_id(self):
+        return self.query("SELECT COALESCE(MAX(id), 0) FROM log")[0][0]
+
+    def scan_rows(self, after_id=0, until_id=None, date=None):
+        sql, params = scan_rows_query(after_id, until_id, date)
+        return self.query(sql.replace("?", "%s"), params)
+
+    def scan_tail(self, after_id, date, pending=None):
+        """Wie SqliteStorage.scan_tail – nur committen hier mehrere Schreiber in beliebiger Reihenfolge.
+
+        Sichtbar ist vielleicht schon seq 101, während 100 noch offen ist. Solange die Schreiber
+        aus dem Snapshot des Lesens nicht fertig sind, bleibt settled_id stehen und die Nachlese
+        liest ab dort erneut (bereits übernommene ids filtert der Aufrufer). pending: (Snapshot,
+        höchste damals sichtbare id) – beim nächsten Aufruf zurückgeben.
+        """
+        sql, params = scan_rows_query(after_id, None, date)
+        with self.pool.connection() as connection:
+            # Alle Abfragen sehen denselben Snapshot
+            connection.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+            rows = connection.execute(sql.replace("?", "%s"), params).fetchall()
+            snapshot, top, idle, done = connection.execute(
+                PG_TAIL_STATE, (pending and pending[0], pending and pending[0])
+            ).fetchone()
+        if idle:  # kein Schreiber offen: alles bis top ist sichtbar
+            return rows, max(top, after_id), None
+        if pending is None:
+            return rows, after_id, (snapshot, top)
+        if done:
+            return rows, max(pending[1], after_id), (snapshot, top)
+        return rows, after_id, pending
+
+    def counts(self):
+        return {table: self.query(f"SELECT COUNT(*) FROM {table}")[0][0] for table in TABLES}
+
+
+# ----------------------------
+# Auswahl (einmal pro Prozess und DB)
+# ----------------------------
+_storages = {}
+_storages_lock = threading.Lock()
+
+
+def served_by_postgres(db_path=DB_PATH, config=None):
+    """Liegt `db_path` auf dem PostgreSQL-Server? Dann ist die SQLite-Datei nicht mehr die Quelle."""
+    config = config or settings().database
+    return config.backend == "postgres" and db_path == config.path
+
+
+def open_storage(db_path=DB_PATH, config=None):
+    config = config or settings().database
+    if served_by_postgres(db_path, config):
+        if not config.url:
+            raise ValueError('[database] backend = "postgres" braucht url (SCANNER_DATABASE_URL)')
+        return PostgresStorage(config.url, config.pool_min, config.pool_max)
+    return SqliteStorage(db_path)
+
+
+def unavailable_errors():
+    """Ausnahmen, bei denen die DB nur gerade nicht erreichbar ist (gesperrt, Server weg)."""
+    import sqlite3
+
+    errors = (sqlite3.OperationalError,)
+    try:
+        import psycopg
+    except ImportError:
+        return errors
+    return errors + (psycopg.OperationalError,)
+
+
+def storage(db_path=DB_PATH):
+    """Backend für `db_path` (SqliteStorage oder PostgresStorage)."""
+    store = _storages.get(db_path)
+    if store is None:
+        with _storages_lock:
+            store = _storages.get(db_path)
+            if store is None:
+                store = _storages[db_path] = open_storage(db_path)
+    return store
+
+
+# ----------------------------
+# Übertragung students.db -> PostgreSQL
+# ----------------------------
+def migrate(db_path, url, progress=print):
+    """Alle Ereignisse und Projektionen per COPY übertragen; nur in eine leere Ziel-DB.
+
+    seq/log.id bleiben erhalten, die Sequenz von events läuft danach hinter dem höchsten Wert weiter.
+    Rückgabe: {tabelle: zeilen}.
+    """
+    initialize_database(db_path)  # alte Dateien: Ereignisprotokoll aus students/log anlegen
+    source = connect(db_path)
+    target = PostgresStorage(url, 1, 1)
+    counts = {}
+    try:
+        with target.pool.connection() as connection, connection.cursor() as cursor:
+            if cursor.execute("SELECT EXISTS (SELECT 1 FROM events)").fetchone()[0]:
+                raise ValueError("Ziel-DB enthält schon Ereignisse – Migration nur in eine leere Datenbank")
+            for table, columns in TABLES.items():
+                start = time.perf_counter()
+                names = ", ".join(columns)
+                with cursor.copy(f"COPY {table} ({names}) FROM STDIN") as copy:
+                    for row in source.execute(f"SELECT {names} FROM {table}"):
+                        copy.write_row(row)
+                counts[table] = source.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                progress(f"{table:16s} {counts[table]:8d} Zeilen  {time.perf_counter() - start:6.2f} s")
+            cursor.execute("SELECT setval(pg_get_serial_sequence('events', 'seq'), "
+                           "COALESCE((SELECT MAX(seq) FROM events), 0) + 1, false)")
+        copied = target.counts()
+        if copied != counts:
+            raise RuntimeError(f"Zeilenzahlen weichen ab: students.db {counts}, Server {copied}")
+    finally:
+        source.close()
+        target.pool.close()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Speicher-Backend: Übertragung und Übersicht")
+    parser.add_argument("--db", default=DB_PATH, help="SQLite-Datei (Quelle bei migrate)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    migrate_parser = sub.add_parser("migrate", help="students.db in eine leere PostgreSQL-DB übertragen")
+    migrate_parser.add_argument("--url", default=settings().database.url or None, required=not settings().database.url)
+    sub.add_parser("info", help="wirksames Backend und Zeilen je Tabelle")
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        migrate(args.db, args.url)
+        print('Fertig – jetzt in settings.toml [database] backend = "postgres" und url setzen.')
+    else:
+        store = storage(args.db)
+        print(f"Backend: {store.kind}" + (f" ({args.db})" if store.kind == "sqlite" else ""))
+        for table, count in store.counts().items():
+            print(f"{table:16s} {count:8d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+"""Gemeinsame Fixtures: jede Prüfung bekommt eine eigene temporäre students.db."""
+import os
+import sys
+
+# Nur Standardwerte – eine lokale settings.toml soll die Tests nicht beeinflussen
+os.environ["SCANNER_SETTINGS"] = ""
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest  # noqa: E402
+
+import event_store  # noqa: E402
+import scanner_core  # noqa: E402
+
+STUDENTS = {"100001": ("Anna Albers", "5a"), "100002": ("Bert Brandt", "9c"), "100003": ("Cem Çelik", "9c")}
+
+
+@pytest.fixture
+def db(tmp_path):
+    path = str(tmp_path / "students.db")
+    scanner_core.initialize_database(path)
+    for student_id, (name, klass) in STUDENTS.items():
+        event_store.create_student(student_id, name, klass, db_path=path)
+    return path
@@ -0,0 +1,33 @@
+"""Code-Prüfung: neue Schüler-IDs müssen dasselbe Format haben, das jeder Scan verlangt."""
+import pytest
+
+import barcode_check
+import event_store
+import scanner_core
+
+
+@pytest.mark.parametrize("student_id", ["AB", "12 34", "Ä100", "4711/2"])
+def test_create_student_rejects_unscannable_ids(db, student_id):
+    with pytest.raises(ValueError, match="Ausweisformat"):
+        event_store.create_student(student_id, "Erik Engel", db_path=db)
+    with pytest.raises(ValueError, match="Ausweisformat"):
+        event_store.set_mapping(student_id, "Erik Engel", "7b", db_path=db)
+    assert not event_store.student_exists(student_id, db)
+
+
+def test_created_student_is_scannable(db):
+    event_store.create_student("AB-4711", "Erik Engel", "7b", db_path=db)
+    assert scanner_core.register_codes(["AB-4711"], "Anmeldung", db_path=db)[0][2] == "accepted"
+
+
+def test_set_mapping_still_changes_existing_ids(db):
+    assert event_store.set_mapping("100001", "Anna Albers", "6a", db_path=db) == "changed"
+
+
+def test_check_digit_applies_to_new_ids(db, monkeypatch):
+    strict = barcode_check.BarcodeValidator(pattern=r"\d{4,8}", check="luhn", db_path=db)
+    monkeypatch.setattr(barcode_check, "_validators", {db: strict})
+    with pytest.raises(ValueError, match="Prüfziffer"):
+        event_store.create_student("4712", "Erik Engel", db_path=db)
+    event_store.create_student("4713", "Erik Engel", db_path=db)  # Luhn-Prüfziffer stimmt
+    assert strict.check("4713") == ("4713", None)
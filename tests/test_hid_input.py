@@ -0,0 +1,39 @@
+"""Tastenstrom des Handscanners in Codes zerlegen (hid_input.WedgeBuffer)."""
+import time
+
+import hid_input
+
+
+def feed_keys(buffer, text, start, gap=0.005):
+    codes = []
+    for number, ch in enumerate(text):
+        codes += buffer.feed(ch, start + number * gap)
+    return codes
+
+
+def test_terminator_ends_code():
+    buffer = hid_input.WedgeBuffer()
+    assert feed_keys(buffer, "100001\n", 10.0) == ["100001"]
+
+
+def test_pause_splits_codes_without_terminator():
+    buffer = hid_input.WedgeBuffer()
+    assert feed_keys(buffer, "100001", 10.0) == []
+    assert feed_keys(buffer, "100002\n", 11.0) == ["100001", "100002"]
+
+
+def test_slow_typing_with_enter_is_ignored():
+    buffer = hid_input.WedgeBuffer()
+    assert feed_keys(buffer, "4711\n", 10.0, gap=0.3) == []
+    assert hid_input.WedgeBuffer(accept_slow=True).feed("4711\n") == ["4711"]
+
+
+def test_idle_flush_with_evdev_timestamps():
+    """evdev liefert Wanduhrzeit – umgerechnet passt sie zur Uhr des Timer-Threads."""
+    buffer = hid_input.WedgeBuffer()
+    realtime = time.time()
+    for number, ch in enumerate("100003"):
+        buffer.feed(ch, hid_input.monotonic_stamp(realtime + number * 0.005))
+    assert buffer.flush_if_idle() is None  # gerade erst getippt
+    time.sleep(0.2)
+    assert buffer.flush_if_idle() == "100003"
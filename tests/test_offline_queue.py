@@ -0,0 +1,85 @@
+"""Offline-Warteschlange: Rückfall bei nicht erreichbarer DB, Nachsenden, abgelehnte Scans."""
+import sqlite3
+import time
+
+import pytest
+
+import offline_queue
+import scanner_core
+
+
+@pytest.fixture(autouse=True)
+def fresh_process(tmp_path, monkeypatch):
+    """Jede Prüfung wie ein neuer Prozess: eigene scan_queue.db, noch kein Nachsende-Thread."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(offline_queue, "_queues", {})
+    monkeypatch.setattr(offline_queue, "_checked", set())
+    monkeypatch.setattr(offline_queue, "AGENT_INTERVAL", 0.05)
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_unreachable_db_queues_and_agent_delivers(db, monkeypatch):
+    def locked(scans, db_path):
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(offline_queue, "register_scans", locked)
+    assert offline_queue.record_codes(["100001"], "Anmeldung", db_path=db) == [("100001", None, "queued")]
+    # DB wieder da; der Thread aus record_codes sendet nach
+    monkeypatch.setattr(offline_queue, "register_scans", scanner_core.register_scans)
+    queue = offline_queue._queues[offline_queue.QUEUE_PATH]
+    assert wait_for(lambda: queue.counts() == {"synced": 1})
+    assert [row[0] for row in scanner_core.fetch_logs_for_report(time.strftime("%Y-%m-%d"), db)] == ["100001"]
+
+
+def test_pending_scans_from_earlier_run_are_sent_with_healthy_db(db):
+    earlier = offline_queue.ScanQueue(offline_queue.QUEUE_PATH)
+    earlier.enqueue("100002", "Anmeldung", "Nord")
+    earlier.connection.close()
+
+    assert offline_queue.record_codes(["100001"], "Anmeldung", db_path=db)[0][2] == "accepted"
+    queue = offline_queue._queues[offline_queue.QUEUE_PATH]
+    assert wait_for(lambda: queue.counts() == {"synced": 1})
+    logged = {row[0] for row in scanner_core.fetch_logs_for_report(time.strftime("%Y-%m-%d"), db)}
+    assert logged == {"100001", "100002"}
+
+
+def test_no_agent_without_queue_file(db):
+    assert offline_queue.record_codes(["100001"], "Anmeldung", db_path=db)[0][2] == "accepted"
+    assert offline_queue._queues == {}
+
+
+def test_programming_errors_are_not_queued(db, monkeypatch):
+    def broken(scans, db_path):
+        raise TypeError("kaputt")
+
+    monkeypatch.setattr(offline_queue, "register_scans", broken)
+    with pytest.raises(TypeError):
+        offline_queue.record_codes(["100001"], "Anmeldung", db_path=db)
+    assert offline_queue._queues == {}
+
+
+def test_batch_scan_is_queued_when_db_unreachable(db, monkeypatch):
+    import barcode_check
+    import batch_scan
+
+    def locked(scans, db_path):
+        raise sqlite3.OperationalError("database is locked")
+
+    # Nur die Eintragung prüfen – decodiert wird hier nicht (zbar)
+    monkeypatch.setattr(barcode_check.BarcodeValidator, "zbar_symbols", lambda self: None)
+    monkeypatch.setattr(batch_scan, "decode_images", lambda items, *args: [
+        ("a.png", [("CODE128", b"100001")], None), ("b.png", [("CODE128", b"100001"), ("QRCODE", b"100002")], None),
+    ])
+    monkeypatch.setattr(offline_queue, "register_scans", locked)
+    summary = batch_scan.scan_batch([("a.png", b""), ("b.png", b"")], "Anmeldung", db_path=db)
+    assert summary["registered"] == [("100001", None, "queued"), ("100002", None, "queued")]
+    queue = offline_queue._queues[offline_queue.QUEUE_PATH]
+    assert wait_for(lambda: queue.counts() == {"synced": 2})  # Nachsenden direkt in die DB
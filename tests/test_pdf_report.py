@@ -0,0 +1,40 @@
+"""PDF-Logbuch: die einmal geparste Schrift muss in jedem Bericht eines Prozesses vollständig landen."""
+import io
+import re
+import zlib
+
+from fontTools import ttLib
+
+import pdf_report
+
+STREAM = re.compile(rb"/Length1 \d+.*?stream\r?\n(.*?)\r?\nendstream", re.S)
+
+
+def embedded_glyphs(data):
+    """Glyphnamen aller eingebetteten TrueType-Subsets (FontFile2-Streams)."""
+    names = set()
+    for stream in STREAM.findall(data):
+        font = ttLib.TTFont(io.BytesIO(zlib.decompress(stream)))
+        names.update(font.getGlyphOrder())
+    return names
+
+
+def glyph_names(text):
+    cmap = ttLib.TTFont(pdf_report.find_font_path(), lazy=True).getBestCmap()
+    return {cmap[ord(char)] for char in text if not char.isspace()}
+
+
+def report(name):
+    logs = [("100001", name, "2026-10-19", "08:00:00", "Anmeldung", "5a")]
+    return pdf_report.build_log_report(logs, "Schüler-Logbuch für 2026-10-19")
+
+
+def test_two_reports_each_embed_their_own_glyphs():
+    first, second = "Şule Çağrı", "Łukasz Żółć"
+    pdf_first, pdf_second = report(first), report(second)
+    assert pdf_first.startswith(b"%PDF") and pdf_second.startswith(b"%PDF")
+    assert glyph_names(first) <= embedded_glyphs(pdf_first)
+    assert glyph_names(second) <= embedded_glyphs(pdf_second)
+    # Subset je Dokument: der zweite Bericht schleppt die Zeichen des ersten nicht mit
+    assert not (glyph_names("Şğı") & embedded_glyphs(pdf_second))
+
@@ -0,0 +1,119 @@
+"""Stabile API aus scanner_core gegen eine temporäre DB (siehe Docstring von scanner_core)."""
+from datetime import date, datetime, time, timedelta, timezone
+
+import pytest
+
+import event_store
+import scanner_core
+from conftest import STUDENTS
+
+TODAY = date.today().isoformat()
+
+
+# ----------------------------
+# Nachschlagen
+# ----------------------------
+def test_get_student_name(db):
+    assert scanner_core.get_student_name("100001", db) == "Anna Albers"
+    assert scanner_core.get_student_name("999999", db) is None
+
+
+def test_lookup_names_only_known(db):
+    names = scanner_core.lookup_names(["100001", "100002", "999999", "100001"], scanner_core.pooled(db))
+    assert names == {"100001": "Anna Albers", "100002": "Bert Brandt"}
+
+
+def test_fetch_students_sorted_with_class(db):
+    rows = scanner_core.fetch_students(db)
+    assert [row[0] for row in rows] == ["100001", "100002", "100003"]
+    assert rows[1][1:3] == ("Bert Brandt", "9c")
+
+
+# ----------------------------
+# Protokoll
+# ----------------------------
+def test_log_scan_appears_in_report(db):
+    scanner_core.log_scan("100001", "Anna Albers", "Anmeldung", db)
+    logs = scanner_core.fetch_logs_for_report(TODAY, db)
+    assert [(row[0], row[1], row[4], row[5]) for row in logs] == [("100001", "Anna Albers", "Anmeldung", "5a")]
+
+
+def test_register_codes_statuses_in_input_order(db):
+    results = scanner_core.register_codes(["100002", "999999", "x", "100001"], "Anmeldung", "Nord", db)
+    assert results == [
+        ("100002", "Bert Brandt", "accepted"),
+        ("999999", None, "unknown"),
+        ("x", None, "rejected"),          # zu kurz für das Ausweisformat
+        ("100001", "Anna Albers", "accepted"),
+    ]
+    assert len(scanner_core.fetch_logs_between(TODAY, TODAY, db)) == 2
+
+
+def test_ingest_scan_batch_ignores_duplicate_scan_ids(db):
+    scans = [scanner_core.new_scan("100001", "Anmeldung", scan_id="s1"),
+             scanner_core.new_scan("100002", "Anmeldung", scan_id="s2")]
+    assert scanner_core.ingest_scan_batch(scans, db)["accepted"] == ["s1", "s2"]
+    again = scanner_core.ingest_scan_batch(scans + [scanner_core.new_scan("100003", "Abmeldung", scan_id="s3")], db)
+    assert again["duplicates"] == ["s1", "s2"]
+    assert again["accepted"] == ["s3"]
+    assert len(scanner_core.fetch_logs_between(TODAY, TODAY, db)) == 3
+
+
+@pytest.mark.parametrize("scan, status", [
+    ({"scan_id": "u1", "code": "999999", "action": "Anmeldung"}, "unknown"),
+    ({"scan_id": "r1", "code": "ab", "action": "Anmeldung"}, "rejected"),            # Format
+    ({"scan_id": "r2", "code": "1000\x0701", "action": "Anmeldung"}, "rejected"),    # Steuerzeichen
+    ({"scan_id": "r3", "code": 100001, "action": "Anmeldung"}, "rejected"),          # kein Text
+    ({"scan_id": "i1", "code": "100001", "action": ""}, "invalid"),
+    ({"scan_id": "i2", "code": "100001", "action": "Anmeldung", "scanned_at": "gestern"}, "invalid"),
+])
+def test_ingest_scan_batch_rejection_statuses(db, scan, status):
+    scan = {"scanned_at": datetime.now().isoformat(), **scan}
+    result = scanner_core.ingest_scan_batch([scan], db)
+    assert result[status] == [scan["scan_id"]]
+    assert scanner_core.fetch_logs_between(TODAY, TODAY, db) == []
+
+
+def test_ingest_scan_batch_mixes_naive_and_utc_timestamps(db):
+    now = datetime.combine(date.today(), time(12, 0))
+    earlier = (now - timedelta(minutes=5)).astimezone(timezone.utc)
+    scans = [
+        {"scan_id": "naive", "code": "100001", "action": "Abmeldung", "scanned_at": now.isoformat()},
+        {"scan_id": "utc", "code": "100001", "action": "Anmeldung",
+         "scanned_at": earlier.isoformat().replace("+00:00", "Z")},
+    ]
+    assert sorted(scanner_core.ingest_scan_batch(scans, db)["accepted"]) == ["naive", "utc"]
+    # als Ortszeit gespeichert, nach Zeitpunkt eingefügt
+    expected = [(now - timedelta(minutes=5)).strftime("%H:%M:%S"), now.strftime("%H:%M:%S")]
+    assert [row[3] for row in scanner_core.fetch_logs_between(TODAY, TODAY, db)] == expected
+
+
+def test_reused_badge_keeps_class_of_former_holder(db):
+    scanner_core.register_codes(["100001"], "Anmeldung", None, db)
+    event_store.delete_student("100001", db_path=db)
+    event_store.create_student("100001", "Dora Dietz", "7b", db_path=db)
+    scanner_core.register_codes(["100001"], "Abmeldung", None, db)
+    logs = scanner_core.fetch_logs_for_report(TODAY, db)
+    assert [(row[1], row[5]) for row in logs] == [("Anna Albers", "5a"), ("Dora Dietz", "7b")]
+
+
+# ----------------------------
+# Decodieren
+# ----------------------------
+def test_decode_barcodes_empty_image(db):
+    pytest.importorskip("pyzbar.pyzbar", exc_type=ImportError)
+    np = pytest.importorskip("numpy")
+    assert scanner_core.decode_barcodes(np.full((120, 160), 255, dtype=np.uint8), db) == []
+
+
+# ----------------------------
+# Auswertung & Export
+# ----------------------------
+def test_export_log_pdf(db):
+    pytest.importorskip("fpdf")
+    scanner_core.register_codes(list(STUDENTS), "Anmeldung", None, db)
+    logs = scanner_core.fetch_logs_for_report(TODAY, db)
+    filename, data = scanner_core.export_log_pdf(logs, TODAY)
+    assert filename == f"logbuch_{TODAY}.pdf"
+    assert bytes(data[:5]) == b"%PDF-"
+    assert len(data) > 1000
@@ -0,0 +1,193 @@
+"""PostgresStorage gegen SqliteStorage: dieselben Schritte, dieselben Ergebnisse.
+
+Braucht psycopg und einen Server, sonst werden die Vergleiche übersprungen:
+
+    docker run --rm -e POSTGRES_HOST_AUTH_METHOD=trust -p 5432:5432 postgres:16
+    SCANNER_TEST_POSTGRES_URL=postgresql://postgres@localhost/postgres python -m pytest -q tests/test_storage_postgres.py
+
+Jeder Test läuft in einem eigenen Wegwerf-Schema, das danach gelöscht wird. Die Sperren für
+SQLite-Wartung bei backend = "postgres" (scheduler, event_store) laufen immer.
+"""
+import json
+import os
+import uuid
+from datetime import date
+
+import pytest
+
+import event_store
+import scheduler
+import settings
+import storage
+
+TODAY = date.today().isoformat()
+
+
+@pytest.fixture
+def pg_url():
+    url = os.environ.get("SCANNER_TEST_POSTGRES_URL")
+    if not url:
+        pytest.skip("SCANNER_TEST_POSTGRES_URL nicht gesetzt")
+    psycopg = pytest.importorskip("psycopg")
+    pytest.importorskip("psycopg_pool")
+    schema = f"scanner_test_{uuid.uuid4().hex[:12]}"
+    try:
+        with psycopg.connect(url, autocommit=True) as connection:
+            connection.execute(f"CREATE SCHEMA {schema}")
+    except psycopg.OperationalError as e:
+        pytest.skip(f"PostgreSQL nicht erreichbar: {e}")
+    yield psycopg.conninfo.make_conninfo(url, options=f"-c search_path={schema}")
+    with psycopg.connect(url, autocommit=True) as connection:
+        connection.execute(f"DROP SCHEMA {schema} CASCADE")
+
+
+@pytest.fixture
+def stores(db, pg_url):
+    """(SqliteStorage, PostgresStorage) mit demselben Stand – der Server per migrate aus der Datei."""
+    storage.migrate(db, pg_url, progress=lambda line: None)
+    server = storage.PostgresStorage(pg_url, 1, 1)
+    yield storage.SqliteStorage(db), server
+    server.pool.close()
+
+
+def scan(student_id, scan_id, action="Anmeldung", time="08:00:00.000", entrance="Nord"):
+    return (student_id, None, action, scan_id, f"{TODAY}T{time}", entrance)
+
+
+def snapshot(store):
+    """Alles, was Oberflächen und Berichte sehen."""
+    return {
+        "counts": store.counts(),
+        "students": [tuple(row) for row in store.students()],
+        "logs": [tuple(row) for row in store.logs_for_day(TODAY)],
+        "rows": [tuple(row) for row in store.scan_rows()],
+        "kinds": [tuple(row) for row in store.event_kinds()],
+        "history": {sid: [(seq, kind, at, json.loads(data)) for seq, kind, at, data in store.student_events(sid)]
+                    for sid in ("100001", "100002", "100003")},
+    }
+
+
+# ----------------------------
+# Vergleich mit SQLite (nur mit Server)
+# ----------------------------
+def test_migrate_copies_everything(stores):
+    sqlite, server = stores
+    assert snapshot(server) == snapshot(sqlite)
+    with pytest.raises(ValueError):
+        storage.migrate(sqlite.db_path, server.url, progress=lambda line: None)  # nur in eine leere DB
+
+
+def test_migrate_keeps_sequence_running(stores):
+    sqlite, server = stores
+    rows = [scan("100001", "after-migrate")]
+    assert server.write_scans(rows) == sqlite.write_scans(rows)
+
+
+def test_write_scans_same_seqs_and_duplicates(stores):
+    sqlite, server = stores
+    first = [scan("100001", "a"), scan("100002", "b", time="08:01:00.000"), scan("100001", "a"),
+             scan("999999", "c", time="08:02:00.000")]
+    again = [scan("100002", "b"), scan("100003", "d", "Abmeldung", "12:00:00.000", None)]
+    for rows in (first, again, []):
+        assert server.write_scans(rows) == sqlite.write_scans(rows)
+    assert sqlite.write_scans(again)[0] is None
+    assert snapshot(server) == snapshot(sqlite)
+
+
+def test_student_events_rename_delete_and_reused_badge(stores):
+    sqlite, server = stores
+    at = f"{TODAY}T07:00:00.000"
+    rows = [scan("100003", "before-delete", time="08:30:00.000")]
+    assert server.write_scans(rows) == sqlite.write_scans(rows)
+    steps = [
+        [("student_renamed", "100001", {"name": "Anna Albers-Yilmaz"})],
+        [("mapping_changed", "100002", {"name": "Bert Brandt", "klass": "10a", "untis_student_id": "77"})],
+        [("student_deleted", "100003", {})],
+        [("student_created", "100003", {"name": "Dana Dietz", "klass": "5b"})],
+    ]
+    for number, events in enumerate(steps):
+        assert server.record_student_events(events, at=at) == sqlite.record_student_events(events, at=at)
+        rows = [scan(events[0][1], f"scan-{number}", time=f"09:0{number}:00.000")]
+        assert server.write_scans(rows) == sqlite.write_scans(rows)
+    assert snapshot(server) == snapshot(sqlite)
+    # 100003: vor dem Löschen der alte Inhaber (9c), dazwischen niemand, danach die neue Inhaberin (5b)
+    classes = [row[5] for row in server.logs_for_day(TODAY) if row[0] == "100003"]
+    assert classes == ["9c", None, "5b"]
+
+
+def test_lookups_match(stores):
+    sqlite, server = stores
+    codes = ["100001", "100002", "999999", "100001"]
+    assert server.lookup_names(codes) == sqlite.lookup_names(codes)
+    assert server.student_ids() == sqlite.student_ids()
+    assert server.student_name("100003") == sqlite.student_name("100003") == "Cem Çelik"
+
+
+def present(board):
+    return {item["student_id"] for item in board.snapshot()["present"]}
+
+
+def test_presence_tail_waits_for_slower_writer(stores, pg_url, monkeypatch):
+    """Zwei Schreiber: seq n+1 wird vor n sichtbar – weder Nachlese noch Neuladen dürfen n verlieren."""
+    import psycopg
+
+    import presence
+
+    sqlite, server = stores
+    monkeypatch.setattr(presence, "storage", lambda db_path: server)
+    running = presence.PresenceBoard(sqlite.db_path)
+    slow = psycopg.connect(pg_url)
+    try:
+        with slow.cursor() as cursor:  # wie PostgresStorage.write_scans, nur noch ohne Commit
+            cursor.execute(storage.PG_STAGE)
+            with cursor.copy("COPY scan_stage (pos, student_id, name, action, scan_id, at, entrance) FROM STDIN") as copy:
+                copy.write_row((0, *scan("100002", "slow", time="08:10:00.000")))
+            cursor.execute(storage.PG_INSERT_STAGED)
+            (_, slow_seq), = cursor.fetchall()
+        fast_seq, = server.write_scans([scan("100003", "fast", time="08:11:00.000")])
+        assert fast_seq > slow_seq
+
+        running.refresh(force=True)
+        started = presence.PresenceBoard(sqlite.db_path)
+        assert present(running) == present(started) == {"100003"}
+        slow.commit()
+        for board in (running, started):
+            board.refresh(force=True)
+            assert present(board) == {"100002", "100003"}
+            assert board.tail_id == fast_seq  # alles fertig -> die Nachlese rückt vor
+        started.close()
+    finally:
+        slow.close()
+        running.close()
+
+
+# ----------------------------
+# SQLite-Wartung bei backend = "postgres"
+# ----------------------------
+@pytest.fixture
+def served(db, monkeypatch):
+    """`db` gilt als auf den Server umgeleitet (ohne Server – die Sperren fragen nur die Einstellung ab)."""
+    config = settings.load("", {"SCANNER_DATABASE_BACKEND": "postgres", "SCANNER_DATABASE_PATH": db,
+                                "SCANNER_DATABASE_URL": "postgresql://localhost/unbenutzt"})
+    monkeypatch.setattr(storage, "settings", lambda: config)
+    return db
+
+
+@pytest.mark.parametrize("job", [scheduler.job_wal_checkpoint, scheduler.job_analyze,
+                                 scheduler.job_event_snapshot, scheduler.job_vacuum])
+def test_sqlite_jobs_skip_server_db(served, job):
+    assert job(served) == scheduler.SERVER_SKIP
+
+
+def test_sqlite_jobs_still_run_on_files(db):
+    assert scheduler.job_event_snapshot(db).startswith("Snapshot bis Ereignis")
+    assert scheduler.job_analyze(db) == "ANALYZE ok"
+
+
+@pytest.mark.parametrize("command", ["rebuild", "snapshot"])
+def test_event_store_cli_refuses_server_db(served, monkeypatch, capsys, command):
+    monkeypatch.setattr("sys.argv", ["event_store.py", command, "--db", served])
+    with pytest.raises(SystemExit) as exit_info:
+        event_store.main()
+    assert exit_info.value.code == 2
+    assert "PostgreSQL" in capsys.readouterr().err
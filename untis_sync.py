@@ -0,0 +1,147 @@
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from event_store import record_mapping_changes
+from scanner_core import DB_PATH, connect, fetch_students, initialize_database
+from settings import settings
+
+# ----------------------------
+# WebUntis-Abgleich ohne Streamlit (für den Scheduler)
+# ----------------------------
+# Zugangsdaten aus settings.py ([untis] bzw. UNTIS_*) – dieselben wie in der WebUntis-App.
+def untis_ticket() -> Optional[dict]:
+    return settings().untis.ticket()
+
+
+def untis_session(ticket: dict):
+    import webuntis
+    return webuntis.Session(
+        server=ticket["server"],
+        school=ticket["school"],
+        username=ticket["username"],
+        password=ticket["password"],
+        useragent=ticket.get("useragent") or "WebUntis",
+    ).login()
+
+
+def _names(items) -> str:
+    try:
+        return ", ".join(getattr(i, "name", str(i)) for i in items)
+    except Exception:
+        return ""
+
+
+def initialize_untis_tables(con):
+    con.execute("""
+        CREATE TABLE IF NOT EXISTS untis_students (
+            untis_student_id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            klass TEXT,
+            synced_at TEXT
+        )
+    """)
+    con.execute("""
+        CREATE TABLE IF NOT EXISTS untis_timetable (
+            klass TEXT,
+            date TEXT,
+            start_time TEXT,
+            end_time TEXT,
+            subjects TEXT,
+            teachers TEXT,
+            rooms TEXT,
+            code TEXT,
+            synced_at TEXT
+        )
+    """)
+    con.execute("CREATE INDEX IF NOT EXISTS idx_untis_timetable_klass_date ON untis_timetable (klass, date)")
+
+
+def fetch_roster(ticket: dict) -> list:
+    s = untis_session(ticket)
+    try:
+        rows = []
+        for st_obj in s.students():
+            sid = str(getattr(st_obj, "id", "")) or None
+            long_name = getattr(st_obj, "long_name", None)
+            short_name = getattr(st_obj, "name", None)
+            fname = getattr(st_obj, "forename", "") or ""
+            sname = getattr(st_obj, "surname", "") or ""
+            nm = long_name or short_name or f"{fname} {sname}".strip() or "Unbekannt"
+            klasse = getattr(st_obj, "klasse", None) or getattr(st_obj, "class_name", None)
+            rows.append((sid, nm, klasse))
+        return rows
+    finally:
+        try: s.logout()
+        except Exception: pass
+
+
+def sync_roster(ticket: dict, db_path: str = DB_PATH) -> int:
+    """Schülerliste nach untis_students spiegeln; verknüpfte Mappings bekommen Name/Klasse nachgeführt."""
+    rows = [r for r in fetch_roster(ticket) if r[0]]
+    now = datetime.now().isoformat(timespec="seconds")
+    initialize_database(db_path)
+    with connect(db_path) as con:
+        initialize_untis_tables(con)
+        con.execute("DELETE FROM untis_students")
+        con.executemany(
+            "INSERT OR REPLACE INTO untis_students (untis_student_id, name, klass, synced_at) VALUES (?,?,?,?)",
+            [(sid, name, klass, now) for sid, name, klass in rows],
+        )
+        con.commit()
+    # Nur echte Änderungen werden zu Ereignissen (kein Ereignis pro Schüler und Abgleich);
+    # Schüler kommen aus dem Backend (storage.py), der Zwischenspeicher bleibt in der SQLite-Datei
+    roster = {sid: (name, klass) for sid, name, klass in rows}
+    changed = [(sid, *roster[untis_id], untis_id) for sid, name, klass, untis_id in fetch_students(db_path)
+               if untis_id in roster and roster[untis_id] != (name, klass)]
+    record_mapping_changes(changed, db_path)
+    return len(rows)
+
+
+def sync_timetables(ticket: dict, db_path: str = DB_PATH, days: int = 7) -> int:
+    """Stundenpläne aller Klassen für die nächsten `days` Tage zwischenspeichern."""
+    start = datetime.now().date()
+    end = start + timedelta(days=days)
+    now = datetime.now().isoformat(timespec="seconds")
+    rows = []
+    s = untis_session(ticket)
+    try:
+        for k in s.klassen():
+            for period in s.timetable(klasse=k, start=start, end=end):
+                rows.append((
+                    k.name,
+                    period.start.strftime("%Y-%m-%d"),
+                    period.start.strftime("%H:%M"),
+                    period.end.strftime("%H:%M"),
+                    _names(getattr(period, "subjects", [])),
+                    _names(getattr(period, "teachers", [])),
+                    _names(getattr(period, "rooms", [])),
+                    getattr(period, "code", None),
+                    now,
+                ))
+    finally:
+        try: s.logout()
+        except Exception: pass
+
+    with connect(db_path) as con:
+        initialize_untis_tables(con)
+        con.execute(
+            "DELETE FROM untis_timetable WHERE date BETWEEN ? AND ?",
+            (start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")),
+        )
+        con.executemany("INSERT INTO untis_timetable VALUES (?,?,?,?,?,?,?,?,?)", rows)
+        con.commit()
+    return len(rows)
+
+
+def load_synced_roster(db_path: str = DB_PATH, max_age_hours: float = 24) -> Optional[list]:
+    """Zuletzt synchronisierte Schülerliste oder None, wenn keine/zu alt."""
+    with connect(db_path) as con:
+        initialize_untis_tables(con)
+        row = con.execute("SELECT MIN(synced_at) FROM untis_students").fetchone()
+        if not row or not row[0]:
+            return None
+        age = time.time() - datetime.fromisoformat(row[0]).timestamp()
+        if age > max_age_hours * 3600:
+            return None
+        return con.execute("SELECT untis_student_id, name, klass FROM untis_students ORDER BY name").fetchall()